@@ -1,3 +1,6 @@
+import time
+_import_started = time.perf_counter()
+
 from flask import Flask
 from flask_cors import CORS
 import os
@@ -16,10 +19,14 @@ def create_app():
     register_error_handlers(app)
     
     # Asegurar que existen los directorios de salida
-    output_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "crewAPI", "outputs")
-    reviews_dir = os.path.join(output_dir, "reviews")
+    from crewAPI import config as crew_config
+    from crewAPI import storage
+    storage.ensure_run_dirs()
+    os.makedirs(crew_config.RUNS_DIR, exist_ok=True)
     
-    os.makedirs(output_dir, exist_ok=True)
-    os.makedirs(reviews_dir, exist_ok=True)
+    # crew.py (y crewai) no se ha importado todavía: se carga en la primera
+    # fase o con la precarga (start_warmup) cuando el servidor ya escucha
+    from api.services.startup_service import mark_app_ready
+    mark_app_ready(_import_started)
     
     return app 
\ No newline at end of file
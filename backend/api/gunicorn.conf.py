@@ -0,0 +1,52 @@
+"""
+Configuración de gunicorn para producción. Todos los valores se leen de
+variables de entorno:
+
+- WEB_BIND: dirección de escucha (por defecto 0.0.0.0:$PORT, con PORT=5000)
+- WEB_WORKERS: procesos worker (por defecto 1). Los trabajos, los lotes, los
+  eventos SSE y los limitadores del LLM viven en la memoria de cada proceso,
+  así que con más de uno las consultas de un trabajo o de su stream que llegan
+  a otro worker no lo encuentran
+- WEB_THREADS: hilos del worker (por defecto 2 x núcleos + 1, como mínimo 4);
+  es lo que hay que subir para atender más peticiones a la vez
+- WEB_PRELOAD: "1" para cargar la aplicación en el master antes de crear los
+  workers (arranque más rápido y memoria compartida)
+- WEB_TIMEOUT: segundos sin respuesta antes de reiniciar un worker (por defecto 300)
+- WEB_GRACEFUL_TIMEOUT: segundos que tiene un worker para terminar sus
+  peticiones y trabajos en curso al apagarse (por defecto 600)
+
+La precarga de crewai en cada worker se controla con CREW_WARMUP y
+CREW_WARMUP_DELAY (ver api/settings.py).
+"""
+
+import multiprocessing
+import os
+
+bind = os.getenv("WEB_BIND", f"0.0.0.0:{os.getenv('PORT', '5000')}")
+workers = int(os.getenv("WEB_WORKERS", "1"))
+threads = int(os.getenv("WEB_THREADS", str(max(4, multiprocessing.cpu_count() * 2 + 1))))
+worker_class = "gthread"
+preload_app = os.getenv("WEB_PRELOAD", "0") == "1"
+timeout = int(os.getenv("WEB_TIMEOUT", "300"))
+graceful_timeout = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "600"))
+keepalive = int(os.getenv("WEB_KEEPALIVE", "5"))
+accesslog = os.getenv("WEB_ACCESS_LOG", "-")
+errorlog = "-"
+
+def when_ready(server):
+    if workers > 1:
+        server.log.warning(
+            "WEB_WORKERS=%s: los trabajos, los lotes y los eventos SSE están en la memoria de cada worker; "
+            "las consultas que lleguen a otro worker responderán 404", workers
+        )
+
+def post_worker_init(worker):
+    """Cuando el worker ya está listo para aceptar peticiones, precarga crewai en segundo plano"""
+    from api.services.startup_service import start_warmup
+    start_warmup()
+
+def worker_exit(server, worker):
+    """Al apagar un worker, espera a que terminen los trabajos en segundo plano que tenga en curso"""
+    from api.services.job_service import job_manager
+    server.log.info("Esperando a los trabajos en curso del worker %s", worker.pid)
+    job_manager.shutdown(wait=True)
@@ -1,4 +1,4 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, Response, stream_with_context
 import time
 import json
 from api.services.crew_service import (
@@ -6,6 +6,11 @@ from api.services.crew_service import (
     execute_phase2,
     execute_phase3,
     execute_phase4,
+    execute_all_phases,
+    resume_run,
+    execute_extend_run,
+    get_run_status,
+    reset_run_if_changed,
     clean_outputs
 )
 from api.services.results_service import (
@@ -13,26 +18,87 @@ from api.services.results_service import (
     get_reviewer_profiles,
     get_reviews,
     get_analysis,
-    get_all_results
+    get_all_results,
+    get_results_version
 )
+from api import settings
+from api.services.query_service import PageQuery, has_query_params, query_version, query_page
+from api.services.job_service import job_manager, QueueFullError
+from api.services.event_service import event_broker, stream_events
+from api.services.startup_service import get_startup_report
+from crewAPI import storage
+from crewAPI import response_cache, metrics_registry, output_store, IncompleteRunError
+from api.utils.request_metrics import register_request_metrics
+from api.utils.http_cache import register_compression, conditional_json
+from api.utils.validation import int_param, bool_param, profile_parameters_param, InvalidParameterError
 
 # Crear un Blueprint para las rutas relacionadas con las reseñas
 reviews_bp = Blueprint('reviews', __name__, url_prefix='/api')
+register_request_metrics(reviews_bp)
+register_compression(reviews_bp)
+
+def get_request_run_id():
+    """
+    Obtiene el run_id de la petición (query string o cuerpo JSON).
+    
+    Si no se indica se usa la ejecución compartida.
+    """
+    run_id = request.args.get('run_id')
+    if run_id is None and request.is_json:
+        run_id = (request.get_json(silent=True) or {}).get('run_id')
+    return storage.validate_run_id(run_id)
 
 @reviews_bp.route('/health', methods=['GET'])
 def health_check():
     """Verificar que la API está funcionando"""
     return jsonify({"status": "ok", "timestamp": time.time()})
 
+@reviews_bp.route('/startup', methods=['GET'])
+def startup_report():
+    """Informe del coste de arranque del proceso: creación de la aplicación, importación de crewai y precarga"""
+    return jsonify(get_startup_report())
+
+@reviews_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Métricas de tokens, latencias, cachés y errores en formato de texto de Prometheus"""
+    return Response(metrics_registry.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
 @reviews_bp.route('/clean-outputs', methods=['POST'])
 def clean_outputs_endpoint():
     """Limpia la carpeta de outputs antes de iniciar un nuevo análisis"""
+    run_id = get_request_run_id()
     try:
-        clean_outputs()
+        clean_outputs(run_id)
         return jsonify({"status": "success", "message": "Outputs limpiados correctamente"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@reviews_bp.route('/llm-cache', methods=['GET'])
+def get_llm_cache_stats():
+    """Obtener los contadores de aciertos y fallos de la caché de respuestas del LLM"""
+    return jsonify(response_cache.stats())
+
+@reviews_bp.route('/llm-cache', methods=['DELETE'])
+def clear_llm_cache():
+    """Vaciar la caché de respuestas del LLM"""
+    response_cache.clear()
+    return jsonify({"status": "success", "message": "Caché de respuestas vaciada correctamente"}), 200
+
+@reviews_bp.route('/runs', methods=['POST'])
+def create_run():
+    """Crea una ejecución nueva con su propia carpeta de outputs"""
+    run_id = storage.new_run_id()
+    clean_outputs(run_id)
+    return jsonify({"run_id": run_id}), 201
+
+@reviews_bp.route('/runs', methods=['GET'])
+def get_runs():
+    """
+    Listar las ejecuciones con run_id existentes (con el backend SQLite, las
+    que tienen algún documento guardado en la base de datos)
+    """
+    return jsonify(output_store.list_runs())
+
 @reviews_bp.route('/phase1', methods=['POST'])
 def phase1_product_info():
     """
@@ -41,6 +107,10 @@ def phase1_product_info():
     Espera un JSON con:
     - product_url: URL del producto
     - model_name: (opcional) nombre del modelo a utilizar
+    - run_id: (opcional) ejecución en la que guardar los resultados
+    - use_product_cache: (opcional) reutilizar el producto cacheado para la misma URL (por defecto true)
+    - use_cache: (opcional) reutilizar respuestas del LLM de la caché de respuestas (por defecto false)
+    - force: (opcional) limpiar la ejecución y repetir la fase aunque el producto y el modelo no cambien (por defecto false)
     """
     data = request.json
     
@@ -49,13 +119,17 @@ def phase1_product_info():
     
     product_url = data['product_url']
     model_name = data.get('model_name', None)
+    use_product_cache = bool_param(data, 'use_product_cache', True)
+    use_cache = bool_param(data, 'use_cache')
+    force = bool_param(data, 'force')
+    run_id = get_request_run_id()
     
     try:
-        # Primero limpiar la carpeta de outputs
-        clean_outputs()
+        # Limpiar la carpeta de outputs solo si cambian el producto o el modelo
+        reset_run_if_changed(product_url, model_name, run_id, force)
         # Ejecutar fase 1
-        execute_phase1(product_url, model_name)
-        return jsonify({"status": "success", "message": "Fase 1 completada correctamente"}), 200
+        execute_phase1(product_url, model_name, run_id, use_product_cache, use_cache=use_cache, force=force)
+        return jsonify({"status": "success", "message": "Fase 1 completada correctamente", "run_id": run_id}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -68,19 +142,25 @@ def phase2_create_reviewers():
     - num_reviewers: número de reseñadores a crear
     - profile_parameters: parámetros de los perfiles a crear
     - model_name: (opcional) nombre del modelo a utilizar
+    - run_id: (opcional) ejecución en la que guardar los resultados
+    - use_cache: (opcional) reutilizar respuestas del LLM de la caché de respuestas (por defecto false)
+    - force: (opcional) repetir la fase aunque sus entradas no hayan cambiado (por defecto false)
     """
     data = request.json
     
     if not data or 'num_reviewers' not in data or 'profile_parameters' not in data:
         return jsonify({"error": "Se requieren el número de reseñadores y los parámetros de los perfiles"}), 400
     
-    num_reviewers = data['num_reviewers']
-    profile_parameters = data['profile_parameters']
+    num_reviewers = int_param(data, 'num_reviewers', minimum=0)
+    profile_parameters = profile_parameters_param(data) or {}
     model_name = data.get('model_name', None)
+    use_cache = bool_param(data, 'use_cache')
+    force = bool_param(data, 'force')
+    run_id = get_request_run_id()
     
     try:
-        execute_phase2(num_reviewers, profile_parameters, model_name)
-        return jsonify({"status": "success", "message": "Fase 2 completada correctamente"}), 200
+        execute_phase2(num_reviewers, profile_parameters, model_name, run_id, use_cache=use_cache, force=force)
+        return jsonify({"status": "success", "message": "Fase 2 completada correctamente", "run_id": run_id}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -93,6 +173,10 @@ def phase3_generate_reviews():
     - product_info: información del producto
     - user_profiles: perfiles de usuario
     - model_name: (opcional) nombre del modelo a utilizar
+    - concurrency: (opcional) número máximo de reseñas generadas en paralelo
+    - run_id: (opcional) ejecución en la que guardar los resultados
+    - use_cache: (opcional) reutilizar respuestas del LLM de la caché de respuestas (por defecto false)
+    - force: (opcional) regenerar también las reseñas cuyas entradas no han cambiado (por defecto false)
     """
     data = request.json
     
@@ -103,6 +187,10 @@ def phase3_generate_reviews():
     product_info = data.get('product_info')
     user_profiles = data.get('user_profiles')
     model_name = data.get('model_name', None)
+    concurrency = int_param(data, 'concurrency')
+    use_cache = bool_param(data, 'use_cache')
+    force = bool_param(data, 'force')
+    run_id = get_request_run_id()
     
     if not product_info:
         return jsonify({"error": "Se requiere product_info en el cuerpo de la petición"}), 400
@@ -111,11 +199,103 @@ def phase3_generate_reviews():
         return jsonify({"error": "Se requiere user_profiles en el cuerpo de la petición"}), 400
     
     try:
-        execute_phase3(product_info, user_profiles, model_name)
-        return jsonify({"status": "success", "message": "Fase 3 completada correctamente"}), 200
+        execute_phase3(product_info, user_profiles, model_name, concurrency, run_id, use_cache=use_cache,
+                       force=force)
+        return jsonify({"status": "success", "message": "Fase 3 completada correctamente", "run_id": run_id}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def sse_response(events, headers=None):
+    """Crea una respuesta Server-Sent Events a partir de un generador de eventos"""
+    return Response(
+        stream_with_context(events),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", **(headers or {})}
+    )
+
+@reviews_bp.route('/phase3/stream', methods=['POST'])
+def phase3_generate_reviews_stream():
+    """
+    Fase 3 con resultados incrementales (Server-Sent Events)
+    
+    Acepta el mismo JSON que /phase3. La fase se encola como un trabajo de la
+    cola de /jobs (con su límite y su cubo de tokens) y la respuesta es el
+    stream de eventos de su ejecución: phase_start, un evento review por cada
+    reseña según termina (con la reseña completa) y phase_end o phase_error con
+    la duración de la fase. El id del trabajo va en la cabecera X-Job-Id; si el
+    cliente se desconecta, el trabajo sigue y se puede consultar en /jobs/<id>.
+    """
+    data = request.json
+    
+    if not data:
+        return jsonify({"error": "Se requiere un cuerpo JSON válido"}), 400
+    
+    product_info = data.get('product_info')
+    user_profiles = data.get('user_profiles')
+    model_name = data.get('model_name', None)
+    concurrency = int_param(data, 'concurrency')
+    use_cache = bool_param(data, 'use_cache')
+    force = bool_param(data, 'force')
+    run_id = get_request_run_id()
+    
+    if not product_info:
+        return jsonify({"error": "Se requiere product_info en el cuerpo de la petición"}), 400
+    
+    if not user_profiles:
+        return jsonify({"error": "Se requiere user_profiles en el cuerpo de la petición"}), 400
+    
+    # Suscribirse antes de encolar la fase para no perder ningún evento
+    subscriber = event_broker.subscribe(run_id, replay=False)
+    params = {"model_name": model_name, "concurrency": concurrency, "use_cache": use_cache, "force": force}
+    try:
+        job = job_manager.submit_phase3(product_info, user_profiles, params, run_id)
+    except QueueFullError as e:
+        event_broker.unsubscribe(run_id, subscriber)
+        return jsonify({"error": str(e)}), 503
+    
+    def events():
+        try:
+            yield from stream_events(
+                subscriber,
+                until=lambda message: message["event"] in ("phase_end", "phase_error") and message["data"].get("phase") == "phase3"
+            )
+        finally:
+            event_broker.unsubscribe(run_id, subscriber)
+    
+    return sse_response(events(), {"X-Job-Id": job.id})
+
+@reviews_bp.route('/events', methods=['GET'])
+def stream_run_events():
+    """
+    Stream de eventos de progreso de una ejecución (Server-Sent Events)
+    
+    Query string:
+    - run_id: (opcional) ejecución a seguir
+    - until: (opcional) nombre de fase (phase1..phase4) o "run"; el stream se cierra
+      cuando termina esa fase o la ejecución completa
+    
+    Reenvía los eventos ya emitidos (o los posteriores a la cabecera Last-Event-ID).
+    """
+    run_id = get_request_run_id()
+    until = request.args.get('until')
+    last_event_id = request.headers.get('Last-Event-ID')
+    last_event_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+    
+    def finished(message):
+        if until == "run":
+            return message["event"] == "run_end"
+        return message["event"] in ("phase_end", "phase_error") and message["data"].get("phase") == until
+    
+    subscriber = event_broker.subscribe(run_id, last_event_id)
+    
+    def events():
+        try:
+            yield from stream_events(subscriber, until=finished if until else None)
+        finally:
+            event_broker.unsubscribe(run_id, subscriber)
+    
+    return sse_response(events())
+
 @reviews_bp.route('/phase4', methods=['POST'])
 def phase4_analyze_reviews():
     """
@@ -123,19 +303,27 @@ def phase4_analyze_reviews():
     
     Espera un JSON con:
     - model_name: (opcional) nombre del modelo a utilizar
+    - run_id: (opcional) ejecución cuyas reseñas se compilan
+    - use_cache: (opcional) reutilizar respuestas del LLM de la caché de respuestas (por defecto false)
+    - chunk_size: (opcional) reseñas por bloque en la compilación map-reduce
+    - force: (opcional) repetir la fase aunque sus entradas no hayan cambiado (por defecto false)
     """
     data = request.json
     model_name = data.get('model_name', None) if data else None
+    use_cache = bool_param(data, 'use_cache')
+    chunk_size = int_param(data, 'chunk_size')
+    force = bool_param(data, 'force')
+    run_id = get_request_run_id()
     
     try:
         # Verificar que existen reseñas
-        reviews = get_reviews()
+        reviews = get_reviews(run_id)
         
         if not reviews:
             return jsonify({"error": "No se ha ejecutado la fase 3 o no hay reseñas generadas"}), 400
         
-        execute_phase4(model_name)
-        return jsonify({"status": "success", "message": "Fase 4 completada correctamente"}), 200
+        execute_phase4(model_name, run_id, use_cache=use_cache, chunk_size=chunk_size, force=force)
+        return jsonify({"status": "success", "message": "Fase 4 completada correctamente", "run_id": run_id}), 200
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -148,7 +336,14 @@ def analyze_product_all_phases():
     Espera un JSON con:
     - product_url: URL del producto
     - num_reviewers: (opcional) número de reseñadores a crear
+    - profile_parameters: (opcional) parámetros de los perfiles a crear
     - model_name: (opcional) nombre del modelo a utilizar
+    - concurrency: (opcional) número máximo de reseñas generadas en paralelo
+    - run_id: (opcional) ejecución en la que guardar los resultados
+    - use_cache: (opcional) reutilizar respuestas del LLM de la caché de respuestas (por defecto false)
+    - force: (opcional) limpiar la ejecución y repetir todas las fases (por defecto false)
+    
+    Las fases cuyas entradas no han cambiado desde la última ejecución se saltan.
     """
     data = request.json
     
@@ -156,50 +351,279 @@ def analyze_product_all_phases():
         return jsonify({"error": "Se requiere la URL del producto"}), 400
     
     product_url = data['product_url']
-    num_reviewers = data.get('num_reviewers', 3)
+    num_reviewers = int_param(data, 'num_reviewers', 3)
     model_name = data.get('model_name', None)
+    concurrency = int_param(data, 'concurrency')
+    profile_parameters = profile_parameters_param(data) or {}
+    use_cache = bool_param(data, 'use_cache')
+    force = bool_param(data, 'force')
+    run_id = get_request_run_id()
     
     try:
-        # Primero limpiar la carpeta de outputs
-        clean_outputs()
-        
-        # Ejecutar fase 1
-        execute_phase1(product_url, model_name)
-        
-        # Ejecutar fase 2
-        phase2_results = execute_phase2(num_reviewers, model_name)
-        
-        # Ejecutar fase 3
-        phase3_results = execute_phase3(get_product_info(), get_reviewer_profiles(), model_name)
-        
-        # Ejecutar fase 4
-        execute_phase4(model_name)
-        
-        return jsonify({"status": "success", "message": "Análisis completo finalizado correctamente"}), 200
+        execute_all_phases(product_url, num_reviewers, profile_parameters, model_name, concurrency, run_id,
+                           use_cache=use_cache, force=force)
+        return jsonify({"status": "success", "message": "Análisis completo finalizado correctamente", "run_id": run_id}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@reviews_bp.route('/resume', methods=['POST'])
+def resume_analysis():
+    """
+    Reanudar una ejecución completa interrumpida o fallida
+    
+    Espera un JSON con:
+    - run_id: (opcional) ejecución a reanudar
+    - num_reviewers, profile_parameters, model_name, concurrency, use_cache:
+      (opcionales) parámetros que cambian respecto a los de la ejecución
+    
+    Solo se repite el trabajo que falta o cuyas entradas han cambiado.
+    """
+    data = request.get_json(silent=True) or {}
+    overrides = {'model_name': data['model_name']} if 'model_name' in data else {}
+    if 'profile_parameters' in data:
+        overrides['profile_parameters'] = profile_parameters_param(data) or {}
+    if 'num_reviewers' in data:
+        overrides['num_reviewers'] = int_param(data, 'num_reviewers')
+    if 'concurrency' in data:
+        overrides['concurrency'] = int_param(data, 'concurrency')
+    if 'use_cache' in data:
+        overrides['use_cache'] = bool_param(data, 'use_cache')
+    run_id = get_request_run_id()
+    
+    try:
+        resume_run(run_id, overrides)
+        return jsonify({"status": "success", "message": "Ejecución reanudada y completada correctamente", "run_id": run_id}), 200
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@reviews_bp.route('/extend', methods=['POST'])
+def extend_analysis():
+    """
+    Añadir reseñadores a una ejecución terminada
+    
+    Espera un JSON con:
+    - num_reviewers: número de reseñadores que se añaden
+    - run_id: (opcional) ejecución a ampliar
+    - model_name: (opcional) nombre del modelo a utilizar (por defecto el de la ejecución)
+    - profile_parameters: (opcional) parámetros de los perfiles nuevos (por defecto los de la ejecución)
+    - concurrency: (opcional) número máximo de reseñas generadas en paralelo
+    - chunk_size: (opcional) reseñas por bloque al analizar las reseñas nuevas
+    - use_cache: (opcional) reutilizar respuestas del LLM de la caché de respuestas (por defecto false)
+    
+    Solo se generan los perfiles y reseñas nuevos; el informe se actualiza a
+    partir de los agregados guardados y del informe anterior.
+    """
+    data = request.json
+    
+    num_reviewers = int_param(data, 'num_reviewers')
+    if num_reviewers is None:
+        return jsonify({"error": "Se requiere num_reviewers (entero positivo)"}), 400
+    
+    run_id = get_request_run_id()
+    use_cache = bool_param(data, 'use_cache')
+    concurrency = int_param(data, 'concurrency')
+    chunk_size = int_param(data, 'chunk_size')
+    profile_parameters = profile_parameters_param(data)
+    
+    try:
+        result = execute_extend_run(
+            num_reviewers,
+            data.get('model_name', None),
+            run_id,
+            use_cache=use_cache,
+            concurrency=concurrency,
+            profile_parameters=profile_parameters,
+            chunk_size=chunk_size
+        )
+        return jsonify({
+            "status": "success",
+            "message": "Ejecución ampliada correctamente",
+            "run_id": run_id,
+            "added_reviewers": len(result["added_profiles"]),
+            "added_reviews": len(result["added_reviews"]),
+            "total_reviews": result["total_reviews"]
+        }), 200
+    except IncompleteRunError as e:
+        return jsonify({"error": str(e)}), 409
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@reviews_bp.route('/checkpoints', methods=['GET'])
+def get_checkpoints():
+    """Obtener los parámetros guardados y las fases completadas de una ejecución"""
+    return jsonify(get_run_status(get_request_run_id()))
+
+@reviews_bp.route('/jobs', methods=['POST'])
+def submit_analysis_job():
+    """
+    Encolar un análisis completo en segundo plano
+    
+    Acepta el mismo JSON que /analyze-all y devuelve inmediatamente el ID del trabajo.
+    """
+    data = request.json
+    
+    if not data or 'product_url' not in data:
+        return jsonify({"error": "Se requiere la URL del producto"}), 400
+    
+    params = {
+        "product_url": data['product_url'],
+        "num_reviewers": int_param(data, 'num_reviewers', 3),
+        "profile_parameters": profile_parameters_param(data) or {},
+        "model_name": data.get('model_name', None),
+        "concurrency": int_param(data, 'concurrency'),
+        "use_cache": bool_param(data, 'use_cache')
+    }
+    
+    try:
+        job = job_manager.submit(params)
+    except QueueFullError as e:
+        return jsonify({"error": str(e)}), 503
+    
+    return jsonify({"job_id": job.id, "status": job.status}), 202
+
+@reviews_bp.route('/jobs', methods=['GET'])
+def list_jobs():
+    """Listar los trabajos conocidos y su estado"""
+    return jsonify([job.to_dict() for job in job_manager.list()])
+
+@reviews_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """Obtener el estado y el progreso por fase de un trabajo"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Trabajo no encontrado"}), 404
+    return jsonify(job.to_dict())
+
+@reviews_bp.route('/jobs/<job_id>/results', methods=['GET'])
+def get_job_results(job_id):
+    """Obtener los resultados de un trabajo terminado"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Trabajo no encontrado"}), 404
+    if job.status == "failed":
+        return jsonify({"error": job.error, "status": job.status}), 500
+    if job.status != "completed":
+        return jsonify({"error": "El trabajo todavía no ha terminado", "status": job.status}), 409
+    return jsonify(job.result)
+
+@reviews_bp.route('/batch', methods=['POST'])
+def submit_batch():
+    """
+    Encolar el análisis completo de varios productos
+    
+    Espera un JSON con:
+    - items: lista de URLs o de objetos con product_url y, opcionalmente,
+      num_reviewers, model_name, profile_parameters, concurrency y use_cache
+    - num_reviewers, model_name, profile_parameters, concurrency, use_cache:
+      (opcionales) valores por defecto para los elementos que no los indiquen
+    
+    Cada elemento se ejecuta como un trabajo independiente (con su propio run_id)
+    en la cola compartida de trabajos.
+    """
+    data = request.json
+    
+    items = data.get('items') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Se requiere una lista 'items' con las URLs de los productos"}), 400
+    if len(items) > settings.BATCH_MAX_ITEMS:
+        return jsonify({"error": f"El lote admite como mucho {settings.BATCH_MAX_ITEMS} elementos"}), 400
+    
+    defaults = {
+        "num_reviewers": int_param(data, 'num_reviewers', 3),
+        "profile_parameters": profile_parameters_param(data) or {},
+        "model_name": data.get('model_name', None),
+        "concurrency": int_param(data, 'concurrency'),
+        "use_cache": bool_param(data, 'use_cache')
+    }
+    params_list = []
+    for index, item in enumerate(items):
+        if isinstance(item, str):
+            item = {"product_url": item}
+        if not isinstance(item, dict) or not item.get('product_url'):
+            return jsonify({"error": f"El elemento {index} no tiene product_url"}), 400
+        try:
+            params_list.append({
+                "product_url": item['product_url'],
+                "num_reviewers": int_param(item, 'num_reviewers', defaults["num_reviewers"]),
+                "profile_parameters": profile_parameters_param(item, default=defaults["profile_parameters"]) or {},
+                "model_name": item.get('model_name', defaults["model_name"]),
+                "concurrency": int_param(item, 'concurrency', defaults["concurrency"]),
+                "use_cache": bool_param(item, 'use_cache', defaults["use_cache"])
+            })
+        except InvalidParameterError as e:
+            return jsonify({"error": f"Elemento {index}: {str(e)}"}), 400
+    
+    try:
+        batch = job_manager.submit_batch(params_list)
+    except QueueFullError as e:
+        return jsonify({"error": str(e)}), 503
+    
+    return jsonify(batch.to_dict()), 202
+
+@reviews_bp.route('/batch', methods=['GET'])
+def list_batches():
+    """Listar los lotes conocidos y el estado de sus elementos"""
+    return jsonify([batch.to_dict() for batch in job_manager.list_batches()])
+
+@reviews_bp.route('/batch/<batch_id>', methods=['GET'])
+def get_batch(batch_id):
+    """
+    Obtener el estado de un lote con los resultados y errores de cada elemento
+    (?include_results=false para omitir los resultados)
+    """
+    batch = job_manager.get_batch(batch_id)
+    if batch is None:
+        return jsonify({"error": "Lote no encontrado"}), 404
+    include_results = request.args.get('include_results', 'true').lower() != 'false'
+    return jsonify(batch.to_dict(include_results))
+
 @reviews_bp.route('/results', methods=['GET'])
 def get_results():
     """Obtener todos los resultados generados hasta el momento"""
-    return jsonify(get_all_results())
+    run_id = get_request_run_id()
+    return conditional_json(get_results_version("results", run_id), lambda: get_all_results(run_id))
 
 @reviews_bp.route('/product', methods=['GET'])
 def get_product():
     """Obtener la información del producto analizado"""
-    return jsonify(get_product_info())
+    run_id = get_request_run_id()
+    return conditional_json(get_results_version("product", run_id), lambda: get_product_info(run_id))
 
 @reviews_bp.route('/reviewers', methods=['GET'])
 def get_reviewers():
-    """Obtener perfiles de los reseñadores"""
-    return jsonify(get_reviewer_profiles())
+    """
+    Obtener perfiles de los reseñadores
+    
+    Sin parámetros devuelve la lista completa. Con limit, cursor, fields o
+    filtros (gender, education_level, age_min, age_max, age_band) devuelve
+    una página {items, next_cursor, limit}.
+    """
+    run_id = get_request_run_id()
+    if has_query_params("reviewers", request.args):
+        query = PageQuery("reviewers", request.args)
+        return conditional_json(query_version(query, run_id), lambda: query_page(query, run_id))
+    return conditional_json(get_results_version("reviewers", run_id), lambda: get_reviewer_profiles(run_id))
 
 @reviews_bp.route('/reviews', methods=['GET'])
 def get_all_reviews():
-    """Obtener todas las reseñas generadas"""
-    return jsonify(get_reviews())
+    """
+    Obtener las reseñas generadas
+    
+    Sin parámetros devuelve la lista completa. Con limit, cursor, fields o
+    filtros (rating_min, rating_max, bot_id y los atributos del reseñador
+    gender, education_level, age_min, age_max, age_band) devuelve una página
+    {items, next_cursor, limit}.
+    """
+    run_id = get_request_run_id()
+    if has_query_params("reviews", request.args):
+        query = PageQuery("reviews", request.args)
+        return conditional_json(query_version(query, run_id), lambda: query_page(query, run_id))
+    return conditional_json(get_results_version("reviews", run_id), lambda: get_reviews(run_id))
 
 @reviews_bp.route('/analysis', methods=['GET'])
 def get_results_analysis():
     """Obtener el análisis final de las reseñas"""
-    return jsonify(get_analysis()) 
\ No newline at end of file
+    run_id = get_request_run_id()
+    return conditional_json(get_results_version("analysis", run_id), lambda: get_analysis(run_id))
\ No newline at end of file
@@ -25,7 +25,13 @@ sys.path.insert(0, crewapi_dir)
 from api import create_app
 
 if __name__ == "__main__":
+    # Servidor de desarrollo; en producción usar wsgi.py con gunicorn
+    debug = os.getenv("FLASK_DEBUG", "0") == "1"
     print("Iniciando API de análisis de productos...")
     print(f"Python Path: {sys.path}")
     app = create_app()
-    app.run(debug=True, host="0.0.0.0", port=5000) 
\ No newline at end of file
+    # Con el recargador de Flask (debug) solo precarga el proceso que sirve las peticiones
+    if not debug or os.getenv("WERKZEUG_RUN_MAIN") == "true":
+        from api.services.startup_service import start_warmup
+        start_warmup()
+    app.run(debug=debug, host=os.getenv("HOST", "0.0.0.0"), port=int(os.getenv("PORT", "5000"))) 
\ No newline at end of file
@@ -4,6 +4,9 @@ from api.services.crew_service import (
     execute_phase1,
     execute_phase2,
     execute_phase3,
-    execute_phase4
+    execute_phase4,
+    execute_all_phases
 )
-from api.services.results_service import get_all_results, get_product_info, get_reviewer_profiles, get_reviews, get_analysis 
\ No newline at end of file
+from api.services.results_service import get_all_results, get_product_info, get_reviewer_profiles, get_reviews, get_analysis, get_results_version
+from api.services.job_service import job_manager
+from api.services.query_service import query_page, InvalidQueryError
@@ -1,96 +1,108 @@
 import os
 import json
-import shutil
-from typing import Dict, Any, List
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, List, Callable
 
-# Importación directa simple del módulo crewAPI
-from crewAPI import run_phase1, run_phase2, run_phase3, run_phase4
+# crewAPI carga crew.py (y crewai) de forma perezosa: las funciones de las fases
+# se resuelven al llamarlas, no al importar este módulo
+import crewAPI
+from crewAPI import track_phase
+from crewAPI import checkpoints
+from crewAPI import output_store
+from crewAPI import storage
+from api.services.results_service import get_product_info, get_reviewer_profiles, get_all_results, results_cache
+from api.services.event_service import event_broker
 
-# Definir la ruta de la carpeta outputs
-outputs_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "crewAPI", "outputs")
+@contextmanager
+def phase_events(phase: str, run_id: str = None, model_name: str = None):
+    """
+    Publica los eventos phase_start / phase_end (o phase_error) de una fase con
+    su duración y la registra en las métricas
+    """
+    started = time.time()
+    event_broker.publish(run_id, "phase_start", {"phase": phase, "run_id": run_id})
+    try:
+        with track_phase(phase, model_name):
+            yield started
+    except Exception as e:
+        event_broker.publish(run_id, "phase_error", {
+            "phase": phase, "run_id": run_id, "error": str(e), "duration": time.time() - started
+        })
+        raise
+    finally:
+        # La fase ha escrito sus resultados: los GET deben leer la versión nueva
+        results_cache.invalidate(run_id)
+    event_broker.publish(run_id, "phase_end", {"phase": phase, "run_id": run_id, "duration": time.time() - started})
 
-def clean_outputs():
+def clean_outputs(run_id: str = None):
     """
-    Limpia la carpeta de outputs de crewAPI eliminando todos sus contenidos.
+    Limpia los outputs de una ejecución eliminando todos sus contenidos.
+    
+    Args:
+        run_id: Identificador de la ejecución (opcional, por defecto la ejecución compartida)
     
     Returns:
         Un diccionario indicando el resultado de la operación
     """
     try:
-        print("Limpiando carpeta de outputs...")
-        
-        # Verificar si la carpeta existe
-        if os.path.exists(outputs_dir):
-            # Eliminar todos los archivos y subdirectorios
-            for item in os.listdir(outputs_dir):
-                item_path = os.path.join(outputs_dir, item)
-                
-                if os.path.isfile(item_path):
-                    os.remove(item_path)
-                elif os.path.isdir(item_path):
-                    shutil.rmtree(item_path)
-            
-            print("Carpeta de outputs limpiada correctamente")
-            return {"status": "success", "message": "Carpeta de outputs limpiada correctamente"}
-        else:
-            # Crear la carpeta si no existe
-            os.makedirs(outputs_dir, exist_ok=True)
-            print("Carpeta de outputs creada")
-            return {"status": "success", "message": "Carpeta de outputs creada"}
+        print(f"Limpiando outputs de la ejecución {run_id or 'compartida'}...")
+        storage.clean_run(run_id)
+        output_store.delete_run(run_id)
+        results_cache.invalidate(run_id)
+        event_broker.reset(run_id)
+        print("Carpeta de outputs limpiada correctamente")
+        return {"status": "success", "message": "Carpeta de outputs limpiada correctamente"}
     except Exception as e:
         error_msg = f"Error al limpiar la carpeta de outputs: {str(e)}"
         print(error_msg)
         return {"status": "error", "message": error_msg}
 
-def load_json_file(file_path):
-    """Carga un archivo JSON de manera segura"""
-    try:
-        if not os.path.exists(file_path):
-            return {}
-        
-        if os.path.getsize(file_path) == 0:
-            return {}
-        
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return data
-    except Exception as e:
-        return {}
-
-def load_reviews(reviews_dir):
-    """Carga todas las reseñas del directorio de reseñas"""
-    reviews = []
-    if os.path.exists(reviews_dir):
-        for filename in os.listdir(reviews_dir):
-            if filename.endswith('.json'):
-                file_path = os.path.join(reviews_dir, filename)
-                try:
-                    data = load_json_file(file_path)
-                    reviews.append(data)
-                except Exception as e:
-                    print(f"Error al cargar el archivo de reseña {filename}: {e}")
-    return reviews
-
-def execute_phase1(product_url: str, model_name: str = None) -> Dict[str, Any]:
+def reset_run_if_changed(product_url: str, model_name: str = None, run_id: str = None, force: bool = False) -> bool:
+    """
+    Limpia los outputs de la ejecución solo si se va a analizar otro producto u
+    otro modelo que en su fase 1 (o con force). Si no cambian se conservan, y
+    las fases y reseñas cuyas entradas no cambien no se repiten.
+    
+    Returns:
+        True si se ha limpiado la ejecución
+    """
+    unchanged = checkpoints.is_valid(
+        run_id, "phase1", checkpoints.phase1_inputs(product_url, model_name), storage.get_product_info_file(run_id)
+    )
+    if force or not unchanged:
+        clean_outputs(run_id)
+        return True
+    print(f"Ejecución {run_id or 'compartida'} sin cambios en la fase 1: se conservan sus outputs")
+    return False
+
+def execute_phase1(product_url: str, model_name: str = None, run_id: str = None,
+                   use_product_cache: bool = True, use_cache: bool = False, force: bool = False) -> Dict[str, Any]:
     """
     Fase 1: Extrae información del producto.
     
     Args:
         product_url: URL del producto a analizar
         model_name: Nombre del modelo LLM a utilizar (opcional)
+        run_id: Identificador de la ejecución (opcional)
+        use_product_cache: Si se reutiliza el producto cacheado para la misma URL (por defecto True)
+        use_cache: Si se reutilizan respuestas del LLM de la caché de respuestas (por defecto False)
+        force: Si se repite la fase aunque sus entradas no hayan cambiado (por defecto False)
         
     Returns:
         Diccionario con la información del producto
     """
     try:
         print("Ejecutando fase 1: Extracción de información del producto...")
-        phase1_results = run_phase1(product_url, model_name)
-        return phase1_results.json_dict
+        with phase_events("phase1", run_id, model_name):
+            return crewAPI.run_phase1(product_url, model_name, run_id, use_product_cache, use_cache=use_cache,
+                                      force=force)
     except Exception as e:
         print(f"Error durante la fase 1: {str(e)}")
         raise
 
-def execute_phase2(num_reviewers: int, profile_parameters: Dict[str, Any], model_name: str = None) -> Dict[str, Any]:
+def execute_phase2(num_reviewers: int, profile_parameters: Dict[str, Any], model_name: str = None,
+                   run_id: str = None, use_cache: bool = False, force: bool = False) -> Dict[str, Any]:
     """
     Fase 2: Crea perfiles de usuario.
     
@@ -98,19 +110,25 @@ def execute_phase2(num_reviewers: int, profile_parameters: Dict[str, Any], model
         num_reviewers: Número de perfiles de reseñadores a generar
         profile_parameters: Parámetros de los perfiles de usuario
         model_name: Nombre del modelo LLM a utilizar (opcional)
+        run_id: Identificador de la ejecución (opcional)
+        use_cache: Si se reutilizan respuestas del LLM de la caché de respuestas (por defecto False)
+        force: Si se repite la fase aunque sus entradas no hayan cambiado (por defecto False)
         
     Returns:
         Diccionario con los perfiles de usuario
     """
     try:
         print("Ejecutando fase 2: Creación de perfiles de usuario...")
-        phase2_results = run_phase2(num_reviewers, profile_parameters, model_name)
-        return phase2_results.to_dict()
+        with phase_events("phase2", run_id, model_name):
+            return crewAPI.run_phase2(num_reviewers, profile_parameters, model_name, run_id, use_cache=use_cache,
+                                      force=force)
     except Exception as e:
         print(f"Error durante la fase 2: {str(e)}")
         raise
 
-def execute_phase3(product_info: Dict[str, Any], user_profiles: List[Dict[str, Any]], model_name: str = None) -> List[Dict[str, Any]]:
+def execute_phase3(product_info: Dict[str, Any], user_profiles: List[Dict[str, Any]], model_name: str = None,
+                   concurrency: int = None, run_id: str = None, use_cache: bool = False,
+                   force: bool = False) -> List[Dict[str, Any]]:
     """
     Fase 3: Genera reseñas basadas en la información del producto y los perfiles de usuario.
     
@@ -118,36 +136,194 @@ def execute_phase3(product_info: Dict[str, Any], user_profiles: List[Dict[str, A
         product_info: Información del producto (resultado de fase 1)
         user_profiles: Perfiles de usuario (resultado de fase 2)
         model_name: Nombre del modelo LLM a utilizar (opcional)
+        concurrency: Número máximo de reseñas generadas en paralelo (opcional)
+        run_id: Identificador de la ejecución (opcional)
+        use_cache: Si se reutilizan respuestas del LLM de la caché de respuestas (por defecto False)
+        force: Si se regeneran también las reseñas cuyas entradas no han cambiado (por defecto False)
         
     Returns:
         Lista de reseñas generadas
     """
     try:
         print("Ejecutando fase 3: Generación de reseñas...")
-        phase3_results = run_phase3(product_info, user_profiles, model_name)
-        return phase3_results
+        with phase_events("phase3", run_id, model_name) as started:
+            def on_review(index, review):
+                event_broker.publish(run_id, "review", {
+                    "phase": "phase3", "run_id": run_id, "index": index, "review": review,
+                    "elapsed": time.time() - started, "total": len(user_profiles)
+                })
+
+            return crewAPI.run_phase3(product_info, user_profiles, model_name, concurrency, run_id,
+                                      use_cache=use_cache, on_review=on_review, force=force)
     except Exception as e:
         print(f"Error durante la fase 3: {str(e)}")
         raise
 
-def execute_phase4(model_name: str = None) -> Dict[str, Any]:
+def execute_phase4(model_name: str = None, run_id: str = None, use_cache: bool = False,
+                   chunk_size: int = None, force: bool = False) -> Dict[str, Any]:
     """
     Fase 4: Compila reseñas y genera informe final.
     
     Args:
         model_name: Nombre del modelo LLM a utilizar (opcional)
+        run_id: Identificador de la ejecución (opcional)
+        use_cache: Si se reutilizan respuestas del LLM de la caché de respuestas (por defecto False)
+        chunk_size: Reseñas por bloque en la compilación map-reduce (opcional)
+        force: Si se repite la fase aunque sus entradas no hayan cambiado (por defecto False)
         
     Returns:
         Diccionario con el análisis de las reseñas
     """
     try:
         print("Ejecutando fase 4: Compilación de reseñas y generación de informe...")
-        phase4_results = run_phase4(model_name)
-        return phase4_results.json_dict
+        with phase_events("phase4", run_id, model_name):
+            return crewAPI.run_phase4(model_name, run_id, use_cache=use_cache, chunk_size=chunk_size, force=force)
     except Exception as e:
         print(f"Error durante la fase 4: {str(e)}")
         raise
 
+def execute_extend_run(num_reviewers: int, model_name: str = None, run_id: str = None, use_cache: bool = False,
+                       concurrency: int = None, profile_parameters: Dict[str, Any] = None,
+                       chunk_size: int = None) -> Dict[str, Any]:
+    """
+    Amplía una ejecución terminada con más reseñadores y actualiza su informe.
+    
+    Args:
+        num_reviewers: Número de reseñadores que se añaden
+        model_name: Nombre del modelo LLM a utilizar (opcional, por defecto el de la ejecución)
+        run_id: Identificador de la ejecución (opcional)
+        use_cache: Si se reutilizan respuestas del LLM de la caché de respuestas (por defecto False)
+        concurrency: Número máximo de reseñas generadas en paralelo (opcional)
+        profile_parameters: Parámetros de los perfiles nuevos (opcional, por defecto los de la ejecución)
+        chunk_size: Reseñas por bloque al analizar las reseñas nuevas (opcional)
+        
+    Returns:
+        Diccionario con los perfiles y reseñas añadidos, el total de reseñas y el informe actualizado
+    """
+    try:
+        print(f"Ampliando la ejecución con {num_reviewers} reseñadores...")
+        with phase_events("extend", run_id, model_name) as started:
+            def on_review(index, review):
+                event_broker.publish(run_id, "review", {
+                    "phase": "extend", "run_id": run_id, "index": index, "review": review,
+                    "elapsed": time.time() - started
+                })
+
+            return crewAPI.extend_run(num_reviewers, model_name, run_id, use_cache=use_cache, concurrency=concurrency,
+                                      profile_parameters=profile_parameters, chunk_size=chunk_size,
+                                      on_review=on_review)
+    except Exception as e:
+        print(f"Error durante la ampliación: {str(e)}")
+        raise
+
+PHASES = ("phase1", "phase2", "phase3", "phase4")
+
+def execute_all_phases(product_url: str, num_reviewers: int = 3, profile_parameters: Dict[str, Any] = None,
+                       model_name: str = None, concurrency: int = None, run_id: str = None,
+                       use_cache: bool = False, on_phase: Callable[[str, str], None] = None,
+                       force: bool = False) -> str:
+    """
+    Ejecuta las cuatro fases en secuencia.
+    
+    La ejecución solo se limpia si cambian el producto o el modelo (o con
+    force); si no, cada fase comprueba sus checkpoints y solo se repite el
+    trabajo cuyas entradas han cambiado.
+    
+    Args:
+        product_url: URL del producto a analizar
+        num_reviewers: Número de perfiles de reseñadores a generar
+        profile_parameters: Parámetros de los perfiles de usuario (opcional)
+        model_name: Nombre del modelo LLM a utilizar (opcional)
+        concurrency: Número máximo de reseñas generadas en paralelo (opcional)
+        run_id: Identificador de la ejecución (opcional, por defecto la ejecución compartida)
+        use_cache: Si se reutilizan respuestas del LLM de la caché de respuestas (por defecto False)
+        on_phase: Callback opcional que recibe (fase, estado) al empezar y terminar cada fase
+        force: Si se limpia la ejecución y se repiten todas las fases (por defecto False)
+    
+    Returns:
+        El run_id de la ejecución
+    """
+
+    def notify(phase, status):
+        if on_phase:
+            on_phase(phase, status)
+
+    steps = (
+        lambda: execute_phase1(product_url, model_name, run_id, use_cache=use_cache),
+        lambda: execute_phase2(num_reviewers, profile_parameters or {}, model_name, run_id, use_cache=use_cache),
+        lambda: execute_phase3(get_product_info(run_id), get_reviewer_profiles(run_id), model_name, concurrency, run_id,
+                               use_cache=use_cache),
+        lambda: execute_phase4(model_name, run_id, use_cache=use_cache),
+    )
+
+    reset_run_if_changed(product_url, model_name, run_id, force)
+    checkpoints.save_run_params(run_id, {
+        "product_url": product_url,
+        "num_reviewers": num_reviewers,
+        "profile_parameters": profile_parameters or {},
+        "model_name": model_name,
+        "concurrency": concurrency,
+        "use_cache": use_cache
+    })
+    started = time.time()
+    event_broker.publish(run_id, "run_start", {"run_id": run_id})
+    for phase, step in zip(PHASES, steps):
+        notify(phase, "running")
+        try:
+            step()
+        except Exception as e:
+            notify(phase, "failed")
+            event_broker.publish(run_id, "run_end", {
+                "run_id": run_id, "status": "failed", "error": str(e), "duration": time.time() - started
+            })
+            raise
+        notify(phase, "completed")
+    event_broker.publish(run_id, "run_end", {"run_id": run_id, "status": "completed", "duration": time.time() - started})
+    return run_id
+
+def resume_run(run_id: str = None, overrides: Dict[str, Any] = None,
+               on_phase: Callable[[str, str], None] = None) -> str:
+    """
+    Reanuda una ejecución completa con los parámetros con los que se lanzó.
+    
+    Las fases ya terminadas con las mismas entradas se saltan y la fase 3 solo
+    genera las reseñas que faltan. Los parámetros de overrides sustituyen a los
+    guardados (por ejemplo otro concurrency o más reseñadores).
+    
+    Args:
+        run_id: Identificador de la ejecución (opcional, por defecto la ejecución compartida)
+        overrides: Parámetros que cambian respecto a los guardados (opcional)
+        on_phase: Callback opcional que recibe (fase, estado) al empezar y terminar cada fase
+    
+    Returns:
+        El run_id de la ejecución
+    
+    Raises:
+        LookupError: Si la ejecución no tiene parámetros guardados
+    """
+    params = checkpoints.load_run_params(run_id)
+    if not params:
+        raise LookupError(f"La ejecución {run_id or 'compartida'} no tiene parámetros guardados para reanudarla")
+    params = {**params, **(overrides or {})}
+    return execute_all_phases(
+        params["product_url"],
+        params.get("num_reviewers", 3),
+        params.get("profile_parameters"),
+        params.get("model_name"),
+        params.get("concurrency"),
+        run_id,
+        use_cache=params.get("use_cache", False),
+        on_phase=on_phase
+    )
+
+def get_run_status(run_id: str = None) -> Dict[str, Any]:
+    """Parámetros guardados y fases completadas (con salida intacta) de una ejecución"""
+    return {
+        "run_id": run_id,
+        "params": checkpoints.load_run_params(run_id),
+        "completed_phases": sorted(checkpoints.completed_phases(run_id))
+    }
+
 def execute_product_analysis(product_url: str, num_reviewers: int = 3, model_name: str = None) -> Dict[str, Any]:
     """
     Ejecuta el análisis completo del producto utilizando el sistema CrewAI.
@@ -161,28 +337,8 @@ def execute_product_analysis(product_url: str, num_reviewers: int = 3, model_nam
         Diccionario con los resultados del análisis
     """
     try:
-        # Fase 1: Extraer información del producto
-        product_info = execute_phase1(product_url, model_name)
-        
-        # Fase 2: Crear perfiles de usuario
-        phase2_results = execute_phase2(num_reviewers, model_name)
-        user_profiles = phase2_results['profiles']
-        
-        # Fase 3: Generar reseñas
-        reviews = execute_phase3(product_info, user_profiles, model_name).to_dict()
-        
-        # Fase 4: Compilar reseñas y generar informe final
-        analysis = execute_phase4(model_name)
-        
-        # Construir y devolver respuesta
-        response = {
-            "product": product_info,
-            "reviewers": user_profiles,
-            "reviews": reviews,
-            "analysis": analysis
-        }
-        
-        return response
+        run_id = execute_all_phases(product_url, num_reviewers, model_name=model_name)
+        return get_all_results(run_id)
     except Exception as e:
         print(f"Error durante la ejecución del análisis: {str(e)}")
-        raise 
\ No newline at end of file
+        raise
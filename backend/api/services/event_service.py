@@ -0,0 +1,101 @@
+import json
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional
+
+from api import settings
+
+SHARED_CHANNEL = "shared"
+
+class EventChannel:
+    """Eventos de una ejecución: historial acotado y suscriptores en vivo"""
+
+    def __init__(self, max_history: int):
+        self.history: List[Dict[str, Any]] = []
+        self.subscribers: List[queue.Queue] = []
+        self.max_history = max_history
+        self.next_id = 1
+
+class EventBroker:
+    """
+    Publica eventos de progreso por ejecución (run_id) y los reparte entre los
+    suscriptores. Cada canal guarda un historial acotado para que un cliente
+    que se conecta tarde (o reconecta con Last-Event-ID) no pierda eventos.
+    """
+
+    def __init__(self, max_history: int, max_channels: int):
+        self._channels: "OrderedDict[str, EventChannel]" = OrderedDict()
+        self._max_history = max_history
+        self._max_channels = max_channels
+        self._lock = threading.Lock()
+
+    def _channel(self, run_id: Optional[str]) -> EventChannel:
+        key = run_id or SHARED_CHANNEL
+        channel = self._channels.get(key)
+        if channel is None:
+            channel = self._channels[key] = EventChannel(self._max_history)
+            while len(self._channels) > self._max_channels:
+                self._channels.popitem(last=False)
+        self._channels.move_to_end(key)
+        return channel
+
+    def publish(self, run_id: Optional[str], event: str, data: Dict[str, Any]):
+        with self._lock:
+            channel = self._channel(run_id)
+            message = {"id": channel.next_id, "event": event, "data": data, "timestamp": time.time()}
+            channel.next_id += 1
+            channel.history.append(message)
+            del channel.history[:-channel.max_history]
+            subscribers = list(channel.subscribers)
+        for subscriber in subscribers:
+            subscriber.put(message)
+
+    def reset(self, run_id: Optional[str]):
+        """Olvida el historial de una ejecución (p. ej. al limpiar sus outputs)"""
+        with self._lock:
+            self._channel(run_id).history.clear()
+
+    def subscribe(self, run_id: Optional[str], last_event_id: int = None, replay: bool = True) -> queue.Queue:
+        """
+        Devuelve una cola con los eventos nuevos de la ejecución. Con replay se
+        encolan antes los eventos del historial posteriores a last_event_id.
+        """
+        subscriber = queue.Queue()
+        with self._lock:
+            channel = self._channel(run_id)
+            if replay:
+                for message in channel.history:
+                    if last_event_id is None or message["id"] > last_event_id:
+                        subscriber.put(message)
+            channel.subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, run_id: Optional[str], subscriber: queue.Queue):
+        with self._lock:
+            channel = self._channels.get(run_id or SHARED_CHANNEL)
+            if channel and subscriber in channel.subscribers:
+                channel.subscribers.remove(subscriber)
+
+def format_sse(message: Dict[str, Any]) -> str:
+    """Serializa un evento en formato Server-Sent Events"""
+    data = json.dumps({**message["data"], "timestamp": message["timestamp"]}, ensure_ascii=False)
+    return f"id: {message['id']}\nevent: {message['event']}\ndata: {data}\n\n"
+
+def stream_events(subscriber: queue.Queue, until=None) -> Iterator[str]:
+    """
+    Genera los eventos de una suscripción en formato SSE. Envía un comentario
+    de keep-alive si no hay eventos y termina cuando `until(message)` es cierto.
+    """
+    while True:
+        try:
+            message = subscriber.get(timeout=settings.SSE_HEARTBEAT_SECONDS)
+        except queue.Empty:
+            yield ": keep-alive\n\n"
+            continue
+        yield format_sse(message)
+        if until is not None and until(message):
+            return
+
+event_broker = EventBroker(settings.EVENT_HISTORY_LIMIT, settings.EVENT_CHANNELS_LIMIT)
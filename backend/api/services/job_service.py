@@ -0,0 +1,282 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+
+from api import settings
+from crewAPI import storage, TokenBucket
+from api.services.crew_service import PHASES, execute_all_phases, execute_phase3
+from api.services.results_service import get_all_results
+
+class QueueFullError(Exception):
+    """Se lanza cuando la cola de trabajos ha alcanzado su límite"""
+
+# Tipos de trabajo: el análisis completo o solo la fase 3 (la de /api/phase3/stream)
+JOB_KINDS = {"analysis": PHASES, "phase3": ("phase3",)}
+
+class Job:
+    """
+    Estado de un trabajo ejecutado en segundo plano: un análisis completo en su
+    propia ejecución o, con kind="phase3", la fase 3 de la ejecución `run_id`
+    con las entradas de `inputs` (que no se incluyen en el estado)
+    """
+
+    def __init__(self, params: Dict[str, Any], batch_id: str = None, kind: str = "analysis",
+                 run_id: str = None, inputs: Dict[str, Any] = None):
+        self.id = storage.new_run_id()
+        self.kind = kind
+        self.run_id = self.id if kind == "analysis" else run_id
+        self.params = params
+        self.inputs = inputs or {}
+        self.batch_id = batch_id
+        self.status = "queued"
+        self.phases = {phase: {"status": "pending", "started_at": None, "finished_at": None}
+                       for phase in JOB_KINDS[kind]}
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self._lock = threading.Lock()
+
+    def update_phase(self, phase: str, status: str):
+        """Actualiza el estado de una fase; se usa como callback de execute_all_phases"""
+        with self._lock:
+            info = self.phases[phase]
+            info["status"] = status
+            if status == "running":
+                info["started_at"] = time.time()
+            else:
+                info["finished_at"] = time.time()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    @property
+    def estimated_tokens(self) -> int:
+        """Tokens que se reservan del límite global antes de ejecutar el trabajo"""
+        base = settings.JOB_TOKENS_BASE if self.kind == "analysis" else 0
+        return base + settings.JOB_TOKENS_PER_REVIEWER * int(self.params.get("num_reviewers") or 0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            completed = sum(1 for info in self.phases.values() if info["status"] == "completed")
+            return {
+                "job_id": self.id,
+                "kind": self.kind,
+                "run_id": self.run_id,
+                "batch_id": self.batch_id,
+                "status": self.status,
+                "params": self.params,
+                "phases": {phase: dict(info) for phase, info in self.phases.items()},
+                "progress": completed / len(self.phases),
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "error": self.error
+            }
+
+class Batch:
+    """Lote de análisis: un trabajo por URL, que se ejecutan en la cola compartida"""
+
+    def __init__(self, jobs: List[Job], batch_id: str):
+        self.id = batch_id
+        self.jobs = jobs
+        self.created_at = time.time()
+
+    @property
+    def finished(self) -> bool:
+        return all(job.finished for job in self.jobs)
+
+    @property
+    def status(self) -> str:
+        statuses = [job.status for job in self.jobs]
+        if not self.finished:
+            return "queued" if all(status == "queued" for status in statuses) else "running"
+        failed = statuses.count("failed")
+        if failed == 0:
+            return "completed"
+        return "failed" if failed == len(statuses) else "partial"
+
+    def to_dict(self, include_results: bool = False) -> Dict[str, Any]:
+        items = []
+        for index, job in enumerate(self.jobs):
+            item = {
+                "index": index,
+                "product_url": job.params["product_url"],
+                "num_reviewers": job.params.get("num_reviewers"),
+                "model_name": job.params.get("model_name"),
+                "job_id": job.id,
+                "run_id": job.run_id,
+                "status": job.status,
+                "error": job.error,
+                "started_at": job.started_at,
+                "finished_at": job.finished_at
+            }
+            if include_results:
+                item["result"] = job.result
+            items.append(item)
+        finished_at = [job.finished_at for job in self.jobs if job.finished_at]
+        return {
+            "batch_id": self.id,
+            "status": self.status,
+            "total": len(self.jobs),
+            "counts": {status: sum(1 for job in self.jobs if job.status == status)
+                       for status in ("queued", "throttled", "running", "completed", "failed")},
+            "created_at": self.created_at,
+            "finished_at": max(finished_at) if self.finished and finished_at else None,
+            "items": items
+        }
+
+class JobManager:
+    """
+    Cola de trabajos con un pool de workers acotado.
+
+    Los trabajos se ejecutan en hilos del pool y cada uno escribe en su propia
+    ejecución (run_id igual al id del trabajo). Su estado se guarda en memoria y
+    solo se conservan los últimos `max_finished_jobs` trabajos terminados.
+
+    Con `tokens_per_minute` cada trabajo reserva, antes de empezar, una
+    estimación de sus tokens de un cubo compartido por todos los trabajos y
+    lotes; mientras espera su estado es "throttled".
+    """
+
+    def __init__(self, max_workers: int, queue_limit: int, max_finished_jobs: int,
+                 tokens_per_minute: int = 0, max_finished_batches: int = 20):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._queue_limit = queue_limit
+        self._max_finished_jobs = max_finished_jobs
+        self._max_finished_batches = max_finished_batches
+        self._token_bucket = TokenBucket.per_minute(tokens_per_minute) if tokens_per_minute > 0 else None
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._batches: "OrderedDict[str, Batch]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, params: Dict[str, Any]) -> Job:
+        """Encola un análisis completo y devuelve el trabajo creado"""
+        return self._enqueue([Job(params)])[0]
+
+    def submit_phase3(self, product_info: Dict[str, Any], user_profiles: List[Dict[str, Any]],
+                      params: Dict[str, Any], run_id: str = None) -> Job:
+        """
+        Encola la fase 3 de una ejecución. Cuenta para el límite de la cola y
+        reserva sus tokens como cualquier otro trabajo.
+
+        Args:
+            params: model_name, concurrency, use_cache y force
+        """
+        job = Job({**params, "num_reviewers": len(user_profiles)}, kind="phase3", run_id=run_id,
+                  inputs={"product_info": product_info, "user_profiles": user_profiles})
+        return self._enqueue([job])[0]
+
+    def submit_batch(self, items: List[Dict[str, Any]]) -> Batch:
+        """
+        Encola un análisis completo por elemento del lote. El lote se acepta
+        entero o se rechaza entero si no cabe en la cola.
+        """
+        batch_id = storage.new_run_id()
+        batch = Batch(self._enqueue([Job(params, batch_id) for params in items]), batch_id)
+        with self._lock:
+            self._batches[batch.id] = batch
+            finished = [key for key, value in self._batches.items() if value.finished]
+            for key in finished[:max(0, len(finished) - self._max_finished_batches)]:
+                del self._batches[key]
+        return batch
+
+    def _enqueue(self, jobs: List[Job]) -> List[Job]:
+        with self._lock:
+            pending = sum(1 for job in self._jobs.values() if not job.finished)
+            if pending + len(jobs) > self._queue_limit:
+                raise QueueFullError(
+                    f"La cola de trabajos está llena ({pending} trabajos pendientes, límite {self._queue_limit})"
+                )
+            for job in jobs:
+                self._jobs[job.id] = job
+            self._prune()
+        for job in jobs:
+            self._executor.submit(self._run, job)
+        return jobs
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def get_batch(self, batch_id: str) -> Optional[Batch]:
+        with self._lock:
+            return self._batches.get(batch_id)
+
+    def list_batches(self) -> List[Batch]:
+        with self._lock:
+            return list(self._batches.values())
+
+    def shutdown(self, wait: bool = True):
+        """Detiene el pool esperando opcionalmente a que terminen los trabajos en curso"""
+        self._executor.shutdown(wait=wait)
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self._max_finished_jobs)]:
+            del self._jobs[job_id]
+
+    def _run(self, job: Job):
+        if self._token_bucket is not None:
+            job.status = "throttled"
+            self._token_bucket.acquire(job.estimated_tokens)
+        job.status = "running"
+        job.started_at = time.time()
+        params = job.params
+        try:
+            if job.kind == "phase3":
+                job.result = self._run_phase3(job)
+            else:
+                execute_all_phases(
+                    params["product_url"],
+                    params.get("num_reviewers", 3),
+                    params.get("profile_parameters"),
+                    params.get("model_name"),
+                    params.get("concurrency"),
+                    run_id=job.run_id,
+                    use_cache=params.get("use_cache", False),
+                    on_phase=job.update_phase
+                )
+                job.result = get_all_results(job.run_id)
+            job.status = "completed"
+        except Exception as e:
+            print(f"Error en el trabajo {job.id}: {str(e)}")
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+
+    @staticmethod
+    def _run_phase3(job: Job) -> Dict[str, Any]:
+        """Ejecuta un trabajo de fase 3; sus eventos se publican en el canal de su ejecución"""
+        params = job.params
+        job.update_phase("phase3", "running")
+        try:
+            reviews = execute_phase3(
+                job.inputs["product_info"],
+                job.inputs["user_profiles"],
+                params.get("model_name"),
+                params.get("concurrency"),
+                job.run_id,
+                use_cache=params.get("use_cache", False),
+                force=params.get("force", False)
+            )
+        except Exception:
+            job.update_phase("phase3", "failed")
+            raise
+        finally:
+            # Las entradas ya no hacen falta y pueden ser grandes
+            job.inputs = {}
+        job.update_phase("phase3", "completed")
+        return {"reviews": reviews}
+
+job_manager = JobManager(settings.JOB_WORKERS, settings.JOB_QUEUE_LIMIT, settings.MAX_FINISHED_JOBS,
+                         settings.JOB_TOKENS_PER_MINUTE, settings.MAX_FINISHED_BATCHES)
@@ -0,0 +1,277 @@
+import base64
+import bisect
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from itertools import chain
+from typing import Dict, Any, List, Optional, Tuple
+from api import settings
+from api.services.results_service import get_reviews, get_reviewer_profiles, get_results_version
+from crewAPI import output_store
+
+# Parámetros que activan la respuesta paginada en /api/reviews y /api/reviewers
+REVIEWER_FILTERS = ("gender", "education_level", "age_min", "age_max", "age_band")
+QUERY_PARAMS = {
+    "reviews": ("limit", "cursor", "fields", "rating_min", "rating_max", "bot_id") + REVIEWER_FILTERS,
+    "reviewers": ("limit", "cursor", "fields") + REVIEWER_FILTERS,
+}
+
+# Documento del almacén de salidas de cada recurso
+RESOURCE_DOCUMENTS = {"reviews": "reviews", "reviewers": "profiles"}
+
+# Campos indexados de cada documento: (igualdad, rango)
+INDEX_FIELDS = {
+    "reviews": (("bot_id",), ("rating",)),
+    "reviewers": (("gender", "education_level"), ("age",)),
+}
+
+class InvalidQueryError(ValueError):
+    """Se lanza cuando los parámetros de paginación o de filtrado no son válidos"""
+
+def _record_id(record: Dict[str, Any]) -> int:
+    try:
+        return int(record.get("id"))
+    except (TypeError, ValueError):
+        return 0
+
+def _normalize(value: Any) -> str:
+    return str(value).strip().lower()
+
+class RecordIndex:
+    """
+    Índice en memoria de una lista de registros (reseñas o perfiles) ordenada por
+    (id, posición). Los id de las reseñas los escribe el LLM y pueden repetirse,
+    así que la posición del registro en su documento desempata y es la que
+    permite continuar una página a mitad de un grupo de id iguales.
+
+    Para cada campo de igualdad guarda las posiciones de los registros con cada
+    valor y para cada campo de rango los valores ordenados junto a su posición.
+    Una consulta recorre solo los candidatos del filtro más selectivo a partir
+    del cursor y se detiene en cuanto completa la página.
+
+    Las condiciones son ("eq", campo, valores) o ("range", campo, mínimo, máximo).
+    """
+
+    def __init__(self, records: List[Dict[str, Any]], equality_fields, range_fields):
+        rows = [record for record in records if isinstance(record, dict)]
+        self.keys = sorted((_record_id(record), position) for position, record in enumerate(rows))
+        self.records = [rows[position] for _, position in self.keys]
+        self.equality = {field: {} for field in equality_fields}
+        self.ranges = {}
+        for position, record in enumerate(self.records):
+            for field in equality_fields:
+                value = record.get(field)
+                if value is not None:
+                    self.equality[field].setdefault(_normalize(value), []).append(position)
+        for field in range_fields:
+            pairs = sorted(
+                (record[field], position) for position, record in enumerate(self.records)
+                if isinstance(record.get(field), (int, float))
+            )
+            self.ranges[field] = ([value for value, _ in pairs], [position for _, position in pairs])
+
+    def _bounds(self, condition) -> Tuple[int, int]:
+        values = self.ranges[condition[1]][0]
+        low, high = condition[2], condition[3]
+        start = 0 if low is None else bisect.bisect_left(values, low)
+        end = len(values) if high is None else bisect.bisect_right(values, high)
+        return start, end
+
+    def _estimate(self, condition) -> int:
+        if condition[0] == "eq":
+            return sum(len(self.equality[condition[1]].get(value, ())) for value in condition[2])
+        start, end = self._bounds(condition)
+        return max(0, end - start)
+
+    def _positions(self, condition) -> List[int]:
+        """Posiciones (ordenadas) de los registros que cumplen la condición"""
+        if condition[0] == "eq":
+            lists = [self.equality[condition[1]].get(value, []) for value in condition[2]]
+            return lists[0] if len(lists) == 1 else sorted(chain.from_iterable(lists))
+        start, end = self._bounds(condition)
+        return sorted(self.ranges[condition[1]][1][start:end])
+
+    @staticmethod
+    def _matches(record: Dict[str, Any], condition) -> bool:
+        value = record.get(condition[1])
+        if condition[0] == "eq":
+            return value is not None and _normalize(value) in condition[2]
+        if not isinstance(value, (int, float)):
+            return False
+        return (condition[2] is None or value >= condition[2]) and (condition[3] is None or value <= condition[3])
+
+    def query(self, conditions: List[tuple], after: Optional[Tuple[int, int]] = None,
+              limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[Tuple[int, int]]]:
+        """
+        Registros que cumplen todas las condiciones con (id, posición) mayor que `after`.
+
+        Returns:
+            (registros, siguiente): como mucho `limit` registros y, si quedan
+            más, el (id, posición) del último para pedir la página siguiente
+        """
+        start = 0 if after is None else bisect.bisect_right(self.keys, tuple(after))
+        if conditions:
+            driver = min(conditions, key=self._estimate)
+            candidates = self._positions(driver)
+            positions = candidates[bisect.bisect_left(candidates, start):]
+            others = [condition for condition in conditions if condition is not driver]
+        else:
+            positions = range(start, len(self.records))
+            others = []
+
+        items = []
+        last = None
+        for position in positions:
+            record = self.records[position]
+            if all(self._matches(record, condition) for condition in others):
+                if limit is not None and len(items) == limit:
+                    return items, self.keys[last]
+                items.append(record)
+                last = position
+        return items, None
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+def get_index(resource: str, run_id: Optional[str] = None) -> RecordIndex:
+    """
+    Índice de las reseñas o de los perfiles de una ejecución.
+
+    Se guarda por versión de los archivos (get_results_version), así que se
+    reconstruye solo cuando cambian.
+    """
+    version = get_results_version(resource, run_id)
+    with _indexes_lock:
+        index = _indexes.get(version)
+        if index is not None:
+            _indexes.move_to_end(version)
+            return index
+
+    records = get_reviews(run_id) if resource == "reviews" else get_reviewer_profiles(run_id)
+    index = RecordIndex(records, *INDEX_FIELDS[resource])
+    with _indexes_lock:
+        _indexes[version] = index
+        while len(_indexes) > settings.QUERY_INDEX_ENTRIES:
+            _indexes.popitem(last=False)
+    return index
+
+def encode_cursor(key: Tuple[int, int]) -> str:
+    """Cursor opaco con el (id, posición) del último registro de la página"""
+    text = f"{key[0]}:{key[1]}"
+    return base64.urlsafe_b64encode(text.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[int, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        text = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        record_id, position = text.split(":")
+        return int(record_id), int(position)
+    except (ValueError, UnicodeError):
+        raise InvalidQueryError("El cursor no es válido")
+
+def _int_arg(args, name: str, minimum: int = None, maximum: int = None) -> Optional[int]:
+    value = args.get(name)
+    if value is None or value == "":
+        return None
+    try:
+        number = int(value)
+    except ValueError:
+        raise InvalidQueryError(f"El parámetro '{name}' debe ser un número entero")
+    if (minimum is not None and number < minimum) or (maximum is not None and number > maximum):
+        raise InvalidQueryError(f"El parámetro '{name}' debe estar entre {minimum} y {maximum}")
+    return number
+
+def _values_arg(args, name: str) -> Optional[set]:
+    """Valores de un filtro de igualdad (repetido o separado por comas)"""
+    values = {_normalize(value) for raw in args.getlist(name) for value in raw.split(",") if value.strip()}
+    return values or None
+
+def _age_band(band: str) -> Tuple[Optional[int], Optional[int]]:
+    """Franja de edad "25-34" o "65+" """
+    try:
+        if band.endswith("+"):
+            return int(band[:-1]), None
+        low, high = band.split("-")
+        return int(low), int(high)
+    except ValueError:
+        raise InvalidQueryError("age_band debe tener el formato '25-34' o '65+'")
+
+class PageQuery:
+    """Consulta paginada sobre las reseñas o los perfiles de una ejecución"""
+
+    def __init__(self, resource: str, args):
+        self.resource = resource
+        self.limit = _int_arg(args, "limit", 1, settings.PAGE_MAX_LIMIT) or settings.PAGE_DEFAULT_LIMIT
+        cursor = args.get("cursor")
+        self.after = decode_cursor(cursor) if cursor else None
+        fields = _values_arg(args, "fields")
+        # El id se devuelve siempre: es la clave del cursor
+        self.fields = None if fields is None else sorted(fields | {"id"})
+
+        self.reviewer_conditions = []
+        for field in ("gender", "education_level"):
+            values = _values_arg(args, field)
+            if values:
+                self.reviewer_conditions.append(("eq", field, values))
+        age_min, age_max = _int_arg(args, "age_min", 0), _int_arg(args, "age_max", 0)
+        if args.get("age_band"):
+            age_min, age_max = _age_band(args["age_band"])
+        if age_min is not None or age_max is not None:
+            self.reviewer_conditions.append(("range", "age", age_min, age_max))
+
+        self.conditions = []
+        if resource == "reviews":
+            bot_ids = _values_arg(args, "bot_id")
+            if bot_ids:
+                self.conditions.append(("eq", "bot_id", bot_ids))
+            rating_min, rating_max = _int_arg(args, "rating_min", 1, 5), _int_arg(args, "rating_max", 1, 5)
+            if rating_min is not None or rating_max is not None:
+                self.conditions.append(("range", "rating", rating_min, rating_max))
+        else:
+            self.conditions.extend(self.reviewer_conditions)
+            self.reviewer_conditions = []
+
+        self.key = json.dumps(sorted((name, args.getlist(name)) for name in QUERY_PARAMS[resource] if name in args))
+
+def has_query_params(resource: str, args) -> bool:
+    """True si la petición pide paginación, filtros o proyección"""
+    return any(name in args for name in QUERY_PARAMS[resource])
+
+def query_version(query: PageQuery, run_id: Optional[str] = None) -> str:
+    """Versión de la página: la de los archivos que consulta más los parámetros"""
+    versions = [get_results_version(query.resource, run_id)]
+    if query.reviewer_conditions:
+        versions.append(get_results_version("reviewers", run_id))
+    payload = json.dumps([versions, query.key])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+def _index_query(query: PageQuery, run_id: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[Tuple[int, int]]]:
+    conditions = list(query.conditions)
+    if query.reviewer_conditions:
+        # Los filtros por atributos del reseñador se resuelven con el índice de perfiles
+        profiles, _ = get_index("reviewers", run_id).query(query.reviewer_conditions)
+        conditions.append(("eq", "bot_id", {_normalize(_record_id(profile)) for profile in profiles}))
+    return get_index(query.resource, run_id).query(conditions, query.after, query.limit)
+
+def query_page(query: PageQuery, run_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Obtiene una página de reseñas o perfiles.
+
+    Con el backend SQLite la consulta se resuelve en la base de datos con sus
+    índices; si no (o si la ejecución no está en ella) con los índices en memoria.
+
+    Returns:
+        Diccionario con items, next_cursor (None en la última página) y limit
+    """
+    page = None
+    if output_store.supports_query:
+        page = output_store.query(RESOURCE_DOCUMENTS[query.resource], run_id, query.conditions,
+                                  query.after, query.limit, query.reviewer_conditions)
+    if page is None:
+        page = _index_query(query, run_id)
+    items, next_key = page
+    next_cursor = encode_cursor(next_key) if next_key is not None else None
+    if query.fields is not None:
+        items = [{field: item[field] for field in query.fields if field in item} for item in items]
+    return {"items": items, "next_cursor": next_cursor, "limit": query.limit}
@@ -1,10 +1,15 @@
 import os
 import json
+import hashlib
+import threading
+import time
 from typing import Dict, Any, List, Optional
+from api import settings
+from crewAPI import storage, output_store, read_review_log
 
-def get_outputs_dir():
-    """Obtiene la ruta al directorio de salidas"""
-    return os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "crewAPI", "outputs")
+def get_outputs_dir(run_id: Optional[str] = None):
+    """Obtiene la ruta al directorio de salidas de una ejecución"""
+    return storage.get_run_dir(run_id)
 
 def load_json_file(file_path):
     """Carga un archivo JSON de manera segura"""
@@ -22,15 +27,137 @@ def load_json_file(file_path):
         print(f"Error al cargar archivo JSON {file_path}: {str(e)}")
         return {}
 
-def get_product_info() -> Dict[str, Any]:
+class ResultsCache:
+    """
+    Caché en memoria de los documentos de resultados ya parseados.
+
+    Cada entrada guarda la firma del archivo (mtime y tamaño) con la que se
+    leyó. Durante `stat_interval` segundos se devuelve sin tocar el disco;
+    pasado ese tiempo basta un os.stat para revalidarla y solo se vuelve a
+    parsear si el archivo ha cambiado. Los escritores de este proceso invalidan
+    las entradas de su ejecución en cuanto terminan de escribir.
+
+    Los documentos devueltos son compartidos entre peticiones y no deben modificarse.
+    """
+
+    def __init__(self, stat_interval: float):
+        self.stat_interval = stat_interval
+        self._entries: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _signature(file_path: str):
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self, file_path: str, loader=None) -> Any:
+        now = time.monotonic()
+        entry = self._entries.get(file_path)
+        if entry is not None and now - entry[1] < self.stat_interval:
+            return entry[2]
+
+        signature = self._signature(file_path)
+        if entry is not None and entry[0] == signature:
+            data = entry[2]
+        else:
+            data = (loader or load_json_file)(file_path) if signature is not None else {}
+        with self._lock:
+            self._entries[file_path] = (signature, now, data)
+        return data
+
+    def signature(self, file_path: str):
+        """
+        Firma (mtime y tamaño) del documento que devolverá la siguiente load().
+
+        Mientras la entrada no ha caducado es la firma con la que se leyó; si el
+        archivo ha cambiado se descarta la entrada para que load() lo vuelva a
+        leer y la firma nunca anuncie un contenido más nuevo que el servido.
+        """
+        entry = self._entries.get(file_path)
+        if entry is not None and time.monotonic() - entry[1] < self.stat_interval:
+            return entry[0]
+
+        signature = self._signature(file_path)
+        if entry is not None and entry[0] != signature:
+            with self._lock:
+                if self._entries.get(file_path) is entry:
+                    del self._entries[file_path]
+        return signature
+
+    def invalidate(self, run_id: Optional[str] = None):
+        """Descarta los documentos de una ejecución"""
+        paths = (
+            storage.get_product_info_file(run_id),
+            storage.get_user_profiles_file(run_id),
+            storage.get_reviews_file(run_id),
+            storage.get_reviews_log_file(run_id),
+            storage.get_final_report_file(run_id)
+        )
+        with self._lock:
+            for path in paths:
+                self._entries.pop(path, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+results_cache = ResultsCache(settings.RESULTS_CACHE_STAT_INTERVAL)
+
+# Documentos de salida y archivo JSON de cada uno
+DOCUMENT_FILES = {
+    "product": storage.get_product_info_file,
+    "profiles": storage.get_user_profiles_file,
+    "reviews": storage.get_reviews_file,
+    "report": storage.get_final_report_file,
+}
+
+# Documentos de los que depende cada endpoint de resultados ("reviews_log" es
+# el registro reviews.jsonl de la fase 3 en curso, que solo existe como archivo)
+RESULT_DOCUMENTS = {
+    "product": ("product",),
+    "reviewers": ("profiles",),
+    "reviews": ("reviews", "reviews_log"),
+    "analysis": ("report",),
+}
+RESULT_DOCUMENTS["results"] = tuple(kind for kinds in RESULT_DOCUMENTS.values() for kind in kinds)
+
+def _document_signature(kind: str, run_id: Optional[str] = None):
+    if kind == "reviews_log":
+        return results_cache.signature(storage.get_reviews_log_file(run_id))
+    return output_store.stored_version(run_id, kind) or results_cache.signature(DOCUMENT_FILES[kind](run_id))
+
+def load_document(kind: str, run_id: Optional[str] = None) -> Any:
+    """
+    Carga un documento de salida ("product", "profiles", "reviews" o "report").
+
+    Si el almacén de salidas lo guarda (backend SQLite) se lee de él; si no,
+    de su archivo JSON a través de la caché de resultados.
+    """
+    if output_store.stored_version(run_id, kind) is not None:
+        return output_store.load(run_id, kind) or {}
+    return results_cache.load(DOCUMENT_FILES[kind](run_id))
+
+def get_results_version(resource: str, run_id: Optional[str] = None) -> str:
+    """
+    Versión de un documento de resultados ("results", "product", "reviewers",
+    "reviews" o "analysis") calculada a partir de las versiones de sus
+    documentos (la firma del archivo o la versión en el almacén), sin leerlos.
+    Cambia siempre que cambia alguno de ellos.
+    """
+    signatures = [_document_signature(kind, run_id) for kind in RESULT_DOCUMENTS[resource]]
+    payload = json.dumps([resource, run_id, signatures])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+def get_product_info(run_id: Optional[str] = None) -> Dict[str, Any]:
     """Obtiene la información del producto"""
-    product_file = os.path.join(get_outputs_dir(), "producto.json")
-    return load_json_file(product_file)
+    return load_document("product", run_id)
 
-def get_reviewer_profiles() -> List[Dict[str, Any]]:
+def get_reviewer_profiles(run_id: Optional[str] = None) -> List[Dict[str, Any]]:
     """Obtiene los perfiles de los revisores"""
-    reviewers_file = os.path.join(get_outputs_dir(), "reviewers.json")
-    reviewers_data = load_json_file(reviewers_file)
+    reviewers_data = load_document("profiles", run_id)
     
     # Manejar dos formatos posibles de archivo de revisores
     if isinstance(reviewers_data, dict) and "profiles" in reviewers_data:
@@ -40,10 +167,16 @@ def get_reviewer_profiles() -> List[Dict[str, Any]]:
     else:
         return []
 
-def get_reviews() -> List[Dict[str, Any]]:
-    """Obtiene todas las reseñas generadas"""
-    reviews_file = os.path.join(get_outputs_dir(), "reviews.json")
-    reviews_data = load_json_file(reviews_file)
+def get_reviews(run_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Obtiene todas las reseñas generadas.
+    
+    Mientras la fase 3 está en curso (aún no existe reviews.json) devuelve las
+    reseñas ya terminadas del registro reviews.jsonl.
+    """
+    reviews_data = load_document("reviews", run_id)
+    if not reviews_data:
+        reviews_data = results_cache.load(storage.get_reviews_log_file(run_id), read_review_log)
     
     # Manejar el formato del archivo de reseñas
     if isinstance(reviews_data, dict) and "reviews" in reviews_data:
@@ -53,16 +186,15 @@ def get_reviews() -> List[Dict[str, Any]]:
     else:
         return []
 
-def get_analysis() -> Dict[str, Any]:
+def get_analysis(run_id: Optional[str] = None) -> Dict[str, Any]:
     """Obtiene el análisis final"""
-    analysis_file = os.path.join(get_outputs_dir(), "informe_final.json")
-    return load_json_file(analysis_file)
+    return load_document("report", run_id)
 
-def get_all_results() -> Dict[str, Any]:
+def get_all_results(run_id: Optional[str] = None) -> Dict[str, Any]:
     """Obtiene todos los resultados generados"""
     return {
-        "product": get_product_info(),
-        "reviewers": get_reviewer_profiles(),
-        "reviews": get_reviews(),
-        "analysis": get_analysis()
+        "product": get_product_info(run_id),
+        "reviewers": get_reviewer_profiles(run_id),
+        "reviews": get_reviews(run_id),
+        "analysis": get_analysis(run_id)
     } 
\ No newline at end of file
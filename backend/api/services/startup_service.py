@@ -0,0 +1,65 @@
+import sys
+import threading
+import time
+from typing import Dict, Any
+
+from api import settings
+import crewAPI
+
+# Módulos pesados cuyo estado (cargado o no) aparece en el informe de arranque
+HEAVY_MODULES = ("crewai", "crewai_tools", "litellm", "numpy")
+
+_warmup_lock = threading.Lock()
+_warmup_thread = None
+
+startup_report = {
+    "app_ready_seconds": None,
+    "warmup": "disabled",
+    "warmup_error": None,
+}
+
+def mark_app_ready(started: float):
+    """Registra el tiempo transcurrido desde que se importó la API (time.perf_counter) hasta que la aplicación está creada"""
+    startup_report["app_ready_seconds"] = round(time.perf_counter() - started, 3)
+
+def _warmup(delay: float):
+    if delay > 0:
+        time.sleep(delay)
+    startup_report["warmup"] = "running"
+    try:
+        crewAPI.load_crew("warmup")
+        startup_report["warmup"] = "completed"
+    except Exception as e:
+        # Si falla, la primera fase volverá a intentar la importación y mostrará el error
+        startup_report["warmup"] = "failed"
+        startup_report["warmup_error"] = str(e)
+        print(f"Error al precargar crewAPI: {str(e)}")
+
+def start_warmup(delay: float = None):
+    """
+    Precarga crew.py (y crewai) en un hilo en segundo plano.
+
+    Se llama cuando el servidor ya escucha (post_worker_init en gunicorn, antes
+    de app.run en desarrollo); el retraso deja que el proceso atienda antes las
+    primeras peticiones. No hace nada si CREW_WARMUP está desactivado o si la
+    precarga ya se ha lanzado.
+    """
+    global _warmup_thread
+    if not settings.CREW_WARMUP:
+        return
+    with _warmup_lock:
+        if _warmup_thread is not None:
+            return
+        startup_report["warmup"] = "pending"
+        delay = settings.CREW_WARMUP_DELAY if delay is None else delay
+        _warmup_thread = threading.Thread(target=_warmup, args=(delay,), name="crew-warmup", daemon=True)
+        _warmup_thread.start()
+
+def get_startup_report() -> Dict[str, Any]:
+    """Informe del coste de arranque: tiempo hasta tener la aplicación, importación de crew.py y precarga"""
+    return {
+        **startup_report,
+        **crewAPI.import_report,
+        "modules_loaded": len(sys.modules),
+        "heavy_modules": {name: name in sys.modules for name in HEAVY_MODULES},
+    }
@@ -0,0 +1,49 @@
+import os
+
+# Configuración de la cola de trabajos en segundo plano
+# Cada trabajo escribe en su propia ejecución (run_id), por lo que pueden
+# ejecutarse varios análisis a la vez
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_LIMIT = int(os.getenv("JOB_QUEUE_LIMIT", "50"))
+MAX_FINISHED_JOBS = int(os.getenv("MAX_FINISHED_JOBS", "100"))
+
+# Lotes de análisis (/api/batch): cada URL es un trabajo de la misma cola, así
+# que JOB_WORKERS es también la concurrencia global de los lotes
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "100"))
+MAX_FINISHED_BATCHES = int(os.getenv("MAX_FINISHED_BATCHES", "20"))
+# Límite global de tokens por minuto para los trabajos (0 = sin límite). Antes
+# de empezar, cada trabajo reserva una estimación de los tokens que consumirá:
+# JOB_TOKENS_BASE + JOB_TOKENS_PER_REVIEWER * num_reviewers
+JOB_TOKENS_PER_MINUTE = int(os.getenv("JOB_TOKENS_PER_MINUTE", "0"))
+JOB_TOKENS_BASE = int(os.getenv("JOB_TOKENS_BASE", "8000"))
+JOB_TOKENS_PER_REVIEWER = int(os.getenv("JOB_TOKENS_PER_REVIEWER", "3000"))
+
+# Eventos de progreso (Server-Sent Events)
+EVENT_HISTORY_LIMIT = int(os.getenv("EVENT_HISTORY_LIMIT", "1000"))
+EVENT_CHANNELS_LIMIT = int(os.getenv("EVENT_CHANNELS_LIMIT", "100"))
+SSE_HEARTBEAT_SECONDS = 15
+
+# Caché de resultados para los endpoints GET
+# Segundos durante los que un documento cacheado se sirve sin comprobar el archivo
+# (0 para revalidar con os.stat en cada petición)
+RESULTS_CACHE_STAT_INTERVAL = float(os.getenv("RESULTS_CACHE_STAT_INTERVAL", "1.0"))
+
+# Compresión de las respuestas GET (brotli si está instalado, si no gzip).
+# Las respuestas más pequeñas que COMPRESSION_MIN_SIZE bytes se envían sin comprimir
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+# Cuerpos comprimidos que se guardan por ETag para no volver a comprimirlos
+COMPRESSED_CACHE_ENTRIES = int(os.getenv("COMPRESSED_CACHE_ENTRIES", "64"))
+
+# Paginación de /api/reviews y /api/reviewers
+PAGE_DEFAULT_LIMIT = int(os.getenv("PAGE_DEFAULT_LIMIT", "50"))
+PAGE_MAX_LIMIT = int(os.getenv("PAGE_MAX_LIMIT", "500"))
+# Índices en memoria (uno por documento y versión) que se conservan
+QUERY_INDEX_ENTRIES = int(os.getenv("QUERY_INDEX_ENTRIES", "16"))
+
+# Arranque: crewAPI carga crewai de forma perezosa. Con CREW_WARMUP=1 se
+# importa en segundo plano cuando el servidor ya está escuchando, para que la
+# primera petición que lance una fase no pague ese coste
+CREW_WARMUP = os.getenv("CREW_WARMUP", "1") == "1"
+CREW_WARMUP_DELAY = float(os.getenv("CREW_WARMUP_DELAY", "1.0"))
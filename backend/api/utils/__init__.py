@@ -1,2 +1,5 @@
 # Importar las utilidades
-from api.utils.error_handlers import register_error_handlers 
\ No newline at end of file
+from api.utils.error_handlers import register_error_handlers 
+from api.utils.request_metrics import register_request_metrics
+from api.utils.http_cache import register_compression, conditional_json
+from api.utils.validation import int_param, bool_param, profile_parameters_param, InvalidParameterError
@@ -1,5 +1,8 @@
 from flask import jsonify
 from werkzeug.exceptions import HTTPException
+from crewAPI import InvalidRunIdError
+from api.services.query_service import InvalidQueryError
+from api.utils.validation import InvalidParameterError
 
 def register_error_handlers(app):
     """
@@ -20,6 +23,18 @@ def register_error_handlers(app):
     def server_error(e):
         return jsonify(error="Error interno del servidor"), 500
     
+    @app.errorhandler(InvalidRunIdError)
+    def invalid_run_id(e):
+        return jsonify(error=str(e)), 400
+    
+    @app.errorhandler(InvalidQueryError)
+    def invalid_query(e):
+        return jsonify(error=str(e)), 400
+    
+    @app.errorhandler(InvalidParameterError)
+    def invalid_parameter(e):
+        return jsonify(error=str(e)), 400
+    
     @app.errorhandler(Exception)
     def handle_exception(e):
         # Manejar excepciones no HTTP específicamente
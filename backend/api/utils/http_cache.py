@@ -0,0 +1,142 @@
+import gzip
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+from flask import request, jsonify, Response
+from api import settings
+
+try:
+    import brotli
+except ImportError:
+    # Brotli es opcional: sin él se negocia solo gzip
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = ("application/json", "text/plain")
+ENCODINGS = ("br", "gzip")
+
+class CompressedBodies:
+    """
+    Cuerpos ya comprimidos por (ETag, codificación). Una respuesta con el mismo
+    ETag fuerte tiene los mismos bytes, así que solo se comprime una vez.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key, body: bytes):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+compressed_bodies = CompressedBodies(settings.COMPRESSED_CACHE_ENTRIES)
+
+def _base_tag(tag: str) -> str:
+    """ETag sin comillas, sin prefijo débil y sin el sufijo de la codificación"""
+    tag = tag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    tag = tag.strip('"')
+    for encoding in ENCODINGS:
+        if tag.endswith("-" + encoding):
+            return tag[:-len(encoding) - 1]
+    return tag
+
+def _matching_tag(version: str) -> Optional[str]:
+    """Etiqueta de If-None-Match que corresponde a la versión actual, si la hay"""
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return None
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag == "*" or _base_tag(tag) == version:
+            return tag
+    return None
+
+def conditional_json(version: str, build: Callable[[], Any]) -> Response:
+    """
+    Respuesta JSON con ETag fuerte derivado de `version`.
+
+    Si el cliente ya tiene esa versión (If-None-Match) devuelve un 304 sin
+    llamar a build(); si no, serializa lo que devuelve build().
+
+    Args:
+        version: Versión del documento (cambia siempre que cambia su contenido)
+        build: Función que devuelve los datos a serializar
+    """
+    matched = _matching_tag(version)
+    if matched is not None:
+        response = Response(status=304)
+        # El cliente se queda con la representación que ya tiene
+        response.headers["ETag"] = matched if matched != "*" else f'"{version}"'
+    else:
+        response = jsonify(build())
+        response.set_etag(version)
+    response.headers["Cache-Control"] = "no-cache"
+    response.vary.add("Accept-Encoding")
+    return response
+
+def negotiate_encoding() -> Optional[str]:
+    """Codificación preferida por el cliente entre las disponibles ("br", "gzip" o None)"""
+    gzip_quality = request.accept_encodings.quality("gzip")
+    if brotli is not None:
+        br_quality = request.accept_encodings.quality("br")
+        if br_quality > 0 and br_quality >= gzip_quality:
+            return "br"
+    return "gzip" if gzip_quality > 0 else None
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.GZIP_LEVEL)
+
+def register_compression(blueprint):
+    """
+    Comprime con brotli o gzip las respuestas GET de un Blueprint según el
+    Accept-Encoding del cliente. No toca los streams (SSE) ni las respuestas
+    de menos de COMPRESSION_MIN_SIZE bytes.
+
+    Args:
+        blueprint: Blueprint de Flask cuyas respuestas se comprimen
+    """
+    @blueprint.after_request
+    def compress_response(response):
+        if (request.method != "GET" or response.status_code != 200 or response.is_streamed
+                or response.direct_passthrough or "Content-Encoding" in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        encoding = negotiate_encoding()
+        if encoding is None:
+            return response
+        body = response.get_data()
+        if len(body) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        etag, weak = response.get_etag()
+        key = (etag, encoding) if etag and not weak else None
+        compressed = compressed_bodies.get(key) if key else None
+        if compressed is None:
+            compressed = compress(body, encoding)
+            if key:
+                compressed_bodies.put(key, compressed)
+
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        if etag:
+            # Cada codificación es una representación distinta: su ETag fuerte también
+            response.set_etag(f"{etag}-{encoding}", weak=weak)
+        return response
@@ -0,0 +1,31 @@
+import time
+from flask import g, request
+from crewAPI import metrics_registry
+
+http_requests = metrics_registry.counter(
+    "reviews_http_requests_total", "Peticiones HTTP por método, ruta y código de estado", ("method", "endpoint", "status")
+)
+http_latency = metrics_registry.histogram(
+    "reviews_http_request_duration_seconds", "Latencia de las peticiones HTTP por método y ruta", ("method", "endpoint")
+)
+
+def register_request_metrics(blueprint):
+    """
+    Registra el número de peticiones y su latencia para todas las rutas de un Blueprint
+    
+    Args:
+        blueprint: Blueprint de Flask cuyas rutas se miden
+    """
+    @blueprint.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+    
+    @blueprint.after_request
+    def record_request(response):
+        started = g.pop("request_started", None)
+        if started is not None:
+            # La plantilla de la ruta (no la URL) para no crear una serie por cada id
+            endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+            http_requests.inc(method=request.method, endpoint=endpoint, status=response.status_code)
+            http_latency.observe(time.perf_counter() - started, method=request.method, endpoint=endpoint)
+        return response
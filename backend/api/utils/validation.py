@@ -0,0 +1,68 @@
+import math
+from typing import Any, Dict, Optional
+from crewAPI import config
+
+class InvalidParameterError(ValueError):
+    """Se lanza cuando un campo del cuerpo de la petición no tiene el tipo o el rango esperado"""
+
+def int_param(data: Optional[Dict[str, Any]], name: str, default: Optional[int] = None,
+              minimum: int = 1) -> Optional[int]:
+    """
+    Lee un campo entero del cuerpo JSON (None si no se indica y no hay valor por defecto)
+
+    Raises:
+        InvalidParameterError: Si no es un entero (los booleanos no cuentan) o es menor que `minimum`
+    """
+    value = data.get(name, default) if data else default
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int) or value < minimum:
+        raise InvalidParameterError(f"'{name}' debe ser un número entero mayor o igual que {minimum}")
+    return value
+
+def bool_param(data: Optional[Dict[str, Any]], name: str, default: bool = False) -> bool:
+    """
+    Lee un campo booleano del cuerpo JSON
+
+    Raises:
+        InvalidParameterError: Si no es true o false
+    """
+    value = data.get(name, default) if data else default
+    if not isinstance(value, bool):
+        raise InvalidParameterError(f"'{name}' debe ser true o false")
+    return value
+
+def profile_parameters_param(data: Optional[Dict[str, Any]], name: str = 'profile_parameters',
+                             default: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Lee los parámetros de población y comprueba los campos que usa el muestreo
+    local de los perfiles (seed, sampling_method y los pesos de gender_ratio)
+
+    Raises:
+        InvalidParameterError: Si no es un objeto, seed no es un entero mayor o igual
+            que 0, sampling_method no es un método conocido o algún peso de
+            gender_ratio no es un número mayor o igual que 0
+    """
+    value = data.get(name, default) if data else default
+    if value is None:
+        return None
+    if not isinstance(value, dict):
+        raise InvalidParameterError(f"'{name}' debe ser un objeto")
+    int_param(value, 'seed', minimum=0)
+    method = value.get('sampling_method')
+    if method is not None and method not in config.PROFILE_SAMPLING_METHODS:
+        raise InvalidParameterError(
+            f"'sampling_method' debe ser uno de: {', '.join(config.PROFILE_SAMPLING_METHODS)}"
+        )
+    demographics = value.get('demographics')
+    if demographics is None:
+        demographics = {}
+    if not isinstance(demographics, dict):
+        raise InvalidParameterError("'demographics' debe ser un objeto")
+    gender_ratio = demographics.get('gender_ratio')
+    if isinstance(gender_ratio, dict):
+        for weight in gender_ratio.values():
+            if (isinstance(weight, bool) or not isinstance(weight, (int, float))
+                    or not math.isfinite(weight) or weight < 0):
+                raise InvalidParameterError("Los pesos de 'gender_ratio' deben ser números mayores o iguales que 0")
+    return value
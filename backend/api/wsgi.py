@@ -0,0 +1,25 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Punto de entrada WSGI para producción.
+
+Se usa con gunicorn desde el directorio backend/api:
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+import sys
+import os
+
+# Mismas rutas que run.py para resolver las importaciones de api y crewAPI
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+api_dir = os.path.abspath(os.path.dirname(__file__))
+crewapi_dir = os.path.abspath(os.path.join(backend_dir, "crewAPI"))
+
+for path in (crewapi_dir, api_dir, backend_dir):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from api import create_app
+
+app = create_app()
@@ -0,0 +1,3 @@
+"""
+Benchmarks del pipeline de cuatro fases sin llamadas a servicios externos
+"""
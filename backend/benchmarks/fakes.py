@@ -0,0 +1,173 @@
+import json
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from crewai import LLM
+from crewai.tools import BaseTool
+
+from models import Product, UserProfilesResponse, ProfileTextsResponse, Review, QualitativeAnalysis, AnalysisResult
+from product_cache import PageFetch
+
+FAKE_MODEL = "fake/benchmark"
+
+PAGE_TEXT = (
+    "Auriculares inalámbricos Modelo X. Cancelación activa de ruido, 30 horas de batería, "
+    "carga rápida USB-C, Bluetooth 5.3 y estuche compacto. Precio: 149,99€. Categoría: Audio."
+)
+
+GENDERS = ("Male", "Female", "Other")
+EDUCATION_LEVELS = ("Instituto", "Formación profesional", "Carrera universitaria", "Máster", "Doctorado")
+LOCATIONS = ("Madrid", "Barcelona", "Sevilla", "Valencia", "Bilbao", "Zaragoza")
+POSITIVE_WORDS = ("batería", "sonido", "cómodos", "cancelación", "calidad", "diseño")
+NEGATIVE_WORDS = ("precio", "estuche", "conexión", "micrófono", "aplicación")
+
+def _prompt_text(messages: Any) -> str:
+    if isinstance(messages, str):
+        return messages
+    return "\n".join(str(message.get("content", "")) for message in messages)
+
+def _match_int(pattern: str, text: str, default: int) -> int:
+    match = re.search(pattern, text)
+    return int(match.group(1)) if match else default
+
+def fake_product() -> Dict[str, Any]:
+    return {
+        "name": "Auriculares Modelo X",
+        "description": PAGE_TEXT,
+        "price": "149.99€",
+        "image": "https://example.com/modelo-x.jpg",
+        "category": "Audio",
+        "main_features": [
+            {"feature": "Cancelación de ruido", "value": "Activa"},
+            {"feature": "Batería", "value": "30 horas"}
+        ],
+        "technical_specs": [
+            {"spec": "Bluetooth", "value": "5.3"},
+            {"spec": "Conector", "value": "USB-C"}
+        ]
+    }
+
+def fake_profile(profile_id: int) -> Dict[str, Any]:
+    rng = random.Random(profile_id)
+    return {
+        "id": profile_id,
+        "name": f"Usuario {profile_id}",
+        "avatar": f"https://example.com/avatars/{profile_id}.png",
+        "bio": f"Perfil sintético número {profile_id}",
+        "age": rng.randint(18, 75),
+        "location": rng.choice(LOCATIONS),
+        "gender": rng.choice(GENDERS),
+        "education_level": rng.choice(EDUCATION_LEVELS),
+        "personality": {
+            trait: rng.randint(0, 100) for trait in (
+                "introvert_extrovert", "analytical_creative", "busy_free_time", "disorganized_organized",
+                "independent_cooperative", "environmentalist", "safe_risky"
+            )
+        },
+        "backstory": f"Usuario {profile_id} compra tecnología con frecuencia y valora la relación calidad-precio."
+    }
+
+def fake_profile_text(profile_id: int) -> Dict[str, Any]:
+    profile = fake_profile(profile_id)
+    return {key: profile[key] for key in ("id", "name", "bio", "location", "backstory")}
+
+def fake_review(review_id: int, bot_id: int) -> Dict[str, Any]:
+    rng = random.Random(review_id * 7919 + bot_id)
+    rating = rng.randint(1, 5)
+    words = rng.sample(POSITIVE_WORDS if rating >= 3 else NEGATIVE_WORDS, 3)
+    return {
+        "id": review_id,
+        "bot_id": bot_id,
+        "product_id": 1,
+        "rating": rating,
+        "title": f"Opinión sobre {words[0]}",
+        "content": f"Me ha llamado la atención {words[0]}, también {words[1]} y {words[2]}."
+    }
+
+def fake_qualitative_analysis() -> Dict[str, Any]:
+    return {
+        "positive_points": ["Buena batería", "Sonido claro"],
+        "negative_points": ["Precio elevado"],
+        "demographic_insights": ["Los usuarios jóvenes valoran más el diseño"]
+    }
+
+def fake_analysis_result() -> Dict[str, Any]:
+    return {
+        "average_rating": 3.5,
+        "rating_distribution": {"one_star": 0, "two_stars": 1, "three_stars": 1, "four_stars": 1, "five_stars": 1},
+        "keyword_analysis": [{"word": "batería", "count": 2, "sentiment": "positive"}],
+        **fake_qualitative_analysis()
+    }
+
+def fake_response(output_schema: Any, prompt: str) -> Dict[str, Any]:
+    """Genera una respuesta determinista que cumple el esquema de salida de la tarea"""
+    if output_schema is Product:
+        return fake_product()
+    if output_schema is ProfileTextsResponse:
+        return {"profiles": [fake_profile_text(int(i)) for i in re.findall(r"- id (\d+):", prompt)]}
+    if output_schema is UserProfilesResponse:
+        count = _match_int(r"Genera (\d+) perfiles", prompt, 3)
+        first_id = _match_int(r"un número único entre (\d+) y", prompt, 1)
+        return {"profiles": [fake_profile(i) for i in range(first_id, first_id + count)]}
+    if output_schema is Review:
+        review_id = _match_int(r"\(usa (\d+)\)", prompt, 0)
+        return fake_review(review_id, _match_int(r"perfil del usuario \((\d+)\)", prompt, review_id))
+    if output_schema is AnalysisResult:
+        return fake_analysis_result()
+    return fake_qualitative_analysis()
+
+class FakeLLM(LLM):
+    """
+    LLM local y determinista para los benchmarks: responde con JSON válido para
+    el esquema de la tarea tras una latencia artificial configurable.
+    """
+
+    def __init__(self, output_schema: Any = None, latency: float = 0.0):
+        super().__init__(model=FAKE_MODEL, temperature=0)
+        self.output_schema = output_schema
+        self.latency = latency
+        self.calls = 0
+        self._calls_lock = threading.Lock()
+
+    def call(self, messages, *args, **kwargs):
+        with self._calls_lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        answer = json.dumps(fake_response(self.output_schema, _prompt_text(messages)), ensure_ascii=False)
+        return f"Thought: I now know the final answer\nFinal Answer: {answer}"
+
+    def supports_function_calling(self) -> bool:
+        return False
+
+class FakeScrapeTool(BaseTool):
+    name: str = "Read website content"
+    description: str = "Devuelve el contenido de una página de producto de prueba"
+
+    def _run(self, **kwargs) -> str:
+        return PAGE_TEXT
+
+class FakeLLMFactory:
+    """Sustituye a agents.get_llm: un FakeLLM por esquema de salida, con contador de llamadas"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.llms: Dict[Any, FakeLLM] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, model_name: Optional[str] = None, use_cache: bool = False, output_schema: Any = None) -> FakeLLM:
+        with self._lock:
+            llm = self.llms.get(output_schema)
+            if llm is None:
+                llm = self.llms[output_schema] = FakeLLM(output_schema, self.latency)
+            return llm
+
+    @property
+    def calls(self) -> int:
+        return sum(llm.calls for llm in self.llms.values())
+
+def fake_fetch_page(url: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> PageFetch:
+    return PageFetch(200, PAGE_TEXT)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark del pipeline de cuatro fases con un LLM y un scraper falsos.
+
+Ejecuta run_phase1..4 para varios números de reseñadores y mide, por fase,
+el tiempo real, el pico de memoria (tracemalloc), la E/S de archivos
+(/proc/self/io) y el sobrecoste del framework por llamada al LLM, es decir,
+el tiempo que no se explica por la latencia artificial del LLM falso.
+
+Uso (desde el directorio backend):
+    python benchmarks/run_benchmarks.py --sizes 3 30 300 --latency 0.05 --json resultados.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import shutil
+import sys
+import time
+import tracemalloc
+import uuid
+
+# Mismas rutas que api/run.py: los módulos de crewAPI se importan sin prefijo de paquete
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+crewapi_dir = os.path.join(backend_dir, "crewAPI")
+sys.path.insert(0, backend_dir)
+sys.path.insert(0, crewapi_dir)
+
+import config
+import crew
+import storage
+from pool import agent_pool
+from benchmarks.fakes import FakeLLMFactory, FakeScrapeTool, fake_fetch_page
+
+DEFAULT_SIZES = (3, 30, 300, 3000)
+PRODUCT_URL = "https://example.com/producto/modelo-x"
+PROFILE_PARAMETERS = {
+    "population_range": [0, 100],
+    "demographics": {"age_range": [18, 75], "gender_ratio": "Male&Female"}
+}
+
+def read_proc_io():
+    """Contadores de E/S del proceso (solo Linux); None si no están disponibles"""
+    try:
+        with open("/proc/self/io", "r") as f:
+            return {key: int(value) for key, value in (line.split(": ") for line in f.read().splitlines())}
+    except (OSError, ValueError):
+        return None
+
+class PhaseMeasurement:
+    """Mide una fase: tiempo, llamadas al LLM, pico de memoria y E/S"""
+
+    def __init__(self, factory: FakeLLMFactory, trace_memory: bool):
+        self.factory = factory
+        self.trace_memory = trace_memory
+        self.result = {}
+
+    def __enter__(self):
+        self._calls = self.factory.calls
+        self._io = read_proc_io()
+        if self.trace_memory:
+            tracemalloc.start()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        wall = time.perf_counter() - self._started
+        peak = None
+        if self.trace_memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        io_after = read_proc_io()
+        self.result = {"wall_s": wall, "llm_calls": self.factory.calls - self._calls, "peak_bytes": peak}
+        if self._io and io_after:
+            self.result.update({
+                "read_bytes": io_after["rchar"] - self._io["rchar"],
+                "written_bytes": io_after["wchar"] - self._io["wchar"],
+                "io_syscalls": (io_after["syscr"] - self._io["syscr"]) + (io_after["syscw"] - self._io["syscw"])
+            })
+        return False
+
+def overhead_per_call(result, latency: float, workers: int) -> float:
+    """Tiempo por llamada que no corresponde a la latencia del LLM falso (en ms)"""
+    calls = result["llm_calls"]
+    if not calls:
+        return 0.0
+    llm_wall = latency * math.ceil(calls / workers)
+    return max(0.0, result["wall_s"] - llm_wall) / calls * 1000
+
+def run_size(num_reviewers: int, factory: FakeLLMFactory, args):
+    """Ejecuta las cuatro fases para un número de reseñadores en una ejecución propia"""
+    run_id = f"bench_{num_reviewers}_{uuid.uuid4().hex[:8]}"
+    concurrency = args.concurrency or config.PHASE3_CONCURRENCY
+    phases = (
+        ("phase1", 1, lambda state: crew.run_phase1(PRODUCT_URL, run_id=run_id, use_product_cache=False)),
+        ("phase2", 1, lambda state: crew.run_phase2(num_reviewers, PROFILE_PARAMETERS, run_id=run_id)),
+        ("phase3", concurrency, lambda state: crew.run_phase3(
+            state["phase1"], crew.load_run_profiles(run_id), concurrency=concurrency, run_id=run_id
+        )),
+        ("phase4", 1, lambda state: crew.run_phase4(run_id=run_id)),
+    )
+
+    rows = []
+    state = {}
+    try:
+        for phase, workers, step in phases:
+            measurement = PhaseMeasurement(factory, not args.no_memory)
+            output = io.StringIO()
+            with measurement, contextlib.redirect_stdout(output if not args.verbose else sys.stdout):
+                state[phase] = step(state)
+            result = measurement.result
+            result.update({
+                "reviewers": num_reviewers,
+                "phase": phase,
+                "overhead_ms_per_call": overhead_per_call(result, args.latency, workers)
+            })
+            rows.append(result)
+    finally:
+        if not args.keep_outputs:
+            shutil.rmtree(storage.get_run_dir(run_id), ignore_errors=True)
+    return rows
+
+def format_bytes(value) -> str:
+    if value is None:
+        return "-"
+    return f"{value / 1024 / 1024:.2f}"
+
+def print_table(rows):
+    header = f"{'reviewers':>9} {'phase':>7} {'wall_s':>9} {'calls':>6} {'ovh_ms/call':>11} {'peak_mb':>8} {'read_mb':>8} {'write_mb':>8} {'io_calls':>8}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        print(
+            f"{row['reviewers']:>9} {row['phase']:>7} {row['wall_s']:>9.3f} {row['llm_calls']:>6} "
+            f"{row['overhead_ms_per_call']:>11.2f} {format_bytes(row['peak_bytes']):>8} "
+            f"{format_bytes(row.get('read_bytes')):>8} {format_bytes(row.get('written_bytes')):>8} "
+            f"{row.get('io_syscalls', '-'):>8}"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline de reseñas con un LLM falso")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="Números de reseñadores a medir")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latencia artificial de cada llamada al LLM (segundos)")
+    parser.add_argument("--concurrency", type=int, default=None, help="Reseñas en paralelo en la fase 3")
+    parser.add_argument("--no-memory", action="store_true", help="No medir memoria (tracemalloc ralentiza la ejecución)")
+    parser.add_argument("--keep-outputs", action="store_true", help="Conservar las carpetas de outputs de cada ejecución")
+    parser.add_argument("--verbose", action="store_true", help="Mostrar la salida de CrewAI")
+    parser.add_argument("--json", dest="json_path", help="Guardar los resultados en un archivo JSON")
+    args = parser.parse_args()
+
+    # Sustituir el LLM, la descarga de la página y la herramienta de scraping
+    factory = FakeLLMFactory(args.latency)
+    crew.get_llm = factory
+    crew.fetch_page = fake_fetch_page
+    agent_pool.tool("scrape_website", FakeScrapeTool)
+
+    rows = []
+    for size in args.sizes:
+        rows.extend(run_size(size, factory, args))
+    print_table(rows)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"latency": args.latency, "results": rows}, f, indent=4)
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,17 @@
 """
 CrewAPI Module - API JSON para el sistema de revisiones de productos
+
+Las funciones de ejecución (run_api, main, run_phase1..4, extend_run) viven en crew.py,
+que importa crewai y crewai_tools y tarda varios segundos en cargarse. Se
+importan de forma perezosa la primera vez que se accede a ellas (o con
+load_crew), de modo que los endpoints de solo lectura no pagan ese coste.
 """
 
+import importlib
+import sys
+import threading
+import time
+
 from .models import (
     Product,
     BotPersonality,
@@ -13,14 +23,68 @@ from .models import (
     APIResponse
 )
 
-from .crew import (
-    run_api,
-    main,
-    run_phase1,
-    run_phase2,
-    run_phase3,
-    run_phase4
-)
+# Los módulos internos de crewAPI se importan sin prefijo de paquete (ver crew.py),
+# así que los objetos con estado compartido se reexportan desde esos mismos módulos.
+# La API debe importarlos desde aquí (from crewAPI import storage), nunca como
+# crewAPI.storage: eso crearía una segunda copia del módulo con sus propios
+# locks y sus propias clases de excepción
+import config
+import storage
+import checkpoints
+from storage import InvalidRunIdError
+from review_store import read_review_log
+from rate_limit import TokenBucket
+from llm_cache import response_cache
+from pool import llm_pool, agent_pool
+from llm_limiter import llm_limiter, CircuitOpenError
+from checkpoints import IncompleteRunError
+from output_store import output_store
+from metrics import registry as metrics_registry, track_phase
+
+_CREW_EXPORTS = ('run_api', 'main', 'run_phase1', 'run_phase2', 'run_phase3', 'run_phase4', 'extend_run')
+_crew_lock = threading.Lock()
+_crew = None
+
+# Coste de importar crew.py: lo consulta el endpoint /api/startup
+import_report = {
+    "crew_loaded": False,
+    "crew_import_seconds": None,
+    "crew_modules_loaded": None,
+    "loaded_by": None,
+}
+
+def load_crew(reason: str = "on_demand"):
+    """
+    Importa crew.py (y con él crewai) si todavía no está cargado.
+
+    Args:
+        reason: Motivo de la carga que queda en el informe ("on_demand", "warmup"...)
+
+    Returns:
+        El módulo crew
+    """
+    global _crew
+    if _crew is not None:
+        return _crew
+    with _crew_lock:
+        if _crew is None:
+            modules_before = len(sys.modules)
+            started = time.perf_counter()
+            module = importlib.import_module(".crew", __name__)
+            import_report.update({
+                "crew_loaded": True,
+                "crew_import_seconds": round(time.perf_counter() - started, 3),
+                "crew_modules_loaded": len(sys.modules) - modules_before,
+                "loaded_by": reason,
+            })
+            print(f"crewAPI.crew cargado en {import_report['crew_import_seconds']}s ({reason})")
+            _crew = module
+    return _crew
+
+def __getattr__(name):
+    if name in _CREW_EXPORTS:
+        return getattr(load_crew(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 __all__ = [
     # Models
@@ -39,5 +103,25 @@ __all__ = [
     'run_phase1',
     'run_phase2',
     'run_phase3',
-    'run_phase4'
+    'run_phase4',
+    'extend_run',
+    'load_crew',
+    'import_report',
+    
+    # Shared state
+    'config',
+    'storage',
+    'checkpoints',
+    'InvalidRunIdError',
+    'read_review_log',
+    'TokenBucket',
+    'response_cache',
+    'llm_pool',
+    'agent_pool',
+    'llm_limiter',
+    'CircuitOpenError',
+    'IncompleteRunError',
+    'output_store',
+    'metrics_registry',
+    'track_phase'
 ] 
\ No newline at end of file
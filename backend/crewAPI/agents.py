@@ -1,4 +1,3 @@
-import glob
 import json
 import os
 from crewai import Agent, LLM
@@ -6,46 +5,112 @@ from crewai_tools import ScrapeWebsiteTool, FileReadTool, DirectoryReadTool
 from typing import List, Dict, Any
 import config
 from crewai.tools import tool
+from llm_cache import make_cache_key, response_cache
+from pool import llm_pool, agent_pool, configure_http_client
+from metrics import track_llm_call
+from llm_limiter import llm_limiter
+from review_store import load_reviews
 
-@tool("leerReviews")
-def leer_reviews() -> dict:
-    """
-    Lee todos los archivos de revisiones (.json) del directorio de revisiones y devuelve
-    su contenido completo en formato JSON.
+def create_leer_reviews_tool(run_id: str = None):
+    """Create the leerReviews tool bound to the review store of a run"""
+
+    @tool("leerReviews")
+    def leer_reviews() -> dict:
+        """
+        Lee todas las reseñas generadas para el producto y devuelve su contenido
+        completo en formato JSON.
+        
+        Returns:
+            Un diccionario con la clave "reviews" y la lista de reseñas ordenadas por índice.
+        """
+        return {"reviews": load_reviews(run_id)}
+
+    return leer_reviews
     
-    Returns:
-        Un diccionario donde las claves son los nombres de los archivos y
-        los valores son el contenido completo de cada archivo de revisión en formato JSON.
+class InstrumentedLLM(LLM):
     """
-    reviews_content = {}
-    
-    # Buscar todos los archivos .json en el directorio de revisiones
-    review_files = glob.glob(os.path.join(config.REVIEWS_DIR, "*.json"))
-    
-    for file_path in review_files:
-        file_name = os.path.basename(file_path)
-        try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                content = json.load(file)
-                reviews_content[file_name] = content
-        except Exception as e:
-            reviews_content[file_name] = {"error": f"Error al leer el archivo: {str(e)}"}
-    
-    return reviews_content
-    
-def create_llm(model_name=None):
-    """Create and return an LLM instance"""
-    return LLM(
+    LLM que pasa por el limitador compartido del modelo (RPM, TPM, concurrencia
+    adaptativa, reintentos y circuit breaker) y registra el número de llamadas,
+    su latencia y los errores de cada intento
+    """
+
+    def call(self, messages, *args, **kwargs):
+        def attempt():
+            with track_llm_call(self.model):
+                return super(InstrumentedLLM, self).call(messages, *args, **kwargs)
+
+        return llm_limiter.call(self.model, attempt, messages)
+
+class CachedLLM(InstrumentedLLM):
+    """
+    LLM que reutiliza las respuestas de la caché compartida cuando el modelo,
+    la temperatura, el prompt y el esquema de salida coinciden.
+    """
+
+    def __init__(self, *args, output_schema=None, cache=response_cache, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.output_schema = output_schema
+        self.response_cache = cache
+
+    def call(self, messages, *args, **kwargs):
+        # Las llamadas con funciones nativas tienen efectos, no se cachean
+        if kwargs.get("available_functions"):
+            return super().call(messages, *args, **kwargs)
+        key = make_cache_key(self.model, self.temperature, messages, self.output_schema)
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            return cached
+        response = super().call(messages, *args, **kwargs)
+        if isinstance(response, str) and response:
+            self.response_cache.set(key, response)
+        return response
+
+def create_llm(model_name=None, use_cache=False, output_schema=None):
+    """
+    Create and return an LLM instance
+
+    Con use_cache=True las respuestas se guardan y reutilizan desde la caché de
+    respuestas; output_schema (el output_json de la tarea) forma parte de la clave.
+    """
+    if use_cache:
+        return CachedLLM(
+            model=model_name or config.DEFAULT_MODEL,
+            temperature=1,
+            output_schema=output_schema
+        )
+    return InstrumentedLLM(
         model=model_name or config.DEFAULT_MODEL,
         temperature=1,
     )
 
+def llm_key(model_name=None, use_cache=False, output_schema=None):
+    """Clave de un cliente LLM en el pool"""
+    return (model_name or config.DEFAULT_MODEL, bool(use_cache), output_schema if use_cache else None)
+
+def get_llm(model_name=None, use_cache=False, output_schema=None):
+    """
+    Return a pooled LLM instance
+
+    Los clientes se crean una vez por modelo (y esquema, si se usa la caché de
+    respuestas) y se reutilizan entre fases y peticiones con el cliente HTTP
+    compartido de litellm.
+    """
+    configure_http_client()
+    return llm_pool.get(
+        llm_key(model_name, use_cache, output_schema),
+        lambda: create_llm(model_name, use_cache, output_schema)
+    )
+
+def lease_agent(key, factory):
+    """Presta un agente del pool; la clave debe identificar el LLM y la configuración del agente"""
+    return agent_pool.lease(key, factory)
+
 def create_product_info_agent(llm=None):
     """Create and return the product information agent"""
     if llm is None:
         llm = create_llm()
         
-    scrape_tool = ScrapeWebsiteTool()
+    scrape_tool = agent_pool.tool("scrape_website", ScrapeWebsiteTool)
     
     return Agent(
         llm=llm,
@@ -76,21 +141,49 @@ def create_reviewer_agents(profiles: List[Dict[str, Any]], llm=None):
     if llm is None:
         llm = create_llm()
     
-    agents = []
-    for profile in profiles:
-        agent = Agent(
-            llm=llm,
-            role=f"{config.AGENT_CONFIG['reviewer']['role']} - {profile['name']}",
-            goal=config.AGENT_CONFIG["reviewer"]["goal"],
-            backstory=profile.get('backstory', 'Usuario genérico interesado en el producto'),
-            verbose=True,
-            allow_delegation=False
-        )
-        agents.append(agent)
-    
-    return agents
+    return [create_reviewer_agent(profile, llm) for profile in profiles]
+
+def create_reviewer_agent(profile: Dict[str, Any] = None, llm=None):
+    """
+    Create and return a reviewer agent
+
+    Sin profile el agente es genérico y el perfil que interpreta lo indica cada
+    tarea (create_reviewer_task), así que se puede reutilizar entre perfiles.
+    """
+    if llm is None:
+        llm = create_llm()
+
+    if profile is None:
+        role = config.AGENT_CONFIG["reviewer"]["role"]
+        backstory = config.AGENT_CONFIG["reviewer"]["backstory"]
+    else:
+        role = f"{config.AGENT_CONFIG['reviewer']['role']} - {profile['name']}"
+        backstory = profile.get('backstory', 'Usuario genérico interesado en el producto')
+
+    return Agent(
+        llm=llm,
+        role=role,
+        goal=config.AGENT_CONFIG["reviewer"]["goal"],
+        backstory=backstory,
+        verbose=True,
+        allow_delegation=False
+    )
+
+def create_summarizer_agent(llm=None):
+    """Create and return the agent that summarizes review blocks and merges partial analyses"""
+    if llm is None:
+        llm = create_llm()
+
+    return Agent(
+        llm=llm,
+        role=config.AGENT_CONFIG["summarizer"]["role"],
+        goal=config.AGENT_CONFIG["summarizer"]["goal"],
+        backstory=config.AGENT_CONFIG["summarizer"]["backstory"],
+        verbose=True,
+        allow_delegation=False
+    )
 
-def create_compiler_agent(llm=None):
+def create_compiler_agent(llm=None, run_id: str = None):
     """Create and return the review compiler agent with the combined review reading tool"""
     if llm is None:
         llm = create_llm()
@@ -102,5 +195,5 @@ def create_compiler_agent(llm=None):
         backstory=config.AGENT_CONFIG["compiler"]["backstory"],
         verbose=True,
         allow_delegation=False,
-        tools=[leer_reviews]  
+        tools=[create_leer_reviews_tool(run_id)]
     ) 
\ No newline at end of file
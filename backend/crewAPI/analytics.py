@@ -0,0 +1,132 @@
+import re
+from typing import Any, Dict, List, Optional
+import numpy as np
+import config
+
+# Palabras sin contenido que no se cuentan como palabras clave
+STOPWORDS = {
+    # español
+    "para", "pero", "como", "este", "esta", "esto", "estos", "estas", "porque", "muy", "más",
+    "mas", "tiene", "tengo", "todo", "toda", "todos", "todas", "cuando", "donde", "desde", "hasta",
+    "sobre", "entre", "también", "tambien", "bien", "sido", "estar", "está", "están", "había", "hace",
+    "puede", "pueden", "aunque", "algo", "algún", "alguna", "cada", "otro", "otra", "otros", "otras",
+    "mismo", "misma", "solo", "sólo", "bastante", "poco", "mucho", "mucha", "muchos", "muchas", "sino",
+    "ser", "son", "fue", "era", "han", "hay", "que", "los", "las", "del", "una", "uno", "unos", "unas",
+    "por", "con", "sin", "sus", "les", "nos", "mis", "tus", "eso", "esa", "ese", "ella", "ello", "ellos",
+    "producto", "realmente", "además", "ademas", "embargo", "hecho", "parece", "creo", "siempre",
+    "nunca", "quizás", "quizas", "general", "vez", "veces", "cosa", "cosas", "mientras",
+    # inglés
+    "the", "and", "this", "with", "from", "have", "very", "they", "them", "were", "would", "could",
+    "should", "about", "there", "their", "which", "what", "when", "your", "just", "also", "some", "more",
+}
+
+WORD_PATTERN = re.compile(r"[a-záéíóúüñ]+")
+
+STAR_KEYS = ("one_star", "two_stars", "three_stars", "four_stars", "five_stars")
+
+# Versión del formato de los agregados; los guardados con otra se recalculan
+AGGREGATES_VERSION = 3
+
+def _tokenize(text: str) -> List[str]:
+    return [
+        word for word in WORD_PATTERN.findall(text.lower())
+        if len(word) >= config.KEYWORD_MIN_LENGTH and word not in STOPWORDS
+    ]
+
+def _sentiment(mean_rating: float) -> str:
+    if mean_rating >= 4:
+        return "positive"
+    if mean_rating <= 2.5:
+        return "negative"
+    return "neutral"
+
+def empty_aggregates() -> Dict[str, Any]:
+    """Agregados de cero reseñas"""
+    return {"version": AGGREGATES_VERSION, "count": 0, "rating_sum": 0, "rating_counts": [0] * len(STAR_KEYS),
+            "keywords": {}}
+
+def update_aggregates(aggregates: Optional[Dict[str, Any]], reviews: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Añade reseñas a los agregados de una ejecución: número de reseñas, suma de
+    valoraciones, conteo por estrellas y, por palabra clave, [apariciones, suma
+    de las valoraciones de las reseñas en las que aparece, número de esas
+    reseñas]; cada reseña cuenta una sola vez en la suma aunque repita la
+    palabra. Con ellos el análisis numérico se actualiza sin volver a leer las
+    reseñas anteriores.
+
+    Returns:
+        Agregados nuevos (los recibidos no se modifican)
+    """
+    base = aggregates or empty_aggregates()
+    result = {
+        "version": AGGREGATES_VERSION,
+        "count": base["count"] + len(reviews),
+        "rating_sum": base["rating_sum"],
+        "rating_counts": list(base["rating_counts"]),
+        "keywords": {word: list(tally) for word, tally in base["keywords"].items()}
+    }
+    if not reviews:
+        return result
+
+    # Las valoraciones fuera de 1-5 se recortan una sola vez: la media, el
+    # conteo por estrellas y el sentimiento usan los mismos valores
+    ratings = np.clip(
+        np.fromiter((int(review.get("rating", 0)) for review in reviews), dtype=np.int64, count=len(reviews)), 1, 5
+    )
+    result["rating_sum"] += int(ratings.sum())
+    star_counts = np.bincount(ratings - 1, minlength=5)
+    result["rating_counts"] = [int(total + count) for total, count in zip(result["rating_counts"], star_counts)]
+
+    tokens = [_tokenize(f"{review.get('title', '')} {review.get('content', '')}") for review in reviews]
+    lengths = np.fromiter((len(doc) for doc in tokens), dtype=np.int64, count=len(tokens))
+    if lengths.sum() == 0:
+        return result
+    words = np.array([word for doc in tokens for word in doc])
+    vocabulary, counts = np.unique(words, return_counts=True)
+
+    # Para el sentimiento cada reseña cuenta una vez por palabra
+    distinct = [sorted(set(doc)) for doc in tokens]
+    distinct_lengths = np.fromiter((len(doc) for doc in distinct), dtype=np.int64, count=len(distinct))
+    distinct_words = np.array([word for doc in distinct for word in doc])
+    positions = np.searchsorted(vocabulary, distinct_words)
+    review_ratings = np.repeat(ratings.astype(np.float64), distinct_lengths)
+    rating_sums = np.bincount(positions, weights=review_ratings, minlength=len(vocabulary))
+    review_counts = np.bincount(positions, minlength=len(vocabulary))
+
+    keywords = result["keywords"]
+    for word, count, rating_sum, reviewed in zip(vocabulary.tolist(), counts.tolist(), rating_sums.tolist(),
+                                                 review_counts.tolist()):
+        tally = keywords.setdefault(word, [0, 0.0, 0])
+        tally[0] += count
+        tally[1] += rating_sum
+        tally[2] += reviewed
+    return result
+
+def is_current(aggregates: Optional[Dict[str, Any]]) -> bool:
+    """True si los agregados tienen el formato actual (los de otra versión hay que recalcularlos)"""
+    return isinstance(aggregates, dict) and aggregates.get("version") == AGGREGATES_VERSION
+
+def analysis_from_aggregates(aggregates: Dict[str, Any], top_n: int = None) -> Dict[str, Any]:
+    """
+    Partes numéricas del informe final a partir de los agregados. El
+    sentimiento de cada palabra clave se deriva de la valoración media de las
+    reseñas en las que aparece; se ordenan por frecuencia descendente y, a
+    igualdad de frecuencia, alfabéticamente.
+    """
+    count = aggregates["count"]
+    keywords = sorted(aggregates["keywords"].items(), key=lambda item: (-item[1][0], item[0]))
+    return {
+        "average_rating": round(aggregates["rating_sum"] / count, 2) if count else 0.0,
+        "rating_distribution": {key: int(value) for key, value in zip(STAR_KEYS, aggregates["rating_counts"])},
+        "keyword_analysis": [
+            {"word": word, "count": int(tally[0]), "sentiment": _sentiment(tally[1] / tally[2])}
+            for word, tally in keywords[:top_n or config.KEYWORD_TOP_N]
+        ]
+    }
+
+def compute_numeric_analysis(reviews: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Calcula localmente las partes numéricas del informe final (valoración media,
+    distribución de valoraciones y análisis de palabras clave).
+    """
+    return analysis_from_aggregates(update_aggregates(None, reviews))
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional
+import config
+import storage
+
+_lock = threading.Lock()
+
+class IncompleteRunError(Exception):
+    """Se lanza cuando una operación necesita fases de la ejecución que todavía no han terminado"""
+
+def input_hash(*parts: Any) -> str:
+    """Hash estable (SHA-256) del contenido de las entradas de una fase o tarea"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def file_hash(file_path: str) -> Optional[str]:
+    """Hash del contenido de un archivo de salida, o None si no existe"""
+    digest = hashlib.sha256()
+    try:
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 16), b""):
+                digest.update(block)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+def _model(model_name: Optional[str]) -> str:
+    return model_name or config.DEFAULT_MODEL
+
+# Entradas de cada fase. use_cache no forma parte de ellas: solo decide de
+# dónde salen las respuestas del LLM, no qué se pide
+
+def phase1_inputs(product_url: str, model_name: str = None) -> str:
+    return input_hash("phase1", product_url, _model(model_name))
+
+def phase2_inputs(num_reviewers: int, profile_parameters: Dict[str, Any], model_name: str = None) -> str:
+    return input_hash("phase2", num_reviewers, profile_parameters or {}, _model(model_name))
+
+def phase3_inputs(product_info: Dict[str, Any], profiles: List[Dict[str, Any]], model_name: str = None) -> str:
+    return input_hash("phase3", product_info, profiles, _model(model_name))
+
+def review_inputs(product_info: Dict[str, Any], profile: Dict[str, Any], model_name: str = None) -> str:
+    """Entradas de la tarea de un único reseñador"""
+    return input_hash("review", product_info, profile, _model(model_name))
+
+def phase4_inputs(reviews: List[Dict[str, Any]], profiles: List[Dict[str, Any]], model_name: str = None,
+                  chunk_size: int = None) -> str:
+    return input_hash("phase4", reviews, profiles, _model(model_name), chunk_size or config.PHASE4_CHUNK_SIZE)
+
+def load_checkpoints(run_id: Optional[str] = None) -> Dict[str, Any]:
+    """Contenido de checkpoints.json de una ejecución ({} si no existe o no se puede leer)"""
+    try:
+        with open(storage.get_checkpoints_file(run_id), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def _update(run_id: Optional[str], key: str, value: Any):
+    with _lock:
+        data = load_checkpoints(run_id)
+        data[key] = value
+        storage.atomic_write_json(storage.get_checkpoints_file(run_id), data)
+
+def is_valid(run_id: Optional[str], phase: str, inputs: str, output_file: str) -> bool:
+    """
+    Comprueba si la fase ya tiene una salida válida para estas entradas: el
+    checkpoint registra el mismo hash de entradas y el archivo de salida sigue
+    teniendo el contenido que se registró
+    """
+    checkpoint = load_checkpoints(run_id).get("phases", {}).get(phase)
+    return bool(checkpoint and checkpoint.get("input_hash") == inputs and _output_intact(checkpoint, output_file))
+
+def _output_intact(checkpoint: Dict[str, Any], output_file: str) -> bool:
+    output_hash = checkpoint.get("output_hash")
+    return output_hash is not None and output_hash == file_hash(output_file)
+
+def record(run_id: Optional[str], phase: str, inputs: str, output_file: str):
+    """Registra que la salida actual de la fase corresponde a estas entradas"""
+    with _lock:
+        data = load_checkpoints(run_id)
+        data.setdefault("phases", {})[phase] = {
+            "input_hash": inputs,
+            "output_hash": file_hash(output_file),
+            "completed_at": time.time()
+        }
+        storage.atomic_write_json(storage.get_checkpoints_file(run_id), data)
+
+def save_run_params(run_id: Optional[str], params: Dict[str, Any]):
+    """Guarda los parámetros de una ejecución completa para poder reanudarla"""
+    _update(run_id, "params", params)
+
+def load_run_params(run_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    return load_checkpoints(run_id).get("params")
+
+def completed_phases(run_id: Optional[str] = None) -> Dict[str, Any]:
+    """Fases con checkpoint cuya salida sigue intacta"""
+    phases = load_checkpoints(run_id).get("phases", {})
+    files = {
+        "phase1": storage.get_product_info_file(run_id),
+        "phase2": storage.get_user_profiles_file(run_id),
+        "phase3": storage.get_reviews_file(run_id),
+        "phase4": storage.get_final_report_file(run_id),
+    }
+    return {
+        phase: checkpoint for phase, checkpoint in phases.items()
+        if phase in files and _output_intact(checkpoint, files[phase])
+    }
@@ -1,3 +1,4 @@
+import json
 import os
 
 # API Configuration
@@ -7,15 +8,129 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 DEFAULT_MODEL = "gemini/gemini-2.0-flash"
 
 # File paths for intermediate results
-OUTPUT_DIR = "backend/crewAPI/outputs"
-PRODUCT_INFO_FILE = os.path.join(OUTPUT_DIR, "producto.json")
-USER_PROFILES_FILE = os.path.join(OUTPUT_DIR, "reviewers.json")
-REVIEWS_DIR = os.path.join(OUTPUT_DIR, "reviews")
-FINAL_REPORT_FILE = os.path.join(OUTPUT_DIR, "informe_final.json")
+# OUTPUT_DIR contiene la ejecución compartida (sin run_id); cada ejecución con
+# run_id escribe en su propia carpeta dentro de RUNS_DIR
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_DIR = os.path.join(BASE_DIR, "outputs")
+RUNS_DIR = os.path.join(OUTPUT_DIR, "runs")
+
+PRODUCT_INFO_FILENAME = "producto.json"
+USER_PROFILES_FILENAME = "reviewers.json"
+REVIEWS_FILENAME = "reviews.json"
+# Registro append-only con cada reseña según termina (ver review_store.py)
+REVIEWS_LOG_FILENAME = "reviews.jsonl"
+FINAL_REPORT_FILENAME = "informe_final.json"
+# Hash de las entradas de cada fase y parámetros de la ejecución (ver checkpoints.py)
+CHECKPOINTS_FILENAME = "checkpoints.json"
+# Agregados numéricos de las reseñas para actualizar el informe sin releerlas (ver analytics.py)
+AGGREGATES_FILENAME = "aggregates.json"
+
+PRODUCT_INFO_FILE = os.path.join(OUTPUT_DIR, PRODUCT_INFO_FILENAME)
+USER_PROFILES_FILE = os.path.join(OUTPUT_DIR, USER_PROFILES_FILENAME)
+REVIEWS_FILE = os.path.join(OUTPUT_DIR, REVIEWS_FILENAME)
+FINAL_REPORT_FILE = os.path.join(OUTPUT_DIR, FINAL_REPORT_FILENAME)
+
+# Almacén de los documentos de salida (ver output_store.py): "json" (un archivo
+# por documento) o "sqlite" (base de datos embebida con índices, además de los
+# archivos JSON que usan las fases). La base de datos queda fuera de OUTPUT_DIR
+# para que limpiar la ejecución compartida no la borre
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json")
+SQLITE_DB_PATH = os.getenv("SQLITE_DB_PATH", os.path.join(BASE_DIR, "data", "reviews.db"))
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "30"))
+
+# Caché de productos de la fase 1 (clave: URL normalizada)
+PRODUCT_CACHE_DIR = os.path.join(BASE_DIR, "cache", "products")
+PRODUCT_CACHE_TTL = int(os.getenv("PRODUCT_CACHE_TTL", str(24 * 3600)))
+PRODUCT_CACHE_MAX_ENTRIES = int(os.getenv("PRODUCT_CACHE_MAX_ENTRIES", "500"))
+# Máximo de caracteres de la página que se incluyen en el prompt de la fase 1
+PRODUCT_PAGE_MAX_CHARS = int(os.getenv("PRODUCT_PAGE_MAX_CHARS", "20000"))
+PRODUCT_PAGE_TIMEOUT = 15
+
+# Caché de respuestas del LLM (opt-in por petición con use_cache)
+# LLM_CACHE_BACKEND: "disk" (memoria + disco) o "memory" (solo memoria)
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "disk")
+LLM_CACHE_DIR = os.path.join(BASE_DIR, "cache", "llm")
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "1000"))
+# Límites del almacén en disco (0 = sin límite); al superarlos se borran las respuestas más antiguas
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Segundos que vive una respuesta en disco (0 = no caduca)
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "0"))
+
+# Presupuestos del resumen del producto que reciben los reseñadores en la fase 3
+DIGEST_DESCRIPTION_MAX_CHARS = int(os.getenv("DIGEST_DESCRIPTION_MAX_CHARS", "600"))
+DIGEST_MAX_FEATURES = int(os.getenv("DIGEST_MAX_FEATURES", "8"))
+DIGEST_MAX_SPECS = int(os.getenv("DIGEST_MAX_SPECS", "10"))
+DIGEST_VALUE_MAX_CHARS = 80
+DIGEST_MAX_CHARS = int(os.getenv("DIGEST_MAX_CHARS", "2000"))
+
+# Reutilización de clientes LLM y agentes entre fases y peticiones
+AGENT_POOL_MAX_IDLE = int(os.getenv("AGENT_POOL_MAX_IDLE", "64"))
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "20"))
+LLM_HTTP_TIMEOUT = 600
+
+# Límites del proveedor por modelo: peticiones (rpm) y tokens (tpm) por minuto
+# (0 = sin límite). LLM_RATE_LIMITS acepta un JSON con el mismo formato; los
+# modelos que no aparecen usan LLM_DEFAULT_RPM y LLM_DEFAULT_TPM
+LLM_RATE_LIMITS = json.loads(os.getenv("LLM_RATE_LIMITS", "null")) or {
+    "gemini/gemini-2.0-flash": {"rpm": 2000, "tpm": 4000000},
+}
+LLM_DEFAULT_RPM = int(os.getenv("LLM_DEFAULT_RPM", "0"))
+LLM_DEFAULT_TPM = int(os.getenv("LLM_DEFAULT_TPM", "0"))
+# Tokens de respuesta que se reservan por llamada antes de conocer la respuesta
+LLM_COMPLETION_TOKENS_ESTIMATE = 1000
+# Concurrencia adaptativa (AIMD) por modelo: +1 llamada simultánea por cada
+# ventana de llamadas correctas y la mitad ante un 429
+LLM_INITIAL_CONCURRENCY = int(os.getenv("LLM_INITIAL_CONCURRENCY", "8"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+# Reintentos con backoff exponencial y jitter ante 429 y errores 5xx
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_BACKOFF_BASE = 1.0
+LLM_BACKOFF_MAX = 60.0
+# Circuit breaker: tras LLM_BREAKER_THRESHOLD errores seguidos del proveedor las
+# llamadas a ese modelo fallan de inmediato durante LLM_BREAKER_COOLDOWN segundos
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+
+# Análisis de palabras clave calculado localmente en la fase 4
+KEYWORD_TOP_N = int(os.getenv("KEYWORD_TOP_N", "15"))
+KEYWORD_MIN_LENGTH = 4
 
 # Default parameters
 DEFAULT_NUM_REVIEWERS = 3
 
+# Número máximo de reseñadores ejecutados en paralelo en la fase 3
+PHASE3_CONCURRENCY = int(os.getenv("PHASE3_CONCURRENCY", "4"))
+
+# Generación de perfiles de la fase 2 por lotes en paralelo
+PHASE2_BATCH_SIZE = int(os.getenv("PHASE2_BATCH_SIZE", "20"))
+PHASE2_CONCURRENCY = int(os.getenv("PHASE2_CONCURRENCY", "4"))
+# Pistas de diversidad que se reparten entre los lotes (en orden circular)
+PROFILE_DIVERSITY_HINTS = [
+    "personas jóvenes (18-29 años) y estudiantes",
+    "adultos de 30 a 44 años con familia o trabajo exigente",
+    "adultos de 45 a 64 años con experiencia como compradores",
+    "personas mayores de 65 años",
+    "residentes en zonas rurales o ciudades pequeñas",
+    "perfiles con presupuesto ajustado y muy sensibles al precio",
+    "usuarios expertos y exigentes con la tecnología",
+    "compradores ocasionales con poca experiencia en este tipo de producto",
+]
+
+# Muestreo local de los atributos numéricos de los perfiles (ver sampler.py)
+# PROFILE_SAMPLING_METHOD: "random", "stratified" o "lhs" (Latin hypercube con control de correlación)
+PROFILE_SAMPLING_METHODS = ("random", "stratified", "lhs")
+PROFILE_SAMPLING_METHOD = os.getenv("PROFILE_SAMPLING_METHOD", "lhs")
+PROFILE_DEFAULT_AGE_RANGE = (18, 75)
+PROFILE_AVATAR_URL = "https://api.dicebear.com/7.x/personas/svg?seed={id}"
+
+# Compilación map-reduce de la fase 4: con más de PHASE4_CHUNK_SIZE reseñas se
+# resumen por bloques en paralelo y los resúmenes parciales se combinan de
+# PHASE4_REDUCE_FANIN en PHASE4_REDUCE_FANIN hasta obtener el análisis final
+PHASE4_CHUNK_SIZE = int(os.getenv("PHASE4_CHUNK_SIZE", "50"))
+PHASE4_REDUCE_FANIN = int(os.getenv("PHASE4_REDUCE_FANIN", "10"))
+PHASE4_CONCURRENCY = int(os.getenv("PHASE4_CONCURRENCY", "4"))
+
 # Example product URLs for testing
 EXAMPLE_URLS = {
     "ikea": "https://www.ikea.com/es/es/p/tradfri-kit-basico-iluminacion-inteligente-regulac-lumin-inalambr-color-espectro-blanco-10547603/",
@@ -49,5 +164,11 @@ AGENT_CONFIG = {
         "backstory": """Eres un especialista en análisis de datos y presentación de información.
         Tu trabajo es recopilar reseñas de productos, analizarlas y presentarlas de manera 
         clara y útil en formato JSON."""
+    },
+    "summarizer": {
+        "role": "Analista de Reseñas",
+        "goal": "Resumir bloques de reseñas y combinar resúmenes parciales en un análisis cualitativo en formato JSON",
+        "backstory": """Eres un analista de opinión de clientes. Trabajas con bloques de reseñas
+        y con resúmenes de otros analistas, y sabes agrupar ideas repetidas sin perder matices."""
     }
 } 
\ No newline at end of file
@@ -2,24 +2,42 @@ import warnings
 import os
 import json
 import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from crewai import Crew, Process, LLM
-from typing import Dict, Any, List, Union
+from typing import Dict, Any, List, Union, Callable
 import config
 import solucionadorError
+import storage
+from product_cache import product_cache, fetch_page
 from agents import (
-    create_llm,
+    llm_key,
+    get_llm,
+    lease_agent,
     create_product_info_agent,
     create_user_creator_agent,
-    create_reviewer_agents,
+    create_reviewer_agent,
+    create_summarizer_agent,
     create_compiler_agent
 )
 from tasks import (
     create_product_info_task,
     create_user_profiles_task,
-    create_reviewer_tasks,
+    create_reviewer_task,
+    create_chunk_analysis_task,
+    create_merge_analysis_task,
     create_compiler_task
 )
-from models import APIRequest, APIResponse, Product, BotProfile, Review, AnalysisResult
+from models import (
+    APIRequest, APIResponse, Product, BotProfile, Review, AnalysisResult, UserProfilesResponse, QualitativeAnalysis,
+    ProfileTextsResponse
+)
+from analytics import update_aggregates, analysis_from_aggregates, is_current
+from review_store import ReviewStore, load_reviews, read_review_entries, reviews_by_profile_index, added_reviews
+from output_store import output_store
+import checkpoints
+from sampler import sample_population
+from product_digest import build_product_digest
+import metrics
 
 # Warning control
 warnings.filterwarnings('ignore')
@@ -73,144 +91,640 @@ def load_json_file(file_path):
             
         raise Exception(f"Error reading {file_path}: {str(e)}")
 
-def load_reviews(reviews_dir: str = config.REVIEWS_DIR) -> List[Review]:
-    """Load all review files from the reviews directory"""
-    reviews = []
-    if os.path.exists(reviews_dir):
-        for filename in os.listdir(reviews_dir):
-            if filename.endswith('.json'):
-                file_path = os.path.join(reviews_dir, filename)
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as file:
-                        content = json.load(file)
-                        reviews.append(Review(**content))
-                except Exception as e:
-                    print(f"Error loading review file {filename}: {e}")
-    return reviews
+def sum_token_usage(results) -> Dict[str, int]:
+    """Suma el uso de tokens de varias ejecuciones de Crew"""
+    total = {}
+    for result in results:
+        usage = getattr(result, "token_usage", None)
+        if usage is None:
+            continue
+        for key, value in usage.model_dump().items():
+            if isinstance(value, (int, float)):
+                total[key] = total.get(key, 0) + value
+    return total
 
-def run_phase1(product_url: str, model_name: str = None) -> Dict[str, Any]:
-    """Run phase 1: Extract product info"""
-    # Create LLM instance
-    llm = create_llm(model_name)
-    
-    # Create product info agent
-    product_info_agent = create_product_info_agent(llm)
-    
-    # Create product info task
-    product_info_task = create_product_info_task(product_url, product_info_agent)
-    
-    # Create and run product info crew
-    product_crew = Crew(
-        agents=[product_info_agent],
-        tasks=[product_info_task],
-        verbose=False,
-        process=Process.sequential
-    )
-    
-    # Run the crew and get the Product object directly
-    product_results = product_crew.kickoff()
-    print("Fase 1: ", product_results.token_usage)
-    
-    return product_results
-    
+def result_to_dict(result) -> Dict[str, Any]:
+    """Convierte la salida de una Crew en un diccionario serializable a JSON"""
+    if getattr(result, "json_dict", None):
+        return result.json_dict
+    if getattr(result, "pydantic", None) is not None:
+        return result.pydantic.model_dump()
+    return json.loads(result.raw)
+
+def run_phase1(product_url: str, model_name: str = None, run_id: str = None,
+               use_product_cache: bool = True, use_cache: bool = False, force: bool = False) -> Dict[str, Any]:
+    """
+    Run phase 1: Extract product info
+
+    Si la ejecución ya tiene el producto de la misma URL y modelo (según su
+    checkpoint) se devuelve sin repetir la fase, salvo con force=True.
+    """
+    storage.ensure_run_dirs(run_id)
+    product_file = storage.get_product_info_file(run_id)
+    inputs = checkpoints.phase1_inputs(product_url, model_name)
+    if not force and checkpoints.is_valid(run_id, "phase1", inputs, product_file):
+        print("Fase 1: entradas sin cambios, se reutiliza el producto de la ejecución")
+        return load_json_file(product_file)
+
+    product = _extract_product(product_url, model_name, run_id, use_product_cache, use_cache)
+    checkpoints.record(run_id, "phase1", inputs, product_file)
+    return product
+
+def _extract_product(product_url: str, model_name: str = None, run_id: str = None,
+                     use_product_cache: bool = True, use_cache: bool = False) -> Dict[str, Any]:
+    """
+    Extrae la información del producto y la guarda en la ejecución.
 
-def run_phase2(num_reviewers: int, profile_parameters: Dict[str, Any], model_name: str = None) -> Dict[str, Any]:
-    """Run phase 2: Create user profiles"""
+    Si la URL normalizada está en la caché de productos y no ha caducado se
+    reutiliza el producto sin llamar al LLM. Si ha caducado se revalida con una
+    petición condicional (ETag / Last-Modified) y solo se vuelve a extraer si
+    la página ha cambiado.
+    """
     # Ensure output directories exist
-  
-    
-    # Create LLM instance
-    llm = create_llm(model_name)
+    storage.ensure_run_dirs(run_id)
+
+    entry = product_cache.get(product_url) if use_product_cache else None
+    if entry and product_cache.is_fresh(entry):
+        print("Fase 1: producto obtenido de la caché")
+        metrics.product_cache_requests.inc(result="hit")
+        output_store.save(run_id, "product", entry["product"])
+        return entry["product"]
+
+    try:
+        fetched = fetch_page(
+            product_url,
+            entry.get("etag") if entry else None,
+            entry.get("last_modified") if entry else None
+        )
+    except Exception as e:
+        print(f"No se pudo descargar la página del producto: {e}")
+        fetched = None
+
+    if entry and fetched and product_cache.revalidate(product_url, entry, fetched):
+        print("Fase 1: producto revalidado en la caché")
+        metrics.product_cache_requests.inc(result="revalidated")
+        output_store.save(run_id, "product", entry["product"])
+        return entry["product"]
+    page = fetched.text if fetched else None
+    if use_product_cache:
+        metrics.product_cache_requests.inc(result="miss")
+    
+    # Get the pooled LLM instance
+    key = llm_key(model_name, use_cache, Product)
+    llm = get_llm(model_name, use_cache, Product)
+    
+    # Lease the product info agent
+    with lease_agent(("product_info", key), lambda: create_product_info_agent(llm)) as product_info_agent:
+        # Create product info task
+        product_info_task = create_product_info_task(product_url, product_info_agent, page)
+        
+        # Create and run product info crew
+        product_crew = Crew(
+            agents=[product_info_agent],
+            tasks=[product_info_task],
+            verbose=False,
+            process=Process.sequential
+        )
+        
+        # Run the crew and get the Product object directly
+        product_results = product_crew.kickoff()
+    print("Fase 1: ", product_results.token_usage)
+    metrics.record_token_usage("phase1", model_name, product_results.token_usage)
+    product = result_to_dict(product_results)
+    output_store.save(run_id, "product", product)
+
+    # Solo se guardan en caché productos que cumplen el esquema
+    try:
+        Product(**product)
+        product_cache.put(product_url, product, page, fetched.etag if fetched else None,
+                          fetched.last_modified if fetched else None)
+    except Exception as e:
+        print(f"Producto no guardado en caché: {e}")
     
-    # Create user creator agent
-    user_creator_agent = create_user_creator_agent(llm)
+    return product
     
-    # Create user profiles only if num_reviewers > 0
-    if num_reviewers > 0:
-        # Create user profiles task
-        user_profiles_task = create_user_profiles_task(num_reviewers, profile_parameters, user_creator_agent)
-        
-        # Create and run user profiles crew
+
+def _run_profiles_batch(key, llm, attributes: List[Dict[str, Any]], profile_parameters: Dict[str, Any],
+                        diversity_hint: str = None):
+    """Escribe los textos de un lote de perfiles con un agente prestado del pool"""
+    with lease_agent(("user_creator", key), lambda: create_user_creator_agent(llm)) as user_creator_agent:
+        user_profiles_task = create_user_profiles_task(attributes, profile_parameters, user_creator_agent, diversity_hint)
         user_crew = Crew(
             agents=[user_creator_agent],
             tasks=[user_profiles_task],
             verbose=False,
             process=Process.sequential
         )
-        
-        # Run the crew and get List[BotProfile] directly
-        user_results = user_crew.kickoff()
-        print("Fase 2: ", user_results.token_usage)
-        
-    return user_results
+        result = user_crew.kickoff()
+    return result, result_to_dict(result).get("profiles", [])
+
+def merge_profiles(batches: List[tuple], profiles: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Combina los atributos muestreados con los textos del LLM de varios lotes.
+
+    Cada lote es (atributos, textos). Los textos se asocian por id; si el id
+    no pertenece al lote o ya se ha usado, se asignan al siguiente perfil libre
+    del lote. Los perfiles que no cumplen BotProfile o repiten nombre se descartan.
+    """
+    merged = list(profiles or [])
+    used_ids = {profile["id"] for profile in merged}
+    used_names = {profile["name"].strip().lower() for profile in merged}
+    for attributes, texts in batches:
+        by_id = {item["id"]: item for item in attributes}
+        for text in texts:
+            text_id = text.get("id") if isinstance(text, dict) else None
+            if text_id not in by_id or text_id in used_ids:
+                text_id = next((item["id"] for item in attributes if item["id"] not in used_ids), None)
+                if text_id is None:
+                    break
+            try:
+                profile = BotProfile(**{
+                    **text,
+                    "avatar": config.PROFILE_AVATAR_URL.format(id=text_id),
+                    **by_id[text_id]
+                }).model_dump()
+            except Exception as e:
+                print(f"Perfil descartado por no cumplir el esquema: {e}")
+                continue
+            name = profile["name"].strip().lower()
+            if name in used_names:
+                continue
+            used_ids.add(text_id)
+            used_names.add(name)
+            merged.append(profile)
+    return sorted(merged, key=lambda profile: profile["id"])
+
+def run_phase2(num_reviewers: int, profile_parameters: Dict[str, Any], model_name: str = None,
+               run_id: str = None, use_cache: bool = False, batch_size: int = None,
+               concurrency: int = None, force: bool = False) -> Dict[str, Any]:
+    """
+    Run phase 2: Create user profiles
+
+    La edad, el género, el nivel educativo y la personalidad se muestrean
+    localmente con sampler.sample_population según profile_parameters
+    (sampling_method y seed opcionales). El LLM solo escribe nombre, biografía,
+    ubicación e historia, en lotes de `batch_size` (por defecto
+    config.PHASE2_BATCH_SIZE) que se generan en paralelo, cada uno con sus ids
+    y una pista de diversidad. Si tras combinar los lotes falta algún perfil se
+    piden una vez más los textos de los que faltan.
 
-def run_phase3(product_info: Dict[str, Any], user_profiles: List[Dict[str, Any]], model_name: str = None) -> Dict[str, Any]:
-    """Run phase 3: Generate reviews"""
+    Con los mismos parámetros y modelo que la última vez (y sin force) se
+    reutilizan los perfiles de la ejecución.
+    """
     # Ensure output directories exist
-    print(user_profiles)
-    # Create LLM instance
-    llm = create_llm(model_name)
-    
-    
-   
-    # Create reviewer agents
-    reviewer_agents = create_reviewer_agents(user_profiles, llm)
-    
-    # Create reviewer tasks
-    reviewer_tasks = create_reviewer_tasks(product_info, user_profiles, reviewer_agents)
-    
-    # Create and run crew
-    phase3_crew = Crew(
-        agents=reviewer_agents,
-        tasks=reviewer_tasks,
-        verbose=False,
-        process=Process.sequential
+    storage.ensure_run_dirs(run_id)
+    profile_parameters = profile_parameters or {}
+    profiles_file = storage.get_user_profiles_file(run_id)
+    inputs = checkpoints.phase2_inputs(num_reviewers, profile_parameters, model_name)
+    if not force and checkpoints.is_valid(run_id, "phase2", inputs, profiles_file):
+        print("Fase 2: entradas sin cambios, se reutilizan los perfiles de la ejecución")
+        return {"profiles": load_run_profiles(run_id)}
+    
+    # Get the pooled LLM instance
+    key = llm_key(model_name, use_cache, ProfileTextsResponse)
+    llm = get_llm(model_name, use_cache, ProfileTextsResponse)
+
+    profiles = []
+    # Create user profiles only if num_reviewers > 0
+    if num_reviewers > 0:
+        profiles, results = generate_profiles(num_reviewers, profile_parameters, key, llm, batch_size, concurrency)
+        token_usage = sum_token_usage(results)
+        print("Fase 2: ", token_usage)
+        metrics.record_token_usage("phase2", model_name, token_usage)
+        output_store.save(run_id, "profiles", {"profiles": profiles})
+        checkpoints.record(run_id, "phase2", inputs, profiles_file)
+        
+    return {"profiles": profiles}
+
+def generate_profiles(num_profiles: int, profile_parameters: Dict[str, Any], key, llm, batch_size: int = None,
+                      concurrency: int = None, existing: List[Dict[str, Any]] = None):
+    """
+    Genera num_profiles perfiles nuevos por lotes en paralelo (ver run_phase2).
+
+    Con `existing` los ids nuevos continúan tras el mayor id existente y los
+    nombres no se repiten con los de esos perfiles.
+
+    Returns:
+        (perfiles existentes más los nuevos ordenados por id, lista de salidas de Crew)
+    """
+    existing = existing or []
+    first_id = max((int(profile["id"]) for profile in existing), default=0) + 1
+    seed = profile_parameters.get("seed")
+    population = sample_population(
+        num_profiles,
+        profile_parameters,
+        profile_parameters.get("sampling_method"),
+        # Otra semilla para cada ampliación, la misma de siempre para la población inicial
+        None if seed is None else seed + first_id - 1,
+        first_id
     )
-    
-    # Run the crew - each task produces a Review object
-    result = phase3_crew.kickoff()
-    print("Fase 3: ", result.token_usage)
-    # Load reviews
-    try:
-        reviews_list = load_reviews(config.REVIEWS_DIR)
-        reviews = [review.model_dump() for review in reviews_list] if reviews_list else []
-        with open(os.path.join(config.OUTPUT_DIR, 'reviews.json'), 'w', encoding='utf-8') as json_file:
-            json.dump({"reviews": reviews}, json_file, ensure_ascii=False, indent=4)
-    
-    except Exception as e:
-        print(f"Error loading reviews: {e}")
-        reviews = []
-    
+    batch_size = max(1, batch_size or config.PHASE2_BATCH_SIZE)
+    batches = [population[i:i + batch_size] for i in range(0, num_profiles, batch_size)]
+    hints = config.PROFILE_DIVERSITY_HINTS
+    max_workers = max(1, min(concurrency or config.PHASE2_CONCURRENCY, len(batches)))
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="profiles") as executor:
+        futures = [
+            executor.submit(
+                _run_profiles_batch, key, llm, attributes, profile_parameters,
+                hints[index % len(hints)] if len(batches) > 1 and hints else None
+            )
+            for index, attributes in enumerate(batches)
+        ]
+        outputs = [future.result() for future in futures]
+    results = [result for result, _ in outputs]
+    profiles = merge_profiles([(attributes, texts) for attributes, (_, texts) in zip(batches, outputs)], existing)
+
+    # One extra batch for the profiles lost to validation or de-duplication
+    done = {profile["id"] for profile in profiles}
+    missing = [item for item in population if item["id"] not in done]
+    if missing:
+        result, texts = _run_profiles_batch(key, llm, missing, profile_parameters)
+        results.append(result)
+        profiles = merge_profiles([(missing, texts)], profiles)
+        if len(profiles) - len(existing) < num_profiles:
+            print(f"Fase 2: solo se han generado {len(profiles) - len(existing)} de {num_profiles} perfiles válidos")
+    return profiles, results
+
+def _run_reviewer_crew(key, llm, make_task: Callable):
+    """
+    Ejecuta una única tarea de reseña en su propia Crew
+
+    El agente es genérico y se presta del pool solo mientras dura la tarea; el
+    perfil que interpreta va en la tarea que construye make_task(agente).
+    """
+    with lease_agent(("reviewer", key), lambda: create_reviewer_agent(llm=llm)) as agent:
+        reviewer_crew = Crew(
+            agents=[agent],
+            tasks=[make_task(agent)],
+            verbose=False,
+            process=Process.sequential
+        )
+        result = reviewer_crew.kickoff()
+    return result, result_to_dict(result)
+
+def run_phase3(product_info: Dict[str, Any], user_profiles: List[Dict[str, Any]], model_name: str = None,
+               concurrency: int = None, run_id: str = None, use_cache: bool = False,
+               on_review: Callable[[int, Dict[str, Any]], None] = None, force: bool = False,
+               keep: Dict[int, Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Run phase 3: Generate reviews
+
+    Cada reseña solo depende del producto y de su propio perfil, así que cada
+    tarea se ejecuta en una Crew independiente y hasta `concurrency` reseñas
+    se generan en paralelo (por defecto config.PHASE3_CONCURRENCY). Las reseñas
+    válidas se van añadiendo a un ReviewStore, que escribe reviews.json una sola
+    vez al final. Si se indica on_review, se llama con (índice, reseña) según
+    termina cada tarea.
+
+    Cada reseña se registra con el hash de las entradas de su tarea. Salvo con
+    force=True, las reseñas del registro de una ejecución anterior (completa o
+    interrumpida) cuyas entradas no han cambiado se reutilizan y solo se generan
+    las que faltan. Las reseñas de `keep` (índice -> reseña) se conservan siempre.
+    """
+    # Ensure output directories exist
+    storage.ensure_run_dirs(run_id)
+    reviews_file = storage.get_reviews_file(run_id)
+    inputs = checkpoints.phase3_inputs(product_info, user_profiles, model_name)
+    if not force and checkpoints.is_valid(run_id, "phase3", inputs, reviews_file):
+        print("Fase 3: entradas sin cambios, se reutilizan las reseñas de la ejecución")
+        reviews = load_run_reviews(run_id)
+        if on_review:
+            # Los clientes del stream reciben las reseñas reutilizadas igual que las generadas
+            entries = read_review_entries(storage.get_reviews_log_file(run_id))
+            indexed = ({index: entry["review"] for index, entry in entries.items()}
+                       or reviews_by_profile_index(reviews, user_profiles))
+            for index in sorted(indexed):
+                on_review(index, indexed[index])
+        return reviews
+
+    task_inputs = [checkpoints.review_inputs(product_info, profile, model_name) for profile in user_profiles]
+    previous = {} if force else read_review_entries(storage.get_reviews_log_file(run_id))
+    reused = {
+        index: entry["review"] for index, entry in previous.items()
+        if index < len(task_inputs) and entry.get("input_hash") == task_inputs[index]
+    }
+    reused.update({index: review for index, review in (keep or {}).items() if index < len(task_inputs)})
+    pending = [index for index in range(len(user_profiles)) if index not in reused]
+    if reused:
+        print(f"Fase 3: se reutilizan {len(reused)} reseñas; quedan {len(pending)} por generar")
+
+    # Get the pooled LLM instance
+    key = llm_key(model_name, use_cache, Review)
+    llm = get_llm(model_name, use_cache, Review)
+
+    with ReviewStore(run_id) as store:
+        for index in sorted(reused):
+            store.append(index, reused[index], task_inputs[index])
+            if on_review:
+                on_review(index, reused[index])
+
+        # El resumen del producto se calcula una sola vez y lo comparten todas las tareas
+        product_digest = build_product_digest(product_info)
+        
+        # Run the reviewer crews concurrently - each task produces a Review object
+        max_workers = max(1, min(concurrency or config.PHASE3_CONCURRENCY, len(pending) or 1))
+        results = [None] * len(pending)
+        appended = 0
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="reviewer") as executor:
+            futures = {
+                executor.submit(
+                    _run_reviewer_crew, key, llm,
+                    lambda agent, index=index: create_reviewer_task(product_info, user_profiles[index], agent,
+                                                                    index, product_digest)
+                ): position
+                for position, index in enumerate(pending)
+            }
+            for future in as_completed(futures):
+                position = futures[future]
+                index = pending[position]
+                results[position], review = future.result()
+                try:
+                    review = Review(**review).model_dump()
+                except Exception as e:
+                    print(f"Reseña {index} descartada por no cumplir el esquema: {e}")
+                    continue
+                store.append(index, review, task_inputs[index])
+                appended += 1
+                if on_review:
+                    on_review(index, review)
+        reviews = store.flush()
+    checkpoints.record(run_id, "phase3", inputs, reviews_file)
+    token_usage = sum_token_usage(results)
+    print("Fase 3: ", token_usage)
+    metrics.record_token_usage("phase3", model_name, token_usage)
+    # Solo cuentan las reseñas guardadas, no las descartadas por el esquema
+    metrics.phase_items.inc(appended, phase="phase3", model=metrics.model_label(model_name))
+
     return reviews
 
-def run_phase4(model_name: str = None) -> Dict[str, Any]:
-    """Run phase 4: Compile reviews and generate final report"""
+def load_run_reviews(run_id: str = None) -> List[Dict[str, Any]]:
+    """Carga las reseñas de una ejecución desde su ReviewStore (reviews.json o el registro reviews.jsonl)"""
+    return load_reviews(run_id)
+
+def load_run_profiles(run_id: str = None) -> List[Dict[str, Any]]:
+    """Carga los perfiles de reseñadores de una ejecución"""
+    profiles_file = storage.get_user_profiles_file(run_id)
+    if not os.path.exists(profiles_file):
+        return []
+    with open(profiles_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data.get("profiles", []) if isinstance(data, dict) else data
+
+def run_aggregates(run_id: str = None, reviews: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Agregados numéricos de las reseñas de la ejecución (ver analytics.update_aggregates).
+
+    Se reutilizan los guardados si corresponden al reviews.json actual; si no,
+    se calculan a partir de `reviews` (por defecto las de la ejecución) y se
+    guardan junto al hash de reviews.json.
+    """
+    reviews_hash = checkpoints.file_hash(storage.get_reviews_file(run_id))
+    aggregates_file = storage.get_aggregates_file(run_id)
+    if reviews_hash and os.path.exists(aggregates_file):
+        with open(aggregates_file, 'r', encoding='utf-8') as f:
+            stored = json.load(f)
+        if stored.get("reviews_hash") == reviews_hash and is_current(stored.get("aggregates")):
+            return stored["aggregates"]
+    aggregates = update_aggregates(None, load_run_reviews(run_id) if reviews is None else reviews)
+    if reviews_hash:
+        storage.atomic_write_json(aggregates_file, {"reviews_hash": reviews_hash, "aggregates": aggregates})
+    return aggregates
+
+def _run_summarizer_crew(key, llm, make_task: Callable):
+    """Ejecuta una tarea del map-reduce de la fase 4 con un agente prestado del pool"""
+    with lease_agent(("summarizer", key), lambda: create_summarizer_agent(llm)) as agent:
+        summarizer_crew = Crew(
+            agents=[agent],
+            tasks=[make_task(agent)],
+            verbose=False,
+            process=Process.sequential
+        )
+        result = summarizer_crew.kickoff()
+    return result, QualitativeAnalysis(**result_to_dict(result)).model_dump()
+
+def map_reduce_analysis(reviews: List[Dict[str, Any]], profiles: List[Dict[str, Any]], numeric_analysis: Dict[str, Any],
+                        key, llm, chunk_size: int = None, concurrency: int = None):
+    """
+    Genera el análisis cualitativo de muchas reseñas sin pasarlas todas en una llamada.
+
+    Map: las reseñas se dividen en bloques de chunk_size y cada bloque se resume
+    en paralelo en un QualitativeAnalysis parcial. Reduce: los parciales se
+    combinan de config.PHASE4_REDUCE_FANIN en config.PHASE4_REDUCE_FANIN hasta
+    que queda uno, así el contexto de cada llamada está acotado.
+
+    Returns:
+        (análisis cualitativo combinado, lista de salidas de Crew para sumar tokens)
+    """
+    chunk_size = chunk_size or config.PHASE4_CHUNK_SIZE
+    fanin = max(2, config.PHASE4_REDUCE_FANIN)
+    profiles_by_id = {profile.get("id"): profile for profile in profiles}
+    chunks = [reviews[i:i + chunk_size] for i in range(0, len(reviews), chunk_size)]
+    results = []
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency or config.PHASE4_CONCURRENCY),
+                            thread_name_prefix="summarizer") as executor:
+        def run_tasks(make_tasks):
+            outputs = list(executor.map(lambda make_task: _run_summarizer_crew(key, llm, make_task), make_tasks))
+            results.extend(result for result, _ in outputs)
+            return [partial for _, partial in outputs]
+
+        # Map: un análisis parcial por bloque de reseñas
+        partials = run_tasks([
+            lambda agent, index=index, chunk=chunk: create_chunk_analysis_task(
+                agent,
+                chunk,
+                [profiles_by_id[review.get("bot_id")] for review in chunk if review.get("bot_id") in profiles_by_id],
+                index,
+                len(chunks)
+            )
+            for index, chunk in enumerate(chunks)
+        ])
+        print(f"Fase 4: {len(partials)} análisis parciales")
+
+        # Reduce: combinar por grupos hasta que quede un único análisis
+        while len(partials) > 1:
+            groups = [partials[i:i + fanin] for i in range(0, len(partials), fanin)]
+            merged = run_tasks([
+                lambda agent, group=group: create_merge_analysis_task(agent, group, numeric_analysis)
+                for group in groups if len(group) > 1
+            ])
+            # Un grupo de un solo parcial pasa sin llamar al LLM
+            partials = merged + [group[0] for group in groups if len(group) == 1]
+
+    return partials[0], results
+
+def run_phase4(model_name: str = None, run_id: str = None, use_cache: bool = False,
+               chunk_size: int = None, force: bool = False) -> Dict[str, Any]:
+    """
+    Run phase 4: Compile reviews and generate final report
+
+    La valoración media, la distribución de valoraciones y las palabras clave se
+    calculan localmente con analytics; el LLM solo genera los puntos positivos,
+    negativos y los insights demográficos. Con más de `chunk_size` reseñas (por
+    defecto config.PHASE4_CHUNK_SIZE) esa parte se genera con map_reduce_analysis.
+
+    Si las reseñas, los perfiles, el modelo y chunk_size no han cambiado desde
+    el último informe (y sin force) se devuelve ese informe.
+    """
     # Ensure output directories exist
+    storage.ensure_run_dirs(run_id)
+    report_file = storage.get_final_report_file(run_id)
+
+    reviews = load_run_reviews(run_id)
+    profiles = load_run_profiles(run_id)
+    inputs = checkpoints.phase4_inputs(reviews, profiles, model_name, chunk_size)
+    if not force and checkpoints.is_valid(run_id, "phase4", inputs, report_file):
+        print("Fase 4: entradas sin cambios, se reutiliza el informe de la ejecución")
+        return load_json_file(report_file)
+
+    # Compute the numeric part of the report locally (from the stored aggregates when they are current)
+    numeric_analysis = analysis_from_aggregates(run_aggregates(run_id, reviews))
     
-    # Create LLM instance
-    llm = create_llm(model_name)
-    
-    # Create compiler agent
-    compiler_agent = create_compiler_agent(llm)
-    
-    # Create compiler task
-    compiler_task = create_compiler_task(compiler_agent)
-    
-    # Create and run crew
-    compiler_crew = Crew(
-        agents=[compiler_agent],
-        tasks=[compiler_task],
-        verbose=False,
-        process=Process.sequential
-    )
-    
-    # Run the crew and get the AnalysisResult object directly
-    phase4_results = compiler_crew.kickoff()
-    print("Fase 4: ", phase4_results.token_usage)
-    return phase4_results
+    # Get the pooled LLM instance
+    key = llm_key(model_name, use_cache, QualitativeAnalysis)
+    llm = get_llm(model_name, use_cache, QualitativeAnalysis)
+
+    if len(reviews) > (chunk_size or config.PHASE4_CHUNK_SIZE):
+        # Too many reviews for a single call: hierarchical compilation
+        qualitative, results = map_reduce_analysis(reviews, profiles, numeric_analysis, key, llm, chunk_size)
+        token_usage = sum_token_usage(results)
+    else:
+        # Lease the compiler agent (its review reading tool is bound to the run)
+        with lease_agent(("compiler", key, run_id), lambda: create_compiler_agent(llm, run_id)) as compiler_agent:
+            # Create compiler task
+            compiler_task = create_compiler_task(compiler_agent, numeric_analysis, profiles)
+            
+            # Create and run crew
+            compiler_crew = Crew(
+                agents=[compiler_agent],
+                tasks=[compiler_task],
+                verbose=False,
+                process=Process.sequential
+            )
+            
+            # Run the crew
+            phase4_results = compiler_crew.kickoff()
+        qualitative = QualitativeAnalysis(**result_to_dict(phase4_results)).model_dump()
+        token_usage = phase4_results.token_usage
+    print("Fase 4: ", token_usage)
+    metrics.record_token_usage("phase4", model_name, token_usage)
+
+    # Merge the qualitative analysis with the numeric one
+    report = AnalysisResult(**numeric_analysis, **qualitative).model_dump()
+    output_store.save(run_id, "report", report)
+    checkpoints.record(run_id, "phase4", inputs, report_file)
+    return report
     
     
 
+def extend_run(num_reviewers: int, model_name: str = None, run_id: str = None, use_cache: bool = False,
+               concurrency: int = None, profile_parameters: Dict[str, Any] = None, chunk_size: int = None,
+               on_review: Callable[[int, Dict[str, Any]], None] = None) -> Dict[str, Any]:
+    """
+    Amplía una ejecución terminada con num_reviewers reseñadores más.
+
+    Genera solo los perfiles nuevos (con ids a continuación de los existentes)
+    y sus reseñas; las reseñas anteriores se conservan sin volver a generarse.
+    La parte numérica del informe se actualiza sumando las reseñas nuevas a los
+    agregados guardados, y la cualitativa combinando el informe anterior con el
+    análisis de las reseñas nuevas, sin volver a pasar las anteriores al LLM.
+
+    Args:
+        num_reviewers: Número de reseñadores que se añaden
+        model_name: Modelo LLM (por defecto el de la ejecución)
+        run_id: Identificador de la ejecución
+        use_cache: Si se reutilizan respuestas del LLM de la caché de respuestas
+        concurrency: Número máximo de reseñas generadas en paralelo
+        profile_parameters: Parámetros de los perfiles nuevos (por defecto los de la ejecución)
+        chunk_size: Reseñas por bloque al analizar las reseñas nuevas
+        on_review: Callback (índice, reseña) de la fase 3
+
+    Returns:
+        Diccionario con los perfiles y reseñas añadidos, el total de reseñas y el informe actualizado
+    """
+    storage.ensure_run_dirs(run_id)
+    reviews_file = storage.get_reviews_file(run_id)
+    product_file = storage.get_product_info_file(run_id)
+    profiles = load_run_profiles(run_id)
+    if not os.path.exists(product_file) or not profiles:
+        raise checkpoints.IncompleteRunError("La ejecución no tiene producto o perfiles: ejecuta antes las fases 1 y 2")
+    if not os.path.exists(reviews_file):
+        raise checkpoints.IncompleteRunError("La fase 3 de la ejecución no ha terminado: reanúdala antes de ampliarla")
+    product_info = load_json_file(product_file)
+    params = checkpoints.load_run_params(run_id) or {}
+    model_name = model_name or params.get("model_name")
+    if profile_parameters is None:
+        profile_parameters = params.get("profile_parameters") or {}
+
+    # Aggregates of the current reviews (only computed here if they were never stored)
+    previous_aggregates = run_aggregates(run_id)
+    entries = read_review_entries(storage.get_reviews_log_file(run_id))
+    keep = ({index: entry["review"] for index, entry in entries.items()}
+            or reviews_by_profile_index(load_run_reviews(run_id), profiles))
+
+    # Phase 2: only the new profiles
+    key = llm_key(model_name, use_cache, ProfileTextsResponse)
+    llm = get_llm(model_name, use_cache, ProfileTextsResponse)
+    all_profiles, results = generate_profiles(num_reviewers, profile_parameters, key, llm,
+                                              concurrency=concurrency, existing=profiles)
+    previous_ids = {profile["id"] for profile in profiles}
+    new_profiles = [profile for profile in all_profiles if profile["id"] not in previous_ids]
+    token_usage = sum_token_usage(results)
+    print(f"Ampliación: {len(new_profiles)} perfiles nuevos ", token_usage)
+    metrics.record_token_usage("phase2", model_name, token_usage)
+    profiles_file = storage.get_user_profiles_file(run_id)
+    output_store.save(run_id, "profiles", {"profiles": all_profiles})
+    if params:
+        params = {**params, "num_reviewers": len(all_profiles)}
+        checkpoints.save_run_params(run_id, params)
+        checkpoints.record(run_id, "phase2", checkpoints.phase2_inputs(
+            params["num_reviewers"], params.get("profile_parameters") or {}, params.get("model_name")
+        ), profiles_file)
+
+    # Phase 3: the kept reviews are reused, only the new profiles are reviewed
+    reviews = run_phase3(product_info, all_profiles, model_name, concurrency, run_id,
+                         use_cache=use_cache, on_review=on_review, keep=keep)
+    # Reviews generated now: the new profiles plus any index missing from the kept ones
+    added = added_reviews(read_review_entries(storage.get_reviews_log_file(run_id)), keep)
+    new_reviews = list(added.values())
+    reviewed_profiles = [all_profiles[index] for index in added]
+
+    # Phase 4: incremental numeric analysis
+    aggregates = update_aggregates(previous_aggregates, new_reviews)
+    storage.atomic_write_json(storage.get_aggregates_file(run_id), {
+        "reviews_hash": checkpoints.file_hash(reviews_file), "aggregates": aggregates
+    })
+    numeric_analysis = analysis_from_aggregates(aggregates)
+
+    report_file = storage.get_final_report_file(run_id)
+    if "phase4" not in checkpoints.completed_phases(run_id):
+        # No previous report to build on: compile it from every review
+        report = run_phase4(model_name, run_id, use_cache=use_cache, chunk_size=chunk_size, force=True)
+    else:
+        previous_report = load_json_file(report_file)
+        qualitative = {field: previous_report.get(field, []) for field in QualitativeAnalysis.model_fields}
+        if new_reviews:
+            key = llm_key(model_name, use_cache, QualitativeAnalysis)
+            llm = get_llm(model_name, use_cache, QualitativeAnalysis)
+            added, results = map_reduce_analysis(new_reviews, reviewed_profiles, numeric_analysis, key, llm, chunk_size)
+            result, qualitative = _run_summarizer_crew(
+                key, llm, lambda agent: create_merge_analysis_task(agent, [qualitative, added], numeric_analysis)
+            )
+            token_usage = sum_token_usage(results + [result])
+            print("Ampliación (fase 4): ", token_usage)
+            metrics.record_token_usage("phase4", model_name, token_usage)
+        report = AnalysisResult(**numeric_analysis, **qualitative).model_dump()
+        output_store.save(run_id, "report", report)
+        checkpoints.record(run_id, "phase4",
+                           checkpoints.phase4_inputs(reviews, all_profiles, model_name, chunk_size), report_file)
+
+    return {
+        "added_profiles": new_profiles,
+        "added_reviews": new_reviews,
+        "total_reviews": len(reviews),
+        "analysis": report
+    }
+
 def run_api(request: APIRequest) -> APIResponse:
     """
     Función API principal que ejecuta el proceso completo y devuelve los resultados en formato JSON.
@@ -222,12 +736,11 @@ def run_api(request: APIRequest) -> APIResponse:
         APIResponse: Objeto de respuesta con los resultados en formato JSON
     """
     # Ejecutar la fase 1: Extraer información del producto
-    phase1_results = run_phase1(request.product_url, request.model_name)
-    product_info = phase1_results.raw
+    product_info = run_phase1(request.product_url, request.model_name)
     
     # Ejecutar la fase 2: Crear perfiles de usuario
-    phase2_results = run_phase2(request.num_reviewers, request.model_name)
-    user_profiles = phase2_results.to_dict()['profiles']
+    phase2_results = run_phase2(request.num_reviewers, {}, request.model_name)
+    user_profiles = phase2_results['profiles']
     
     # Ejecutar la fase 3: Generar reseñas
     phase3_results = run_phase3(product_info, user_profiles, request.model_name)
@@ -0,0 +1,247 @@
+import hashlib
+from abc import ABC, abstractmethod
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+import config
+import storage
+from metrics import Counter, registry
+
+def make_cache_key(model: str, temperature: Any, messages: Any, output_schema: Any = None) -> str:
+    """
+    Calcula la clave de una respuesta: hash del modelo, la temperatura, el
+    prompt renderizado y el esquema de salida (output_json) de la tarea.
+    """
+    schema = None
+    if output_schema is not None:
+        schema = output_schema.model_json_schema() if hasattr(output_schema, "model_json_schema") else output_schema
+    payload = json.dumps(
+        {"model": model, "temperature": temperature, "messages": messages, "schema": schema},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class CacheBackend(ABC):
+    """Interfaz de los almacenes de respuestas"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: str):
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+class MemoryLRUBackend(CacheBackend):
+    """Almacén en memoria que expulsa la entrada usada hace más tiempo"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class DiskBackend(CacheBackend):
+    """
+    Almacén en disco: un archivo JSON por clave, repartidos en subcarpetas.
+
+    Las entradas caducan a los `ttl` segundos de escribirse. Si se superan
+    `max_entries` archivos o `max_bytes` bytes se borran las entradas con el
+    mtime más antiguo hasta quedar en EVICT_TARGET del límite, para no
+    recorrer la carpeta en cada escritura. 0 desactiva cada límite.
+    """
+
+    EVICT_TARGET = 0.9
+
+    def __init__(self, cache_dir: str, max_entries: int = 0, max_bytes: int = 0, ttl: int = 0):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # (entradas, bytes) aproximados desde el último recorrido de la carpeta
+        self._totals = None
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _expired(self, mtime: float) -> bool:
+        return bool(self.ttl) and time.time() - mtime > self.ttl
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            if self._expired(os.path.getmtime(path)):
+                os.remove(path)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)["response"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def set(self, key: str, value: str):
+        path = self._path(key)
+        storage.atomic_write_json(path, {"response": value})
+        if not (self.max_entries or self.max_bytes):
+            return
+        with self._lock:
+            if self._totals is None:
+                self._totals = self._scan_totals()
+            else:
+                try:
+                    self._totals = (self._totals[0] + 1, self._totals[1] + os.path.getsize(path))
+                except OSError:
+                    pass
+            if self._over_limit(*self._totals):
+                self._evict()
+
+    def _over_limit(self, entries: int, size: int, target: float = 1.0) -> bool:
+        return bool((self.max_entries and entries > self.max_entries * target)
+                    or (self.max_bytes and size > self.max_bytes * target))
+
+    def _files(self):
+        files = []
+        for directory, _, names in os.walk(self.cache_dir):
+            for name in names:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _scan_totals(self):
+        files = self._files()
+        return len(files), sum(size for _, size, _ in files)
+
+    def _evict(self):
+        files = sorted(self._files())
+        entries, size = len(files), sum(size for _, size, _ in files)
+        # La entrada más reciente (la que se acaba de escribir) no se borra nunca
+        for mtime, file_size, path in files[:-1]:
+            if not self._expired(mtime) and not self._over_limit(entries, size, self.EVICT_TARGET):
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            entries -= 1
+            size -= file_size
+        self._totals = (entries, size)
+
+    def clear(self):
+        with self._lock:
+            if os.path.isdir(self.cache_dir):
+                shutil.rmtree(self.cache_dir)
+            self._totals = None
+
+    def __len__(self) -> int:
+        if not os.path.isdir(self.cache_dir):
+            return 0
+        return sum(len(files) for _, _, files in os.walk(self.cache_dir))
+
+class ResponseCache:
+    """
+    Caché de respuestas del LLM con una capa LRU en memoria delante de un
+    almacén opcional (por defecto en disco). Lleva la cuenta de aciertos y fallos.
+    """
+
+    def __init__(self, memory: MemoryLRUBackend, backend: Optional[CacheBackend] = None):
+        self.memory = memory
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is None and self.backend is not None:
+            value = self.backend.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: str):
+        self.memory.set(key, value)
+        if self.backend is not None:
+            self.backend.set(key, value)
+
+    def clear(self):
+        self.memory.clear()
+        if self.backend is not None:
+            self.backend.clear()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "memory_entries": len(self.memory),
+                "backend": type(self.backend).__name__ if self.backend is not None else None
+            }
+
+def create_response_cache() -> ResponseCache:
+    """Crea la caché según config.LLM_CACHE_BACKEND ("disk" o "memory")"""
+    backend = None
+    if config.LLM_CACHE_BACKEND == "disk":
+        backend = DiskBackend(config.LLM_CACHE_DIR, config.LLM_CACHE_MAX_ENTRIES, config.LLM_CACHE_MAX_BYTES,
+                              config.LLM_CACHE_TTL)
+    return ResponseCache(MemoryLRUBackend(config.LLM_CACHE_MEMORY_ENTRIES), backend)
+
+response_cache = create_response_cache()
+
+def collect_cache_metrics():
+    """Exporta los aciertos y fallos de la caché de respuestas como métrica"""
+    requests = Counter("reviews_llm_cache_requests_total", "Consultas a la caché de respuestas del LLM por resultado", ("result",))
+    requests.inc(response_cache.hits, result="hit")
+    requests.inc(response_cache.misses, result="miss")
+    return [requests]
+
+registry.register_collector(collect_cache_metrics)
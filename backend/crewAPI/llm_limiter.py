@@ -0,0 +1,250 @@
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+import config
+from rate_limit import TokenBucket
+from metrics import Gauge, llm_retries, llm_throttle_wait, model_label, registry
+
+class CircuitOpenError(Exception):
+    """Se lanza cuando el circuit breaker de un modelo está abierto y la llamada no se intenta"""
+
+def error_status(error: Exception) -> Optional[int]:
+    """Código HTTP de un error del proveedor (excepciones de litellm / openai), si lo tiene"""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    try:
+        return int(status)
+    except (TypeError, ValueError):
+        return None
+
+def classify_error(error: Exception) -> Optional[str]:
+    """
+    Devuelve "rate_limit" para los 429, "server_error" para los 5xx y los
+    cortes de conexión, o None si el error no se debe reintentar
+    """
+    status = error_status(error)
+    name = type(error).__name__
+    if status == 429 or "RateLimit" in name:
+        return "rate_limit"
+    if (status is not None and status >= 500) or name in (
+        "ServiceUnavailableError", "InternalServerError", "APIConnectionError", "Timeout", "APITimeoutError"
+    ):
+        return "server_error"
+    return None
+
+def estimate_tokens(messages: Any) -> int:
+    """Estimación de los tokens del prompt (unos 4 caracteres por token)"""
+    if isinstance(messages, str):
+        chars = len(messages)
+    else:
+        chars = sum(len(str(message.get("content", ""))) if isinstance(message, dict) else len(str(message))
+                    for message in messages or [])
+    return chars // 4 + 1
+
+class AdaptiveConcurrency:
+    """
+    Límite de llamadas simultáneas con control AIMD: cada llamada correcta suma
+    1/límite (unas +1 por ventana completa) y cada 429 lo divide entre dos.
+    """
+
+    def __init__(self, initial: int, maximum: int):
+        self.maximum = max(1, maximum)
+        self.limit = float(min(max(1, initial), self.maximum))
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self):
+        with self._condition:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    def on_throttle(self):
+        with self._condition:
+            self.limit = max(1.0, self.limit / 2)
+
+class CircuitBreaker:
+    """
+    Circuit breaker por modelo: "closed" deja pasar las llamadas, "open" las
+    rechaza hasta que pasa el cooldown y "half_open" deja pasar una sola de
+    prueba, que cierra el circuito si va bien o lo vuelve a abrir si falla.
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self._opened_at < self.cooldown:
+                    raise CircuitOpenError("El proveedor del LLM está fallando; se reintentará más tarde")
+                self.state = "half_open"
+                self._probing = False
+            if self.state == "half_open":
+                if self._probing:
+                    raise CircuitOpenError("El proveedor del LLM se está recuperando; se reintentará más tarde")
+                self._probing = True
+
+    def on_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def on_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.threshold:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def on_neutral(self):
+        """Llamada que terminó sin decidir nada sobre el proveedor (p. ej. un error de validación)"""
+        with self._lock:
+            self._probing = False
+
+class ModelLimiter:
+    """Limitador de un modelo: RPM, TPM, concurrencia adaptativa, reintentos y circuit breaker"""
+
+    def __init__(self, model: str, rpm: int, tpm: int):
+        self.model = model
+        self.rpm = TokenBucket.per_minute(rpm) if rpm > 0 else None
+        self.tpm = TokenBucket.per_minute(tpm) if tpm > 0 else None
+        self.concurrency = AdaptiveConcurrency(config.LLM_INITIAL_CONCURRENCY, config.LLM_MAX_CONCURRENCY)
+        self.breaker = CircuitBreaker(config.LLM_BREAKER_THRESHOLD, config.LLM_BREAKER_COOLDOWN)
+
+    def _wait_for_capacity(self, tokens: int):
+        started = time.perf_counter()
+        self.concurrency.acquire()
+        try:
+            if self.rpm is not None:
+                self.rpm.acquire(1)
+            if self.tpm is not None:
+                self.tpm.acquire(tokens)
+        except BaseException:
+            self.concurrency.release()
+            raise
+        llm_throttle_wait.observe(time.perf_counter() - started, model=self.model)
+
+    def call(self, func: Callable[[], Any], prompt_tokens: int = 0) -> Any:
+        """
+        Ejecuta func() respetando los límites del modelo y la reintenta con
+        backoff exponencial con jitter completo ante 429 y errores 5xx
+        """
+        reserved = prompt_tokens + config.LLM_COMPLETION_TOKENS_ESTIMATE
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            self._wait_for_capacity(reserved)
+            try:
+                response = func()
+            except Exception as e:
+                reason = classify_error(e)
+                if reason is None:
+                    self.breaker.on_neutral()
+                    raise
+                self._on_provider_error(reason, attempt)
+                if attempt >= config.LLM_MAX_RETRIES:
+                    raise
+                error = e
+            else:
+                self.concurrency.on_success()
+                self.breaker.on_success()
+                if self.tpm is not None and isinstance(response, str):
+                    # Ajusta la reserva a la longitud real de la respuesta
+                    self.tpm.adjust(prompt_tokens + len(response) // 4 - reserved)
+                return response
+            finally:
+                self.concurrency.release()
+
+            # La espera se hace sin ocupar un hueco de concurrencia
+            llm_retries.inc(model=self.model, reason=reason)
+            delay = random.uniform(0, min(config.LLM_BACKOFF_MAX, config.LLM_BACKOFF_BASE * 2 ** attempt))
+            print(f"Error {reason} del LLM {self.model}; reintento {attempt + 1} en {delay:.1f}s: {str(error)}")
+            attempt += 1
+            time.sleep(delay)
+
+    def _on_provider_error(self, reason: str, attempt: int):
+        if reason == "rate_limit":
+            self.concurrency.on_throttle()
+            # Un 429 no significa que el proveedor esté caído: solo cuenta para el
+            # circuit breaker si se agotan los reintentos
+            if attempt >= config.LLM_MAX_RETRIES:
+                self.breaker.on_failure()
+            else:
+                self.breaker.on_neutral()
+        else:
+            self.breaker.on_failure()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency_limit": self.concurrency.limit,
+            "in_flight": self.concurrency.in_flight,
+            "breaker": self.breaker.state,
+            "rpm_available": self.rpm.available() if self.rpm else None,
+            "tpm_available": self.tpm.available() if self.tpm else None
+        }
+
+class LLMLimiter:
+    """Limitadores por modelo compartidos por todos los LLM del proceso"""
+
+    def __init__(self):
+        self._limiters: Dict[str, ModelLimiter] = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_name: Optional[str]) -> ModelLimiter:
+        model = model_label(model_name)
+        with self._lock:
+            limiter = self._limiters.get(model)
+            if limiter is None:
+                limits = config.LLM_RATE_LIMITS.get(model, {})
+                limiter = self._limiters[model] = ModelLimiter(
+                    model,
+                    int(limits.get("rpm", config.LLM_DEFAULT_RPM)),
+                    int(limits.get("tpm", config.LLM_DEFAULT_TPM))
+                )
+            return limiter
+
+    def call(self, model_name: Optional[str], func: Callable[[], Any], messages: Any = None) -> Any:
+        return self.get(model_name).call(func, estimate_tokens(messages))
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return {limiter.model: limiter.stats() for limiter in limiters}
+
+llm_limiter = LLMLimiter()
+
+BREAKER_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+def collect_limiter_metrics() -> List[Gauge]:
+    """Exporta el límite de concurrencia, las llamadas en curso y el estado del circuit breaker por modelo"""
+    limit = Gauge("reviews_llm_concurrency_limit", "Límite adaptativo de llamadas simultáneas por modelo", ("model",))
+    in_flight = Gauge("reviews_llm_in_flight", "Llamadas al LLM en curso por modelo", ("model",))
+    breaker = Gauge("reviews_llm_breaker_state", "Estado del circuit breaker (0 cerrado, 1 semiabierto, 2 abierto)", ("model",))
+    for model, stats in llm_limiter.stats().items():
+        limit.set(stats["concurrency_limit"], model=model)
+        in_flight.set(stats["in_flight"], model=model)
+        breaker.set(BREAKER_STATES[stats["breaker"]], model=model)
+    return [limit, in_flight, breaker]
+
+registry.register_collector(collect_limiter_metrics)
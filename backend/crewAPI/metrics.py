@@ -0,0 +1,237 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+import config
+
+# Límites de los histogramas de latencia (segundos)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+TOKEN_TYPES = ("prompt_tokens", "completion_tokens", "cached_prompt_tokens")
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+class Metric(ABC):
+    """Métrica con etiquetas; cada combinación de valores de etiquetas es una serie"""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> List[Tuple[str, Dict[str, Any], float]]:
+        """Series de la métrica como (nombre, etiquetas, valor)"""
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, value: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, dict(zip(self.labelnames, key)), value) for key, value in self._values.items()]
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, dict(zip(self.labelnames, key)), value) for key, value in self._values.items()]
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # conteos por bucket, suma, total
+                series = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        result = []
+        with self._lock:
+            for key, (counts, total, count) in self._values.items():
+                labels = dict(zip(self.labelnames, key))
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    result.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+                result.append((f"{self.name}_sum", labels, total))
+                result.append((f"{self.name}_count", labels, count))
+        return result
+
+class Registry:
+    """
+    Registro de métricas en proceso con salida en el formato de texto de Prometheus.
+
+    Además de las métricas registradas admite colectores: funciones que en el
+    momento de exportar devuelven métricas calculadas a partir de otros
+    objetos (p. ej. los contadores de la caché de respuestas).
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], List[Metric]]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], List[Metric]]):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        for collector in collectors:
+            metrics.extend(collector())
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+llm_tokens = registry.counter(
+    "reviews_llm_tokens_total", "Tokens consumidos por fase, modelo y tipo", ("phase", "model", "type")
+)
+llm_phase_requests = registry.counter(
+    "reviews_llm_phase_requests_total", "Llamadas al LLM completadas por fase y modelo", ("phase", "model")
+)
+llm_calls = registry.counter(
+    "reviews_llm_calls_total", "Llamadas al LLM por modelo y resultado", ("model", "status")
+)
+llm_call_latency = registry.histogram(
+    "reviews_llm_call_duration_seconds", "Latencia de cada llamada al LLM", ("model",)
+)
+phase_runs = registry.counter(
+    "reviews_phase_runs_total", "Ejecuciones de cada fase por modelo y resultado", ("phase", "model", "status")
+)
+phase_latency = registry.histogram(
+    "reviews_phase_duration_seconds", "Duración de cada fase", ("phase", "model")
+)
+phase_items = registry.counter(
+    "reviews_phase_items_total", "Elementos generados por fase (p. ej. reseñas en la fase 3)", ("phase", "model")
+)
+llm_retries = registry.counter(
+    "reviews_llm_retries_total", "Reintentos de llamadas al LLM por modelo y motivo", ("model", "reason")
+)
+llm_throttle_wait = registry.histogram(
+    "reviews_llm_throttle_wait_seconds", "Espera en el limitador antes de cada llamada al LLM", ("model",)
+)
+product_cache_requests = registry.counter(
+    "reviews_product_cache_requests_total", "Consultas a la caché de productos por resultado", ("result",)
+)
+
+def model_label(model_name: Optional[str]) -> str:
+    return model_name or config.DEFAULT_MODEL
+
+def record_token_usage(phase: str, model_name: Optional[str], usage: Any):
+    """Registra el uso de tokens de una fase (UsageMetrics de CrewAI o diccionario)"""
+    if usage is None:
+        return
+    if hasattr(usage, "model_dump"):
+        usage = usage.model_dump()
+    model = model_label(model_name)
+    for token_type in TOKEN_TYPES:
+        if usage.get(token_type):
+            llm_tokens.inc(usage[token_type], phase=phase, model=model, type=token_type.replace("_tokens", ""))
+    if usage.get("successful_requests"):
+        llm_phase_requests.inc(usage["successful_requests"], phase=phase, model=model)
+
+@contextmanager
+def track_phase(phase: str, model_name: Optional[str] = None) -> Iterator[None]:
+    """Mide la duración de una fase y cuenta si termina bien o con error"""
+    model = model_label(model_name)
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        phase_runs.inc(phase=phase, model=model, status="failed")
+        raise
+    else:
+        phase_runs.inc(phase=phase, model=model, status="completed")
+    finally:
+        phase_latency.observe(time.perf_counter() - started, phase=phase, model=model)
+
+@contextmanager
+def track_llm_call(model_name: Optional[str]) -> Iterator[None]:
+    """Mide la latencia de una llamada al LLM y cuenta los errores"""
+    model = model_label(model_name)
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        llm_calls.inc(model=model, status="error")
+        raise
+    else:
+        llm_calls.inc(model=model, status="success")
+    finally:
+        llm_call_latency.observe(time.perf_counter() - started, model=model)
@@ -42,6 +42,16 @@ class BotProfile(BaseModel):
 class UserProfilesResponse(BaseModel):
     profiles: List[BotProfile]
 
+class ProfileText(BaseModel):
+    id: int = Field(..., description="ID del perfil al que pertenecen los textos")
+    name: str = Field(..., description="Nombre completo del bot")
+    bio: str = Field(..., description="Biografía breve del bot")
+    location: str = Field(..., description="Ubicación del bot")
+    backstory: str = Field(..., description="Historia detallada del bot")
+
+class ProfileTextsResponse(BaseModel):
+    profiles: List[ProfileText]
+
 class Review(BaseModel):
     id: int = Field(..., description="ID único de la review")
     bot_id: int = Field(..., description="ID del bot que generó la review")
@@ -70,6 +80,11 @@ class AnalysisResult(BaseModel):
     keyword_analysis: List[KeywordAnalysis] = Field(..., description="Análisis de palabras clave")
     demographic_insights: List[str] = Field(..., description="Insights demográficos")
 
+class QualitativeAnalysis(BaseModel):
+    positive_points: List[str] = Field(..., description="Puntos positivos destacados")
+    negative_points: List[str] = Field(..., description="Puntos negativos destacados")
+    demographic_insights: List[str] = Field(..., description="Insights demográficos")
+
 class APIRequest(BaseModel):
     product_url: str = Field(..., description="URL del producto para generar reviews")
     num_reviewers: int = Field(3, description="Número de reseñadores a crear")
@@ -0,0 +1,386 @@
+import json
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import config
+import storage
+
+# Documentos de salida de una ejecución y el archivo JSON de cada uno
+DOCUMENT_FILES = {
+    "product": storage.get_product_info_file,
+    "profiles": storage.get_user_profiles_file,
+    "reviews": storage.get_reviews_file,
+    "report": storage.get_final_report_file,
+}
+
+# Documentos que se guardan fila a fila: clave de la lista en el JSON y
+# columnas indexadas de cada fila (con su tipo)
+ROW_DOCUMENTS = {
+    "profiles": ("profiles", {"gender": str, "education_level": str, "age": int}),
+    "reviews": ("reviews", {"bot_id": int, "rating": int}),
+}
+
+def document_rows(kind: str, data: Any) -> List[Dict[str, Any]]:
+    """Filas de un documento de perfiles o reseñas ({"profiles": [...]} o la lista directamente)"""
+    key = ROW_DOCUMENTS[kind][0]
+    rows = data.get(key, []) if isinstance(data, dict) else data
+    return [row for row in rows or [] if isinstance(row, dict)]
+
+class OutputStore(ABC):
+    """Interfaz de los almacenes de los documentos de salida de las ejecuciones"""
+
+    # True si el almacén resuelve consultas filtradas (query) por sí mismo
+    supports_query = False
+
+    @abstractmethod
+    def save(self, run_id: Optional[str], kind: str, data: Any):
+        ...
+
+    @abstractmethod
+    def load(self, run_id: Optional[str], kind: str) -> Any:
+        """Documento guardado, o None si no existe"""
+
+    @abstractmethod
+    def version(self, run_id: Optional[str], kind: str) -> Any:
+        """Valor que cambia cada vez que cambia el documento (None si no existe)"""
+
+    def stored_version(self, run_id: Optional[str], kind: str) -> Any:
+        """
+        Versión del documento si el almacén lo guarda fuera de los archivos JSON
+        de la ejecución (None si solo está en su archivo)
+        """
+        return None
+
+    @abstractmethod
+    def delete(self, run_id: Optional[str], kind: str):
+        ...
+
+    @abstractmethod
+    def delete_run(self, run_id: Optional[str]):
+        ...
+
+    @abstractmethod
+    def list_runs(self) -> List[str]:
+        ...
+
+class JsonOutputStore(OutputStore):
+    """Almacén en archivos JSON: un archivo por documento en la carpeta de la ejecución"""
+
+    def save(self, run_id: Optional[str], kind: str, data: Any):
+        storage.atomic_write_json(DOCUMENT_FILES[kind](run_id), data)
+
+    def load(self, run_id: Optional[str], kind: str) -> Any:
+        try:
+            with open(DOCUMENT_FILES[kind](run_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def version(self, run_id: Optional[str], kind: str) -> Any:
+        try:
+            stat = os.stat(DOCUMENT_FILES[kind](run_id))
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def delete(self, run_id: Optional[str], kind: str):
+        file_path = DOCUMENT_FILES[kind](run_id)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+    def delete_run(self, run_id: Optional[str]):
+        # Los archivos los borra storage.clean_run junto con el resto de la carpeta
+        pass
+
+    def list_runs(self) -> List[str]:
+        return storage.list_runs()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    run_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    data TEXT,
+    version INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (run_id, kind)
+);
+CREATE TABLE IF NOT EXISTS profiles (
+    run_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    id INTEGER,
+    gender TEXT,
+    education_level TEXT,
+    age INTEGER,
+    data TEXT NOT NULL,
+    PRIMARY KEY (run_id, position)
+);
+CREATE TABLE IF NOT EXISTS reviews (
+    run_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    id INTEGER,
+    bot_id INTEGER,
+    rating INTEGER,
+    data TEXT NOT NULL,
+    PRIMARY KEY (run_id, position)
+);
+CREATE INDEX IF NOT EXISTS idx_profiles_id ON profiles (run_id, id);
+CREATE INDEX IF NOT EXISTS idx_profiles_gender ON profiles (run_id, gender);
+CREATE INDEX IF NOT EXISTS idx_profiles_age ON profiles (run_id, age);
+CREATE INDEX IF NOT EXISTS idx_reviews_id ON reviews (run_id, id);
+CREATE INDEX IF NOT EXISTS idx_reviews_bot_id ON reviews (run_id, bot_id);
+CREATE INDEX IF NOT EXISTS idx_reviews_rating ON reviews (run_id, rating);
+"""
+
+def _column_value(value: Any, column_type: type) -> Any:
+    """Valor de una columna indexada: enteros como enteros y textos en minúsculas"""
+    if value is None:
+        return None
+    if column_type is int:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+    return str(value).strip().lower()
+
+class SQLiteOutputStore(JsonOutputStore):
+    """
+    Almacén en una base de datos SQLite embebida (modo WAL: los lectores no
+    bloquean al escritor ni entre sí).
+
+    El producto y el informe se guardan como un documento JSON por ejecución;
+    los perfiles y las reseñas, fila a fila con índices por run_id, bot_id,
+    rating, género y edad, y se insertan de una vez en una sola transacción
+    por fase. Los archivos JSON de la ejecución se siguen escribiendo porque
+    son la copia de trabajo de las fases (checkpoints, reanudación, extend_run).
+    Los documentos que no están en la base de datos (ejecuciones anteriores a
+    activar el backend) se leen de sus archivos.
+    """
+
+    supports_query = True
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        self._cache: Dict[Tuple[str, str], Tuple[Any, Any]] = {}
+        self._cache_lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Conexión del hilo actual (sqlite3 no comparte conexiones entre hilos)"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            connection = sqlite3.connect(self.db_path, timeout=config.SQLITE_BUSY_TIMEOUT, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            with self._schema_lock:
+                if not self._schema_ready:
+                    connection.executescript(SCHEMA)
+                    self._schema_ready = True
+            self._local.connection = connection
+        return connection
+
+    def _write(self, operations):
+        """Ejecuta operations(connection) en una transacción de escritura"""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            operations(connection)
+            connection.execute("COMMIT")
+        except BaseException:
+            # Un COMMIT fallido (p. ej. SQLITE_BUSY) deja la transacción abierta
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+
+    def save(self, run_id: Optional[str], kind: str, data: Any):
+        """
+        Guarda el documento en la base de datos y en su archivo JSON.
+
+        Las filas se escriben primero y el archivo se reemplaza dentro de la
+        misma transacción, antes del COMMIT: si falla el archivo no se confirma
+        nada. Si falla la base de datos, el archivo se escribe igualmente y se
+        descarta la versión guardada en ella, de modo que las lecturas pasan a
+        servir el archivo en lugar de un documento antiguo.
+        """
+        key = run_id or ""
+
+        def operations(connection):
+            document = data
+            if kind in ROW_DOCUMENTS:
+                columns = ROW_DOCUMENTS[kind][1]
+                names = ["run_id", "position", "id", *columns, "data"]
+                connection.execute(f"DELETE FROM {kind} WHERE run_id = ?", (key,))
+                # Sin id numérico la fila ordena como id 0, igual que en el índice en memoria de la API
+                connection.executemany(
+                    f"INSERT INTO {kind} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})",
+                    (
+                        (key, position, _column_value(row.get("id"), int) or 0,
+                         *(_column_value(row.get(column), column_type) for column, column_type in columns.items()),
+                         json.dumps(row, ensure_ascii=False))
+                        for position, row in enumerate(document_rows(kind, data))
+                    )
+                )
+                document = None
+            connection.execute(
+                "INSERT INTO documents (run_id, kind, data, version, updated_at) VALUES (?, ?, ?, 1, ?) "
+                "ON CONFLICT (run_id, kind) DO UPDATE SET data = excluded.data, "
+                "version = documents.version + 1, updated_at = excluded.updated_at",
+                (key, kind, None if document is None else json.dumps(document, ensure_ascii=False), time.time())
+            )
+            JsonOutputStore.save(self, run_id, kind, data)
+
+        try:
+            self._write(operations)
+        except sqlite3.Error as e:
+            print(f"Error al guardar {kind} de la ejecución {run_id or 'compartida'} en SQLite: {str(e)}; "
+                  "se servirá desde su archivo")
+            JsonOutputStore.save(self, run_id, kind, data)
+            self._forget(run_id, kind)
+
+    def stored_version(self, run_id: Optional[str], kind: str) -> Any:
+        row = self._connection().execute(
+            "SELECT version, updated_at FROM documents WHERE run_id = ? AND kind = ?", (run_id or "", kind)
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def version(self, run_id: Optional[str], kind: str) -> Any:
+        return self.stored_version(run_id, kind) or super().version(run_id, kind)
+
+    def load(self, run_id: Optional[str], kind: str) -> Any:
+        """
+        Documento guardado. Se cachea en memoria con su versión, así que solo
+        se vuelve a leer de la base de datos si ha cambiado. Como con la caché
+        de resultados de la API, el documento devuelto no debe modificarse.
+        """
+        version = self.stored_version(run_id, kind)
+        if version is None:
+            return super().load(run_id, kind)
+        key = (run_id or "", kind)
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        connection = self._connection()
+        if kind in ROW_DOCUMENTS:
+            rows = connection.execute(
+                f"SELECT data FROM {kind} WHERE run_id = ? ORDER BY position", (run_id or "",)
+            ).fetchall()
+            data = {ROW_DOCUMENTS[kind][0]: [json.loads(row[0]) for row in rows]}
+        else:
+            row = connection.execute(
+                "SELECT data FROM documents WHERE run_id = ? AND kind = ?", (run_id or "", kind)
+            ).fetchone()
+            data = json.loads(row[0]) if row and row[0] is not None else None
+        with self._cache_lock:
+            self._cache[key] = (version, data)
+        return data
+
+    def _forget(self, run_id: Optional[str], kind: str):
+        """Borra el documento de la base de datos (las lecturas pasan a su archivo)"""
+        key = run_id or ""
+
+        def operations(connection):
+            if kind in ROW_DOCUMENTS:
+                connection.execute(f"DELETE FROM {kind} WHERE run_id = ?", (key,))
+            connection.execute("DELETE FROM documents WHERE run_id = ? AND kind = ?", (key, kind))
+
+        self._write(operations)
+        with self._cache_lock:
+            self._cache.pop((key, kind), None)
+
+    def delete(self, run_id: Optional[str], kind: str):
+        # Primero la base de datos: si falla, el archivo sigue coincidiendo con ella
+        self._forget(run_id, kind)
+        super().delete(run_id, kind)
+
+    def delete_run(self, run_id: Optional[str]):
+        key = run_id or ""
+
+        def operations(connection):
+            for table in ("documents", *ROW_DOCUMENTS):
+                connection.execute(f"DELETE FROM {table} WHERE run_id = ?", (key,))
+
+        self._write(operations)
+        with self._cache_lock:
+            for cache_key in [cache_key for cache_key in self._cache if cache_key[0] == key]:
+                del self._cache[cache_key]
+
+    def list_runs(self) -> List[str]:
+        """run_id con documentos en la base de datos, sin recorrer las carpetas"""
+        rows = self._connection().execute(
+            "SELECT DISTINCT run_id FROM documents WHERE run_id != '' ORDER BY run_id"
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def query(self, kind: str, run_id: Optional[str], conditions: List[tuple],
+              after: Optional[Tuple[int, int]] = None, limit: Optional[int] = None,
+              reviewer_conditions: List[tuple] = ()) -> Optional[Tuple[List[Dict[str, Any]], Optional[Tuple[int, int]]]]:
+        """
+        Filas de perfiles o reseñas que cumplen las condiciones, ordenadas por
+        (id, posición): los id pueden repetirse y la posición desempata.
+
+        Las condiciones son ("eq", columna, valores) o ("range", columna, mínimo,
+        máximo) sobre las columnas indexadas; reviewer_conditions filtra las
+        reseñas por los atributos de su reseñador (perfiles de la misma ejecución).
+
+        Returns:
+            (filas, siguiente), donde siguiente es el (id, posición) de la última
+            fila si quedan más, o None si los documentos no están en la base de datos
+        """
+        if self.stored_version(run_id, kind) is None or (
+                reviewer_conditions and self.stored_version(run_id, "profiles") is None):
+            return None
+        key = run_id or ""
+        where, params = self._where(kind, key, conditions)
+        if reviewer_conditions:
+            profile_where, profile_params = self._where("profiles", key, reviewer_conditions)
+            where.append(f"bot_id IN (SELECT id FROM profiles WHERE {' AND '.join(profile_where)})")
+            params.extend(profile_params)
+        if after is not None:
+            where.append("(id > ? OR (id = ? AND position > ?))")
+            params.extend((after[0], after[0], after[1]))
+        sql = f"SELECT data, id, position FROM {kind} WHERE {' AND '.join(where)} ORDER BY id, position"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit + 1)
+        rows = self._connection().execute(sql, params).fetchall()
+        if limit is not None and len(rows) > limit:
+            last = rows[limit - 1]
+            return [json.loads(row[0]) for row in rows[:limit]], (last[1], last[2])
+        return [json.loads(row[0]) for row in rows], None
+
+    @staticmethod
+    def _where(kind: str, key: str, conditions: List[tuple]) -> Tuple[List[str], List[Any]]:
+        columns = ROW_DOCUMENTS[kind][1]
+        where, params = ["run_id = ?"], [key]
+        for condition in conditions:
+            column = condition[1]
+            column_type = columns[column]
+            if condition[0] == "eq":
+                values = [value for value in (_column_value(v, column_type) for v in condition[2]) if value is not None]
+                if not values:
+                    where.append("0")
+                    continue
+                where.append(f"{column} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+            else:
+                if condition[2] is not None:
+                    where.append(f"{column} >= ?")
+                    params.append(condition[2])
+                if condition[3] is not None:
+                    where.append(f"{column} <= ?")
+                    params.append(condition[3])
+        return where, params
+
+def create_output_store() -> OutputStore:
+    """Crea el almacén según config.STORAGE_BACKEND ("json" o "sqlite")"""
+    if config.STORAGE_BACKEND == "sqlite":
+        return SQLiteOutputStore(config.SQLITE_DB_PATH)
+    return JsonOutputStore()
+
+output_store = create_output_store()
@@ -0,0 +1,123 @@
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, List
+import config
+
+class LLMPool:
+    """
+    Reutiliza los clientes LLM entre fases y peticiones.
+
+    Hay un cliente por combinación de modelo, caché de respuestas y esquema de
+    salida. Los clientes no guardan estado de la conversación, así que un
+    mismo cliente puede usarse a la vez desde varios hilos.
+    """
+
+    def __init__(self):
+        self._clients: Dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._clients[key] = factory()
+            return client
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+class AgentPool:
+    """
+    Pool de agentes (y herramientas) reutilizables.
+
+    Un agente guarda estado mientras ejecuta una tarea, así que se presta en
+    exclusiva con `lease` y se devuelve al terminar. Se conservan como mucho
+    `max_idle` agentes libres; los de las claves usadas hace más tiempo se descartan.
+    """
+
+    def __init__(self, max_idle: int):
+        self.max_idle = max_idle
+        self._idle: "OrderedDict[Hashable, List[Any]]" = OrderedDict()
+        self._idle_count = 0
+        self._tools: Dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        with self._lock:
+            agents = self._idle.get(key)
+            if agents:
+                self._idle_count -= 1
+                self.reused += 1
+                return agents.pop()
+            self.created += 1
+        return factory()
+
+    def release(self, key: Hashable, agent: Any):
+        with self._lock:
+            self._idle.setdefault(key, []).append(agent)
+            self._idle.move_to_end(key)
+            self._idle_count += 1
+            while self._idle_count > self.max_idle:
+                oldest_key, agents = next(iter(self._idle.items()))
+                agents.pop(0)
+                self._idle_count -= 1
+                if not agents:
+                    del self._idle[oldest_key]
+
+    @contextmanager
+    def lease(self, key: Hashable, factory: Callable[[], Any]) -> Iterator[Any]:
+        """Presta un agente libre de la clave (o uno nuevo) y lo devuelve al pool al salir"""
+        agent = self.acquire(key, factory)
+        try:
+            yield agent
+        finally:
+            self.release(key, agent)
+
+    def tool(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Devuelve una herramienta compartida (las herramientas no guardan estado entre llamadas)"""
+        with self._lock:
+            tool = self._tools.get(key)
+            if tool is None:
+                tool = self._tools[key] = factory()
+            return tool
+
+    def clear(self):
+        with self._lock:
+            self._idle.clear()
+            self._idle_count = 0
+            self._tools.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"idle": self._idle_count, "keys": len(self._idle), "created": self.created, "reused": self.reused}
+
+def configure_http_client():
+    """
+    Hace que litellm use un único cliente HTTP con conexiones keep-alive para
+    todas las llamadas síncronas, en lugar de abrir conexiones por petición.
+    """
+    # Importación local: litellm es pesado y solo hace falta al crear el primer LLM
+    try:
+        import httpx
+        import litellm
+    except ImportError:  # llegan como dependencias de crewai
+        return
+    if getattr(litellm, "client_session", None) is not None:
+        return
+    litellm.client_session = httpx.Client(
+        limits=httpx.Limits(
+            max_connections=config.LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=config.LLM_HTTP_MAX_CONNECTIONS
+        ),
+        timeout=config.LLM_HTTP_TIMEOUT
+    )
+
+llm_pool = LLMPool()
+agent_pool = AgentPool(config.AGENT_POOL_MAX_IDLE)
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+import config
+import storage
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:  # bs4 llega como dependencia de crewai_tools
+    BeautifulSoup = None
+
+# Parámetros de seguimiento que no cambian el producto mostrado
+TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "ref", "ref_", "_ga"}
+
+_session = requests.Session()
+_session.headers.update({"User-Agent": "Mozilla/5.0 (compatible; ReviewSimulator/1.0)"})
+
+def _is_tracking_param(key: str) -> bool:
+    key = key.lower()
+    return key.startswith("utm_") or key in TRACKING_PARAMS
+
+def normalize_url(url: str) -> str:
+    """
+    Normaliza una URL de producto para usarla como clave de caché: esquema y
+    host en minúsculas, sin puerto por defecto, sin fragmento, sin parámetros
+    de seguimiento y con la query ordenada.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or "https"
+    host = (parts.hostname or "").lower()
+    if parts.port and not (scheme == "http" and parts.port == 80) and not (scheme == "https" and parts.port == 443):
+        host = f"{host}:{parts.port}"
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking_param(key)
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+def _hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class PageFetch:
+    """Resultado de descargar una página de producto"""
+
+    def __init__(self, status: int, text: Optional[str] = None, etag: Optional[str] = None,
+                 last_modified: Optional[str] = None):
+        self.status = status
+        self.text = text
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status == 304
+
+def html_to_text(html: str) -> str:
+    """Extrae el texto visible de una página HTML"""
+    if BeautifulSoup is None:
+        return html
+    soup = BeautifulSoup(html, "html.parser")
+    for element in soup(["script", "style", "noscript", "svg"]):
+        element.decompose()
+    return " ".join(soup.get_text(separator=" ").split())
+
+def fetch_page(url: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> PageFetch:
+    """
+    Descarga una página usando una petición condicional cuando hay validadores
+    (ETag / Last-Modified) de una descarga anterior.
+    """
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    response = _session.get(url, headers=headers, timeout=config.PRODUCT_PAGE_TIMEOUT)
+    if response.status_code == 304:
+        return PageFetch(304, etag=etag, last_modified=last_modified)
+    response.raise_for_status()
+    return PageFetch(
+        response.status_code,
+        html_to_text(response.text),
+        response.headers.get("ETag"),
+        response.headers.get("Last-Modified")
+    )
+
+class ProductCache:
+    """
+    Caché persistente de productos extraídos en la fase 1.
+
+    Cada entrada es un JSON con el producto validado, el texto de la página y
+    sus validadores HTTP. La fecha de último acceso es el mtime del archivo,
+    que se usa para expulsar las entradas menos usadas cuando se supera
+    `max_entries`.
+    """
+
+    def __init__(self, cache_dir: str, ttl: int, max_entries: int):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, f"{_hash(normalize_url(url))}.json")
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Devuelve la entrada de una URL (aunque haya caducado) o None"""
+        path = self._path(url)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)
+            return entry
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        return time.time() - entry.get("stored_at", 0) < self.ttl
+
+    def put(self, url: str, product: Dict[str, Any], page: Optional[str] = None,
+            etag: Optional[str] = None, last_modified: Optional[str] = None) -> Dict[str, Any]:
+        entry = {
+            "url": normalize_url(url),
+            "product": product,
+            "page": page,
+            "page_hash": _hash(page) if page else None,
+            "etag": etag,
+            "last_modified": last_modified,
+            "stored_at": time.time()
+        }
+        with self._lock:
+            storage.atomic_write_json(self._path(url), entry)
+            self._evict()
+        return entry
+
+    def revalidate(self, url: str, entry: Dict[str, Any], fetched: PageFetch) -> Optional[Dict[str, Any]]:
+        """
+        Renueva una entrada caducada si la página no ha cambiado (304 o mismo
+        contenido). Devuelve la entrada renovada o None si hay que volver a extraer.
+        """
+        if not fetched.not_modified and (not fetched.text or _hash(fetched.text) != entry.get("page_hash")):
+            return None
+        return self.put(
+            url,
+            entry["product"],
+            entry.get("page"),
+            fetched.etag or entry.get("etag"),
+            fetched.last_modified or entry.get("last_modified")
+        )
+
+    def _evict(self):
+        try:
+            files = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir) if name.endswith(".json")]
+        except OSError:
+            return
+        if len(files) <= self.max_entries:
+            return
+        files.sort(key=lambda path: os.path.getmtime(path))
+        for path in files[:len(files) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+product_cache = ProductCache(config.PRODUCT_CACHE_DIR, config.PRODUCT_CACHE_TTL, config.PRODUCT_CACHE_MAX_ENTRIES)
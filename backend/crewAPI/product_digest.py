@@ -0,0 +1,62 @@
+from typing import Any, Dict, Iterable, List
+import config
+
+def _clean(value: Any) -> str:
+    """Convierte un valor a texto en una sola línea y sin espacios repetidos"""
+    return " ".join(str(value).split()) if value is not None else ""
+
+def _truncate(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(" ", 1)[0].rstrip(",.;:") + "…"
+
+def _pairs(items: Iterable[Dict[str, Any]], key: str, max_items: int) -> List[str]:
+    pairs = []
+    for item in items or []:
+        if len(pairs) >= max_items:
+            break
+        if not isinstance(item, dict):
+            continue
+        name = _clean(item.get(key))
+        value = _truncate(_clean(item.get("value")), config.DIGEST_VALUE_MAX_CHARS)
+        if name and value:
+            pairs.append(f"{name}: {value}")
+        elif name:
+            pairs.append(name)
+    return pairs
+
+def build_product_digest(product_info: Dict[str, Any]) -> str:
+    """
+    Resume el producto en un texto compacto para los prompts de los reseñadores.
+
+    Se omiten los campos que no ayudan a opinar (imagen, URLs), se normalizan
+    los espacios y se recortan la descripción y las listas de características y
+    especificaciones según los presupuestos de config.
+    """
+    lines = []
+    header = [
+        _clean(product_info.get("name")),
+        _clean(product_info.get("category")),
+        _clean(product_info.get("price"))
+    ]
+    header = " | ".join(part for part in header if part)
+    if header:
+        lines.append(header)
+
+    description = _clean(product_info.get("description"))
+    if description:
+        lines.append(f"Descripción: {_truncate(description, config.DIGEST_DESCRIPTION_MAX_CHARS)}")
+
+    features = _pairs(product_info.get("main_features"), "feature", config.DIGEST_MAX_FEATURES)
+    if features:
+        lines.append(f"Características: {'; '.join(features)}")
+
+    specs = _pairs(product_info.get("technical_specs"), "spec", config.DIGEST_MAX_SPECS)
+    if specs:
+        lines.append(f"Especificaciones: {'; '.join(specs)}")
+
+    rating = product_info.get("rating")
+    if rating:
+        lines.append(f"Valoración: {_clean(rating)}")
+
+    return _truncate("\n".join(lines), config.DIGEST_MAX_CHARS)
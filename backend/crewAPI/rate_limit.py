@@ -0,0 +1,69 @@
+import threading
+import time
+from typing import Optional
+
+class TokenBucket:
+    """
+    Cubo de tokens con capacidad `capacity` que se rellena a `rate` unidades por
+    segundo. Con capacidad por minuto y rate = capacidad / 60 limita el consumo
+    a `capacity` unidades por minuto permitiendo ráfagas hasta ese valor.
+    """
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = float(capacity)
+        self.rate = float(rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, limit: float) -> "TokenBucket":
+        return cls(limit, limit / 60.0)
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, amount: float = 1) -> float:
+        """
+        Intenta consumir `amount` unidades.
+
+        Returns:
+            0 si se han consumido, o los segundos que faltan para que haya suficientes
+        """
+        # Una petición mayor que la capacidad nunca cabría: se limita a un cubo lleno
+        amount = min(float(amount), self.capacity)
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return 0.0
+            return (amount - self._tokens) / self.rate
+
+    def acquire(self, amount: float = 1, timeout: Optional[float] = None) -> bool:
+        """Espera hasta poder consumir `amount` unidades; devuelve False si se agota el timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire(amount)
+            if wait == 0:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+    def adjust(self, amount: float):
+        """
+        Corrige un consumo ya hecho: positivo consume más (el saldo puede quedar
+        en negativo y las siguientes peticiones esperan), negativo devuelve unidades
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens - amount)
+
+    def available(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
@@ -0,0 +1,125 @@
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+import storage
+from output_store import output_store
+
+def read_review_entries(log_file: str) -> Dict[int, Dict[str, Any]]:
+    """
+    Lee las entradas del registro JSONL de reseñas por índice ({"index", "review"}
+    y, si se registró, el "input_hash" de la tarea). Si una reseña aparece varias
+    veces gana la última; una última línea a medio escribir se ignora.
+    """
+    entries = {}
+    try:
+        with open(log_file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    if "review" in entry:
+                        entries[int(entry["index"])] = entry
+                except (ValueError, KeyError, TypeError):
+                    continue
+    except OSError:
+        return {}
+    return entries
+
+def read_review_log(log_file: str) -> List[Dict[str, Any]]:
+    """Lee el registro JSONL de reseñas ordenado por índice"""
+    entries = read_review_entries(log_file)
+    return [entries[index]["review"] for index in sorted(entries)]
+
+def reviews_by_profile_index(reviews: List[Dict[str, Any]], profiles: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+    """
+    Asocia cada reseña al índice del perfil que la escribió (por bot_id), para
+    ejecuciones sin registro reviews.jsonl. Las reseñas de perfiles que ya no
+    existen se descartan.
+    """
+    positions = {profile.get("id"): index for index, profile in enumerate(profiles)}
+    return {positions[review.get("bot_id")]: review for review in reviews if review.get("bot_id") in positions}
+
+def added_reviews(entries: Dict[int, Dict[str, Any]], keep: Dict[int, Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+    """
+    Reseñas del registro (índice -> entrada, ver read_review_entries) que no
+    estaban en `keep`, por índice. Los índices conservados pueden tener huecos
+    (reseñas descartadas por no cumplir el esquema), así que no se puede suponer
+    que las reseñas nuevas son las últimas.
+    """
+    return {index: entry["review"] for index, entry in sorted(entries.items()) if index not in keep}
+
+def load_reviews(run_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Reseñas de una ejecución: reviews.json si la fase 3 ha terminado o, si no,
+    las que ya estén en el registro reviews.jsonl.
+    """
+    reviews_file = storage.get_reviews_file(run_id)
+    if os.path.exists(reviews_file):
+        with open(reviews_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data.get("reviews", []) if isinstance(data, dict) else data
+    return read_review_log(storage.get_reviews_log_file(run_id))
+
+class ReviewStore:
+    """
+    Colector de las reseñas de la fase 3 de una ejecución.
+
+    Cada reseña se añade en cuanto termina su tarea al registro append-only
+    reviews.jsonl (una línea por reseña, sin reescribir las anteriores) y se
+    guarda en memoria. Al terminar, flush() escribe reviews.json una sola vez
+    ordenado por índice. Si la fase falla, el registro conserva las reseñas ya
+    generadas.
+
+    reviews.json se escribe a través del almacén de salidas (output_store), que
+    con el backend SQLite inserta además todas las reseñas en una transacción.
+    """
+
+    def __init__(self, run_id: Optional[str] = None):
+        self.run_id = run_id
+        self.log_file = storage.get_reviews_log_file(run_id)
+        self.reviews_file = storage.get_reviews_file(run_id)
+        self._reviews: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._log = None
+
+    def open(self):
+        """Empieza un registro nuevo y descarta las reseñas compiladas anteriores"""
+        storage.ensure_run_dirs(self.run_id)
+        output_store.delete(self.run_id, "reviews")
+        self._log = open(self.log_file, "w", encoding="utf-8")
+        return self
+
+    def append(self, index: int, review: Dict[str, Any], input_hash: Optional[str] = None):
+        """Añade una reseña; input_hash (el de su tarea) permite reutilizarla al reanudar la fase"""
+        entry = {"index": index, "review": review}
+        if input_hash:
+            entry["input_hash"] = input_hash
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            self._reviews[index] = review
+            self._log.write(line + "\n")
+            self._log.flush()
+
+    def reviews(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [self._reviews[index] for index in sorted(self._reviews)]
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """Escribe reviews.json con todas las reseñas y cierra el registro"""
+        reviews = self.reviews()
+        output_store.save(self.run_id, "reviews", {"reviews": reviews})
+        self.close()
+        return reviews
+
+    def close(self):
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
@@ -0,0 +1,148 @@
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+import config
+
+PERSONALITY_TRAITS = (
+    "introvert_extrovert",
+    "analytical_creative",
+    "busy_free_time",
+    "disorganized_organized",
+    "independent_cooperative",
+    "environmentalist",
+    "safe_risky",
+)
+
+SAMPLING_METHODS = config.PROFILE_SAMPLING_METHODS
+
+# Valores de gender_ratio que envía el frontend y la proporción de cada género
+GENDER_RATIOS = {
+    "Male": {"Male": 1.0},
+    "Female": {"Female": 1.0},
+    "Male&Female": {"Male": 0.5, "Female": 0.5},
+}
+
+# Niveles educativos concretos para cada valor de education_level del frontend
+EDUCATION_LEVELS = {
+    "Low": ("Educación primaria", "Educación secundaria (ESO)"),
+    "Medium": ("Bachillerato", "Formación profesional"),
+    "High": ("Grado universitario", "Máster", "Doctorado"),
+}
+EDUCATION_LEVELS["Mixed"] = tuple(level for levels in EDUCATION_LEVELS.values() for level in levels)
+
+def _range(value: Any, default: Sequence[float], lower: float, upper: float) -> np.ndarray:
+    """Lee un rango [min, max] y lo recorta a los límites permitidos"""
+    try:
+        low, high = float(value[0]), float(value[1])
+    except (TypeError, ValueError, IndexError, KeyError):
+        low, high = default
+    low, high = sorted((min(max(low, lower), upper), min(max(high, lower), upper)))
+    return np.array([low, high])
+
+# Diseños candidatos entre los que "lhs" elige el de menor correlación
+LHS_CANDIDATES = 10
+
+def _stratified_units(n: int, dims: int, rng: np.random.Generator) -> np.ndarray:
+    """Una muestra al azar dentro de cada uno de los n estratos de cada dimensión, permutados por separado"""
+    strata = rng.permuted(np.tile(np.arange(n), (dims, 1)), axis=1).T
+    return (strata + rng.random((n, dims))) / n
+
+def _max_correlation(units: np.ndarray) -> float:
+    correlation = np.corrcoef(units, rowvar=False)
+    return float(np.abs(correlation[np.triu_indices_from(correlation, k=1)]).max())
+
+def _unit_samples(n: int, dims: int, method: str, rng: np.random.Generator) -> np.ndarray:
+    """
+    Muestras en [0, 1) de forma (n, dims). Con "random" son independientes; con
+    "stratified" cada dimensión tiene exactamente una muestra en cada uno de sus
+    n estratos (con una permutación independiente por dimensión). "lhs" genera
+    LHS_CANDIDATES diseños así y se queda con el de menor correlación entre
+    dimensiones (Latin hypercube con control de correlación), para que dos
+    rasgos no salgan emparejados por azar.
+    """
+    if method == "random":
+        return rng.random((n, dims))
+    if method == "stratified" or n < 3:
+        return _stratified_units(n, dims, rng)
+    return min((_stratified_units(n, dims, rng) for _ in range(LHS_CANDIDATES)), key=_max_correlation)
+
+def _allocate(n: int, labels: Sequence[str], weights: np.ndarray, method: str,
+              rng: np.random.Generator) -> np.ndarray:
+    """
+    Asigna una categoría a cada muestra. Con "random" se sortea cada una; con
+    "stratified" y "lhs" los conteos se reparten exactamente en proporción a los
+    pesos (método del mayor resto) y después se barajan.
+    """
+    weights = weights / weights.sum()
+    if method == "random":
+        return rng.choice(np.asarray(labels), size=n, p=weights)
+    quotas = weights * n
+    counts = np.floor(quotas).astype(int)
+    remainder = n - counts.sum()
+    counts[np.argsort(-(quotas - counts), kind="stable")[:remainder]] += 1
+    return rng.permutation(np.repeat(np.asarray(labels), counts))
+
+def gender_weights(gender_ratio: Any) -> Dict[str, float]:
+    """Proporción de cada género a partir de gender_ratio (valor del frontend o diccionario de pesos)"""
+    if isinstance(gender_ratio, dict):
+        weights = {gender: float(weight) for gender, weight in gender_ratio.items()
+                   if gender in ("Male", "Female", "Other") and float(weight) > 0}
+        if weights:
+            return weights
+    return GENDER_RATIOS.get(gender_ratio, GENDER_RATIOS["Male&Female"])
+
+def sample_population(num_profiles: int, profile_parameters: Optional[Dict[str, Any]] = None,
+                      method: str = None, seed: Optional[int] = None, first_id: int = 1) -> List[Dict[str, Any]]:
+    """
+    Muestrea localmente los atributos numéricos y categóricos de los perfiles.
+
+    La edad y los siete rasgos de personalidad se muestrean de forma uniforme en
+    los rangos de profile_parameters (demographics.age_range y personality), y el
+    género y el nivel educativo según demographics.gender_ratio y
+    demographics.education_level. El LLM solo tiene que escribir los textos.
+
+    Args:
+        num_profiles: Número de perfiles
+        profile_parameters: Parámetros de población enviados por el frontend
+        method: "random", "stratified" o "lhs" (por defecto config.PROFILE_SAMPLING_METHOD)
+        seed: Semilla para obtener siempre la misma población (opcional)
+        first_id: id del primer perfil
+
+    Returns:
+        Lista de diccionarios con id, age, gender, education_level y personality
+    """
+    profile_parameters = profile_parameters or {}
+    method = method or config.PROFILE_SAMPLING_METHOD
+    if method not in SAMPLING_METHODS:
+        raise ValueError(f"Método de muestreo no válido: {method!r} (usa {', '.join(SAMPLING_METHODS)})")
+    if num_profiles <= 0:
+        return []
+
+    rng = np.random.default_rng(seed)
+    demographics = profile_parameters.get("demographics") or {}
+    personality = profile_parameters.get("personality") or {}
+
+    # Rangos [min, max] de la edad y de cada rasgo: una fila por dimensión
+    bounds = np.vstack(
+        [_range(demographics.get("age_range"), config.PROFILE_DEFAULT_AGE_RANGE, 0, 120)]
+        + [_range(personality.get(trait), (0, 100), 0, 100) for trait in PERSONALITY_TRAITS]
+    )
+    units = _unit_samples(num_profiles, len(bounds), method, rng)
+    # El +1 hace que el valor máximo del rango también pueda salir al redondear hacia abajo
+    values = np.floor(bounds[:, 0] + units * (bounds[:, 1] - bounds[:, 0] + 1)).astype(int)
+    values = np.minimum(values, bounds[:, 1].astype(int))
+
+    genders = gender_weights(demographics.get("gender_ratio"))
+    gender_samples = _allocate(num_profiles, list(genders), np.array(list(genders.values())), method, rng)
+    levels = EDUCATION_LEVELS.get(demographics.get("education_level"), EDUCATION_LEVELS["Mixed"])
+    education_samples = _allocate(num_profiles, levels, np.ones(len(levels)), method, rng)
+
+    return [
+        {
+            "id": first_id + i,
+            "age": int(values[i, 0]),
+            "gender": str(gender_samples[i]),
+            "education_level": str(education_samples[i]),
+            "personality": {trait: int(values[i, j + 1]) for j, trait in enumerate(PERSONALITY_TRAITS)},
+        }
+        for i in range(num_profiles)
+    ]
@@ -0,0 +1,103 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+import uuid
+from typing import Any, List, Optional
+import config
+
+# Los run_id se usan como nombre de carpeta, así que solo se aceptan caracteres seguros
+RUN_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+class InvalidRunIdError(ValueError):
+    """Se lanza cuando un run_id contiene caracteres no permitidos"""
+
+def new_run_id() -> str:
+    """Genera un identificador de ejecución nuevo"""
+    return uuid.uuid4().hex
+
+def validate_run_id(run_id: Optional[str]) -> Optional[str]:
+    """Comprueba que un run_id es válido; None representa la ejecución compartida"""
+    if run_id is not None and not RUN_ID_PATTERN.match(str(run_id)):
+        raise InvalidRunIdError(f"run_id no válido: {run_id!r}")
+    return run_id
+
+def get_run_dir(run_id: Optional[str] = None) -> str:
+    """Devuelve la carpeta de outputs de una ejecución"""
+    if validate_run_id(run_id) is None:
+        return config.OUTPUT_DIR
+    return os.path.join(config.RUNS_DIR, run_id)
+
+def get_product_info_file(run_id: Optional[str] = None) -> str:
+    return os.path.join(get_run_dir(run_id), config.PRODUCT_INFO_FILENAME)
+
+def get_user_profiles_file(run_id: Optional[str] = None) -> str:
+    return os.path.join(get_run_dir(run_id), config.USER_PROFILES_FILENAME)
+
+def get_reviews_file(run_id: Optional[str] = None) -> str:
+    return os.path.join(get_run_dir(run_id), config.REVIEWS_FILENAME)
+
+def get_reviews_log_file(run_id: Optional[str] = None) -> str:
+    return os.path.join(get_run_dir(run_id), config.REVIEWS_LOG_FILENAME)
+
+def get_final_report_file(run_id: Optional[str] = None) -> str:
+    return os.path.join(get_run_dir(run_id), config.FINAL_REPORT_FILENAME)
+
+def get_checkpoints_file(run_id: Optional[str] = None) -> str:
+    return os.path.join(get_run_dir(run_id), config.CHECKPOINTS_FILENAME)
+
+def get_aggregates_file(run_id: Optional[str] = None) -> str:
+    return os.path.join(get_run_dir(run_id), config.AGGREGATES_FILENAME)
+
+def ensure_run_dirs(run_id: Optional[str] = None) -> str:
+    """Crea la carpeta de la ejecución si no existe"""
+    os.makedirs(get_run_dir(run_id), exist_ok=True)
+    return get_run_dir(run_id)
+
+def list_runs() -> List[str]:
+    """Lista los run_id que tienen carpeta de outputs"""
+    if not os.path.isdir(config.RUNS_DIR):
+        return []
+    return sorted(name for name in os.listdir(config.RUNS_DIR) if RUN_ID_PATTERN.match(name))
+
+def clean_run(run_id: Optional[str] = None):
+    """
+    Elimina los outputs de una ejecución y deja sus carpetas vacías.
+
+    Para la ejecución compartida se conserva la carpeta de runs para no
+    borrar las ejecuciones con run_id.
+    """
+    run_dir = get_run_dir(run_id)
+    if run_id is None:
+        if os.path.exists(run_dir):
+            for item in os.listdir(run_dir):
+                item_path = os.path.join(run_dir, item)
+                if item_path == config.RUNS_DIR:
+                    continue
+                if os.path.isdir(item_path):
+                    shutil.rmtree(item_path)
+                else:
+                    os.remove(item_path)
+    elif os.path.exists(run_dir):
+        shutil.rmtree(run_dir)
+    ensure_run_dirs(run_id)
+
+def atomic_write_json(file_path: str, data: Any):
+    """
+    Escribe un JSON de forma atómica: se escribe en un archivo temporal de la
+    misma carpeta y se renombra, así los lectores nunca ven un JSON a medias.
+    """
+    directory = os.path.dirname(file_path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(file_path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -3,16 +3,23 @@ import os
 from crewai import Task, Agent
 from typing import List, Dict, Any
 import config
-from models import Product, BotProfile, Review, AnalysisResult, UserProfilesResponse
+from models import Product, BotProfile, Review, AnalysisResult, UserProfilesResponse, QualitativeAnalysis, ProfileTextsResponse
+from product_digest import build_product_digest
 
 
 
-def create_product_info_task(product_url: str, agent: Agent):
+def create_product_info_task(product_url: str, agent: Agent, page_content: str = None):
     """Create and return the product information task"""
+    if page_content:
+        # La página ya se ha descargado; se incluye en el prompt para ahorrar la llamada a la herramienta
+        source = f"""1. Analiza el siguiente contenido ya extraído de la URL {product_url} (no es necesario volver a visitarla):
+        {page_content[:config.PRODUCT_PAGE_MAX_CHARS]}"""
+    else:
+        source = f"1. Visita la URL: {product_url}"
     
     return Task(
         description=f"""
-        1. Visita la URL: {product_url}
+        {source}
         2. Extrae toda la información disponible sobre el producto
         3. Estructura la información en un formato JSON que incluya:
            - name: nombre del producto
@@ -27,51 +34,67 @@ def create_product_info_task(product_url: str, agent: Agent):
         """,
         agent=agent,
         expected_output="Un objeto JSON con información detallada del producto",
-        output_file=config.PRODUCT_INFO_FILE,
         output_json=Product
     )
 
-def create_user_profiles_task(num_reviewers: int, profile_parameters: Dict[str, Any], agent: Agent):
-    """Create and return the user profiles creation task"""
-   
+def format_profile_attributes(attributes: List[Dict[str, Any]]) -> str:
+    """Resume en una línea por perfil los atributos ya muestreados"""
+    return "\n".join(
+        f"        - id {item['id']}: {item['age']} años, {item['gender']}, {item['education_level']}; personalidad: "
+        + ", ".join(f"{trait} {value}" for trait, value in item["personality"].items())
+        for item in attributes
+    )
+
+def create_user_profiles_task(attributes: List[Dict[str, Any]], profile_parameters: Dict[str, Any], agent: Agent,
+                              diversity_hint: str = None):
+    """
+    Create and return the user profiles creation task
+
+    La edad, el género, el nivel educativo y la personalidad de cada perfil ya
+    se han muestreado localmente (sampler.py); el LLM solo escribe los textos.
+    Cuando la fase 2 se reparte en lotes, cada lote recibe sus propios ids y una
+    pista de diversidad para que los lotes no generen perfiles parecidos.
+    """
+    context = {key: value for key, value in profile_parameters.items() if key not in ("demographics", "personality")}
+    diversity = f"\n        3. En este lote da prioridad a: {diversity_hint}" if diversity_hint else ""
     
     return Task(
         description=f"""
-        1. Genera {num_reviewers} perfiles de usuario diferentes para evaluar el producto
-        2. La población de perfiles será creada con estos rangos entre 0 y 100: {json.dumps(profile_parameters, ensure_ascii=False)}
-        4. Cada perfil debe estar en formato JSON e incluir:
-           - id: un número único
-           - name: nombre completo
-           - avatar: una URL de imagen de perfil (ficticia)
+        1. Escribe los textos de {len(attributes)} perfiles de usuario diferentes que evaluarán el producto.
+           Los datos de cada perfil ya están fijados y no se deben cambiar:
+{format_profile_attributes(attributes)}
+        2. Contexto de la población: {json.dumps(context, ensure_ascii=False)}{diversity}
+        4. Para cada perfil devuelve en formato JSON:
+           - id: el id indicado
+           - name: nombre completo, distinto en cada perfil y coherente con el género
            - bio: una biografía breve
-           - age: edad
            - location: ubicación
-           - gender: género
-           - education_level: nivel educativo (Doctorado, instituto, carrera, universidad... ejemplos realistas)
-           - personality: un objeto con rasgos de personalidad (valores de 0 a 100):
-             * introvert_extrovert
-             * analytical_creative
-             * busy_free_time
-             * disorganized_organized
-             * independent_cooperative
-             * environmentalist
-             * safe_risky
-           - backstory: historia detallada del usuario con su experiencia, intereses y motivaciones
-        4. Los perfiles deben ser diversos y representativos de diferentes segmentos de mercado
+           - backstory: historia detallada del usuario con su experiencia, intereses y motivaciones,
+             coherente con su edad, nivel educativo y rasgos de personalidad (valores de 0 a 100)
+        5. Los perfiles deben ser diversos y representativos de diferentes segmentos de mercado
         """,
         agent=agent,
-        expected_output=f"Una lista con {num_reviewers} perfiles de usuario en formato JSON en español",
-        output_file=config.USER_PROFILES_FILE,
-        output_json=UserProfilesResponse
+        expected_output=f"Una lista con los textos de {len(attributes)} perfiles de usuario en formato JSON en español",
+        output_json=ProfileTextsResponse
     )
 
-def create_reviewer_task(product_info: Dict[str, Any], profile: Dict[str, Any], agent: Agent, index: int):
-    """Create and return a reviewer task based on a user profile"""
-    review_file = os.path.join(config.REVIEWS_DIR, f"review_{index}.json")
-    
+def create_reviewer_task(product_info: Dict[str, Any], profile: Dict[str, Any], agent: Agent, index: int,
+                         product_digest: str = None):
+    """
+    Create and return a reviewer task based on a user profile
+
+    El producto se incluye como resumen compacto (product_digest); si no se
+    indica se calcula a partir de product_info. La persona del perfil va en la
+    descripción, así que el agente puede ser uno genérico del pool.
+    """
+    if product_digest is None:
+        product_digest = build_product_digest(product_info)
+    persona = profile.get('backstory', 'Usuario genérico interesado en el producto')
     return Task(
         description=f"""
-        1. Revisa la siguiente información de producto: {json.dumps(product_info, ensure_ascii=False)}
+        Eres {profile.get('name', 'un usuario')}. {persona}
+        1. Revisa la siguiente información de producto:
+{product_digest}
         2. Evalúa el producto desde la perspectiva de tu perfil personal: {json.dumps(profile, ensure_ascii=False)}
         3. Genera una reseña en formato JSON que incluya:
            - id: un número único (usa {index})
@@ -83,37 +106,107 @@ def create_reviewer_task(product_info: Dict[str, Any], profile: Dict[str, Any],
         """,
         agent=agent,
         expected_output="Una reseña detallada del producto desde la perspectiva del usuario en formato JSON",
-        output_file=review_file,
         output_json=Review
     )
 
-def create_reviewer_tasks(product_info: Dict[str, Any], profiles: List[Dict[str, Any]], agents: List[Agent]) -> List[Task]:
-    """Create and return a list of reviewer tasks based on user profiles"""
+def create_reviewer_tasks(product_info: Dict[str, Any], profiles: List[Dict[str, Any]], agents: List[Agent],
+                          indices: List[int] = None) -> List[Task]:
+    """
+    Create and return a list of reviewer tasks based on user profiles
+
+    indices son los índices de las reseñas (por defecto 0..n-1); se indican al
+    generar solo una parte de las reseñas de la fase.
+    """
+    # El resumen del producto se calcula una sola vez y lo comparten todas las tareas
+    product_digest = build_product_digest(product_info)
+    indices = indices if indices is not None else range(len(profiles))
     tasks = []
-    for i, (profile, agent) in enumerate(zip(profiles, agents)):
-        tasks.append(create_reviewer_task(product_info, profile, agent, i))
+    for i, profile, agent in zip(indices, profiles, agents):
+        tasks.append(create_reviewer_task(product_info, profile, agent, i, product_digest))
     return tasks
 
-def create_compiler_task(agent: Agent):
-    """Create and return the review compiler task"""
+def format_demographics(profiles: List[Dict[str, Any]]) -> str:
+    """Resume en una línea por perfil los datos demográficos relevantes para el análisis"""
+    return "\n".join(
+        f"        - bot_id {profile.get('id')}: {profile.get('age')} años, {profile.get('gender')}, "
+        f"{profile.get('location')}, {profile.get('education_level')}"
+        for profile in profiles
+    )
+
+def format_reviews(reviews: List[Dict[str, Any]]) -> str:
+    """Resume en una línea por reseña lo necesario para el análisis cualitativo"""
+    return "\n".join(
+        f"        - bot_id {review.get('bot_id')} ({review.get('rating')}★) "
+        f"{' '.join(str(review.get('title', '')).split())}: {' '.join(str(review.get('content', '')).split())}"
+        for review in reviews
+    )
+
+def create_chunk_analysis_task(agent: Agent, reviews: List[Dict[str, Any]], profiles: List[Dict[str, Any]],
+                               chunk_index: int, num_chunks: int):
+    """Create and return the map task that summarizes one block of reviews"""
+    return Task(
+        description=f"""
+        1. Analiza el bloque {chunk_index + 1} de {num_chunks} de reseñas de un producto:
+{format_reviews(reviews)}
+        2. Destaca los puntos fuertes y débiles que se repiten en este bloque
+        3. Relaciona las opiniones con el perfil demográfico de cada reseñador (bot_id):
+{format_demographics(profiles)}
+        4. El resultado debe tener la siguiente estructura:
+           - positive_points: lista de puntos positivos
+           - negative_points: lista de puntos negativos
+           - demographic_insights: lista de insights demográficos
+        """,
+        agent=agent,
+        expected_output="Los puntos positivos, negativos e insights demográficos del bloque de reseñas en formato JSON en español",
+        output_json=QualitativeAnalysis
+    )
+
+def create_merge_analysis_task(agent: Agent, partials: List[Dict[str, Any]], numeric_analysis: Dict[str, Any] = None):
+    """Create and return the reduce task that merges partial qualitative analyses"""
+    numeric_analysis = numeric_analysis or {}
+    return Task(
+        description=f"""
+        1. Combina los siguientes {len(partials)} análisis parciales de reseñas de un mismo producto:
+        {json.dumps(partials, ensure_ascii=False)}
+        2. Las métricas numéricas de todas las reseñas ya están calculadas, úsalas como contexto:
+           - valoración media: {numeric_analysis.get('average_rating')}
+           - distribución de valoraciones: {json.dumps(numeric_analysis.get('rating_distribution'), ensure_ascii=False)}
+        3. Agrupa los puntos repetidos o equivalentes, prioriza los que aparecen en más análisis
+           y conserva los insights demográficos que se mantienen entre bloques
+        4. El resultado debe tener la siguiente estructura:
+           - positive_points: lista de puntos positivos
+           - negative_points: lista de puntos negativos
+           - demographic_insights: lista de insights demográficos
+        """,
+        agent=agent,
+        expected_output="Los puntos positivos, negativos e insights demográficos combinados en formato JSON en español",
+        output_json=QualitativeAnalysis
+    )
+
+def create_compiler_task(agent: Agent, numeric_analysis: Dict[str, Any] = None, profiles: List[Dict[str, Any]] = None):
+    """
+    Create and return the review compiler task
+
+    Las métricas numéricas (valoración media, distribución y palabras clave) se
+    calculan localmente, así que el LLM solo redacta la parte cualitativa.
+    """
+    numeric_analysis = numeric_analysis or {}
     return Task(
         description=f"""
-        1. Estudia y analiza las reseñas de los usuarios en formato JSON del directorio {config.REVIEWS_DIR}
-        2. Organiza la información en un formato JSON claro y estructurado
-        3. Calcula la valoración media del producto
-        4. Destaca puntos fuertes y débiles mencionados con frecuencia
-        5. Genera un resumen general de las opiniones
-        6. Sugiere cómo se podría mejorar el producto
-        7. El resultado debe tener la siguiente estructura:
-           - average_rating: valoración media (número)
-           - rating_distribution: lista con 5 números (cantidad de reseñas con 1, 2, 3, 4 y 5 estrellas)
+        1. Estudia y analiza las reseñas de los usuarios en formato JSON que devuelve la herramienta leerReviews
+        2. Las métricas numéricas ya están calculadas, no las recalcules:
+           - valoración media: {numeric_analysis.get('average_rating')}
+           - distribución de valoraciones: {json.dumps(numeric_analysis.get('rating_distribution'), ensure_ascii=False)}
+           - palabras clave más frecuentes: {", ".join(item['word'] for item in numeric_analysis.get('keyword_analysis', []))}
+        3. Destaca puntos fuertes y débiles mencionados con frecuencia
+        4. Relaciona las opiniones con el perfil demográfico de cada reseñador (bot_id):
+{format_demographics(profiles or [])}
+        5. El resultado debe tener la siguiente estructura:
            - positive_points: lista de puntos positivos
            - negative_points: lista de puntos negativos
-           - keyword_analysis: lista de objetos con word, count, sentiment
            - demographic_insights: lista de insights demográficos
         """,
         agent=agent,
-        expected_output="Un informe completo con el análisis de las reseñas en formato JSON en español",
-        output_file=config.FINAL_REPORT_FILE,
-        output_json=AnalysisResult
-    ) 
\ No newline at end of file
+        expected_output="Los puntos positivos, negativos e insights demográficos de las reseñas en formato JSON en español",
+        output_json=QualitativeAnalysis
+    )
\ No newline at end of file
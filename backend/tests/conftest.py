@@ -0,0 +1,36 @@
+import os
+import sys
+import pytest
+
+# Mismas rutas que api/run.py: los módulos de crewAPI se importan sin prefijo de paquete
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+crewapi_dir = os.path.join(backend_dir, "crewAPI")
+for path in (backend_dir, crewapi_dir):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import config
+
+@pytest.fixture
+def output_dirs(tmp_path, monkeypatch):
+    """Carpetas de outputs temporales para la ejecución compartida y las ejecuciones con run_id"""
+    output_dir = tmp_path / "outputs"
+    monkeypatch.setattr(config, "OUTPUT_DIR", str(output_dir))
+    monkeypatch.setattr(config, "RUNS_DIR", str(output_dir / "runs"))
+    return output_dir
+
+class FakeClock:
+    """Reloj manual para sustituir al módulo time en los limitadores"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+
+@pytest.fixture
+def clock():
+    return FakeClock()
@@ -0,0 +1,59 @@
+from analytics import analysis_from_aggregates, compute_numeric_analysis, is_current, update_aggregates
+
+REVIEWS = [
+    {"rating": 5, "title": "Batería excelente", "content": "La batería dura muchísimo, batería increíble"},
+    {"rating": 1, "title": "Pantalla rota", "content": "La batería falla y la pantalla llegó rota"},
+    {"rating": 4, "title": "Buena pantalla", "content": "Pantalla brillante"},
+]
+
+def test_incremental_aggregates_match_full_computation():
+    full = update_aggregates(None, REVIEWS)
+    incremental = update_aggregates(update_aggregates(None, REVIEWS[:1]), REVIEWS[1:])
+    assert incremental == full
+
+def test_update_does_not_modify_previous_aggregates():
+    previous = update_aggregates(None, REVIEWS[:1])
+    snapshot = {**previous, "keywords": {word: list(tally) for word, tally in previous["keywords"].items()}}
+    update_aggregates(previous, REVIEWS[1:])
+    assert previous == snapshot
+
+def test_numeric_analysis():
+    analysis = compute_numeric_analysis(REVIEWS)
+    assert analysis["average_rating"] == 3.33
+    assert analysis["rating_distribution"] == {
+        "one_star": 1, "two_stars": 0, "three_stars": 0, "four_stars": 1, "five_stars": 1
+    }
+    keywords = {item["word"]: item for item in analysis["keyword_analysis"]}
+    assert keywords["batería"]["count"] == 4
+    assert keywords["pantalla"]["count"] == 4
+
+def test_out_of_range_ratings_are_clipped_everywhere():
+    reviews = [{"rating": 9, "title": "Genial", "content": ""}, {"rating": 0, "title": "Horrible", "content": ""}]
+    aggregates = update_aggregates(None, reviews)
+    assert aggregates["rating_sum"] == 6
+    assert aggregates["rating_counts"] == [1, 0, 0, 0, 1]
+    assert aggregates["keywords"]["genial"] == [1, 5.0, 1]
+    assert compute_numeric_analysis(reviews)["average_rating"] == 3.0
+
+def test_keyword_sentiment_counts_each_review_once():
+    # Tres apariciones en la reseña de 5 estrellas y una en la de 1: la media es 3, no 4
+    keywords = update_aggregates(None, REVIEWS)["keywords"]
+    assert keywords["batería"] == [4, 6.0, 2]
+    analysis = {item["word"]: item for item in compute_numeric_analysis(REVIEWS)["keyword_analysis"]}
+    assert analysis["batería"]["sentiment"] == "neutral"
+    assert analysis["brillante"]["sentiment"] == "positive"
+    assert analysis["rota"]["sentiment"] == "negative"
+
+def test_keywords_sorted_by_frequency_then_alphabetically():
+    analysis = analysis_from_aggregates(update_aggregates(None, REVIEWS), top_n=3)
+    assert [item["word"] for item in analysis["keyword_analysis"]] == ["batería", "pantalla", "rota"]
+
+def test_empty_reviews():
+    analysis = compute_numeric_analysis([])
+    assert analysis["average_rating"] == 0.0
+    assert analysis["keyword_analysis"] == []
+
+def test_aggregates_of_another_format_are_not_current():
+    assert is_current(update_aggregates(None, REVIEWS))
+    assert not is_current({"count": 1, "rating_sum": 5, "rating_counts": [0, 0, 0, 0, 1], "keywords": {}})
+    assert not is_current(None)
@@ -0,0 +1,69 @@
+import os
+import time
+from llm_cache import DiskBackend
+
+def _age(backend, key, seconds):
+    """Retrasa el mtime de una entrada para ordenar la expulsión de forma determinista"""
+    mtime = time.time() - seconds
+    os.utime(backend._path(key), (mtime, mtime))
+
+def test_disk_backend_round_trip(tmp_path):
+    backend = DiskBackend(str(tmp_path / "llm"))
+    backend.set("ab01", "respuesta")
+    assert backend.get("ab01") == "respuesta"
+    assert backend.get("cd02") is None
+    assert len(backend) == 1
+
+def test_disk_backend_evicts_oldest_entries(tmp_path):
+    backend = DiskBackend(str(tmp_path / "llm"), max_entries=10)
+    for number in range(10):
+        key = f"{number:02d}key"
+        backend.set(key, "x")
+        _age(backend, key, 100 - number)
+    backend.set("10key", "x")
+    # Al superar el límite se queda en el 90%: se borran las dos más antiguas
+    assert len(backend) == 9
+    assert backend.get("00key") is None
+    assert backend.get("01key") is None
+    assert backend.get("02key") == "x"
+    assert backend.get("10key") == "x"
+
+def test_disk_backend_limits_bytes(tmp_path):
+    backend = DiskBackend(str(tmp_path / "llm"))
+    backend.set("aa00", "x" * 1000)
+    size = os.path.getsize(backend._path("aa00"))
+    limited = DiskBackend(str(tmp_path / "llm"), max_bytes=int(size * 2.5))
+    _age(limited, "aa00", 30)
+    limited.set("bb00", "x" * 1000)
+    _age(limited, "bb00", 20)
+    limited.set("cc00", "x" * 1000)
+    assert limited.get("aa00") is None
+    assert limited.get("bb00") is not None
+    assert limited.get("cc00") is not None
+
+def test_disk_backend_keeps_newest_entry_with_tiny_limit(tmp_path):
+    backend = DiskBackend(str(tmp_path / "llm"), max_entries=1)
+    backend.set("aa00", "x")
+    _age(backend, "aa00", 10)
+    backend.set("bb00", "y")
+    assert backend.get("aa00") is None
+    assert backend.get("bb00") == "y"
+
+def test_disk_backend_ttl_expires_entries(tmp_path):
+    backend = DiskBackend(str(tmp_path / "llm"), ttl=60)
+    backend.set("aa00", "viejo")
+    backend.set("bb00", "nuevo")
+    _age(backend, "aa00", 120)
+    assert backend.get("aa00") is None
+    assert not os.path.exists(backend._path("aa00"))
+    assert backend.get("bb00") == "nuevo"
+
+def test_disk_backend_clear_resets_totals(tmp_path):
+    backend = DiskBackend(str(tmp_path / "llm"), max_entries=5)
+    for number in range(3):
+        backend.set(f"{number:02d}key", "x")
+    backend.clear()
+    assert len(backend) == 0
+    for number in range(5):
+        backend.set(f"{number:02d}new", "x")
+    assert len(backend) == 5
@@ -0,0 +1,86 @@
+import pytest
+import llm_limiter
+from llm_limiter import AdaptiveConcurrency, CircuitBreaker, CircuitOpenError, classify_error, estimate_tokens
+
+class ProviderError(Exception):
+    def __init__(self, status_code=None):
+        super().__init__("error del proveedor")
+        self.status_code = status_code
+
+class RateLimitError(Exception):
+    pass
+
+class APIConnectionError(Exception):
+    pass
+
+@pytest.mark.parametrize("error, reason", [
+    (ProviderError(429), "rate_limit"),
+    (RateLimitError(), "rate_limit"),
+    (ProviderError(503), "server_error"),
+    (APIConnectionError(), "server_error"),
+    (ProviderError(400), None),
+    (ValueError("esquema no válido"), None),
+])
+def test_classify_error(error, reason):
+    assert classify_error(error) == reason
+
+def test_estimate_tokens():
+    assert estimate_tokens("a" * 40) == 11
+    assert estimate_tokens([{"role": "user", "content": "a" * 8}, {"role": "system", "content": "b" * 8}]) == 5
+
+def test_adaptive_concurrency_is_aimd():
+    concurrency = AdaptiveConcurrency(initial=4, maximum=8)
+    concurrency.on_throttle()
+    assert concurrency.limit == 2
+    for _ in range(2):
+        concurrency.on_success()
+    assert 2.5 < concurrency.limit < 3
+    for _ in range(100):
+        concurrency.on_success()
+    assert concurrency.limit == 8
+    for _ in range(10):
+        concurrency.on_throttle()
+    assert concurrency.limit == 1
+
+@pytest.fixture
+def breaker(monkeypatch, clock):
+    monkeypatch.setattr(llm_limiter, "time", clock)
+    return CircuitBreaker(threshold=2, cooldown=30)
+
+def test_circuit_opens_after_threshold(breaker):
+    breaker.on_failure()
+    breaker.before_call()
+    breaker.on_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+def test_half_open_lets_one_probe_through(breaker, clock):
+    breaker.on_failure()
+    breaker.on_failure()
+    clock.now += 31
+    breaker.before_call()
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.on_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
+
+def test_failed_probe_reopens_the_circuit(breaker, clock):
+    breaker.on_failure()
+    breaker.on_failure()
+    clock.now += 31
+    breaker.before_call()
+    breaker.on_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+def test_neutral_probe_allows_another_probe(breaker, clock):
+    breaker.on_failure()
+    breaker.on_failure()
+    clock.now += 31
+    breaker.before_call()
+    breaker.on_neutral()
+    breaker.before_call()
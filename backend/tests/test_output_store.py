@@ -0,0 +1,118 @@
+import sqlite3
+import pytest
+import storage
+from output_store import JsonOutputStore, OutputStore, SQLiteOutputStore
+
+RUN_ID = "run1"
+PROFILES = {"profiles": [
+    {"id": 1, "age": 25, "gender": "Female", "education_level": "Máster"},
+    {"id": 2, "age": 41, "gender": "Male", "education_level": "Bachillerato"},
+    {"id": 3, "age": 33, "gender": "female", "education_level": "Doctorado"},
+]}
+REVIEWS = {"reviews": [
+    {"id": 0, "bot_id": 1, "rating": 5},
+    {"id": 1, "bot_id": 2, "rating": 2},
+    {"id": 2, "bot_id": 3, "rating": 4},
+]}
+
+@pytest.fixture
+def store(output_dirs, tmp_path):
+    storage.ensure_run_dirs(RUN_ID)
+    return SQLiteOutputStore(str(tmp_path / "data" / "reviews.db"))
+
+def test_output_store_is_abstract():
+    with pytest.raises(TypeError):
+        OutputStore()
+
+def test_save_writes_database_and_file(store):
+    store.save(RUN_ID, "reviews", REVIEWS)
+    assert store.load(RUN_ID, "reviews") == REVIEWS
+    assert JsonOutputStore().load(RUN_ID, "reviews") == REVIEWS
+    assert store.list_runs() == [RUN_ID]
+
+def test_version_changes_on_every_save(store):
+    store.save(RUN_ID, "product", {"name": "X1"})
+    first = store.version(RUN_ID, "product")
+    store.save(RUN_ID, "product", {"name": "X2"})
+    assert store.version(RUN_ID, "product") != first
+    assert store.load(RUN_ID, "product") == {"name": "X2"}
+
+def test_documents_outside_the_database_are_read_from_their_file(store):
+    JsonOutputStore().save(RUN_ID, "product", {"name": "antiguo"})
+    assert store.stored_version(RUN_ID, "product") is None
+    assert store.load(RUN_ID, "product") == {"name": "antiguo"}
+
+def test_failed_database_write_falls_back_to_the_file(store, monkeypatch):
+    store.save(RUN_ID, "reviews", REVIEWS)
+    updated = {"reviews": REVIEWS["reviews"][:1]}
+
+    def locked(operations):
+        raise sqlite3.OperationalError("database is locked")
+
+    real_write = store._write
+    monkeypatch.setattr(store, "_write", locked)
+    with pytest.raises(sqlite3.OperationalError):
+        store.save(RUN_ID, "reviews", updated)
+    monkeypatch.setattr(store, "_write", real_write)
+
+    # Un fallo solo en la primera escritura: se descarta la versión de la base de datos
+    calls = []
+
+    def fail_once(operations):
+        calls.append(operations)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        real_write(operations)
+
+    monkeypatch.setattr(store, "_write", fail_once)
+    store.save(RUN_ID, "reviews", updated)
+    assert store.stored_version(RUN_ID, "reviews") is None
+    assert store.load(RUN_ID, "reviews") == updated
+
+def test_failed_file_write_does_not_commit_the_rows(store, monkeypatch):
+    store.save(RUN_ID, "reviews", REVIEWS)
+    version = store.stored_version(RUN_ID, "reviews")
+
+    def failing_write(file_path, data):
+        raise OSError("disco lleno")
+
+    monkeypatch.setattr(storage, "atomic_write_json", failing_write)
+    with pytest.raises(OSError):
+        store.save(RUN_ID, "reviews", {"reviews": []})
+    assert store.stored_version(RUN_ID, "reviews") == version
+    assert store.load(RUN_ID, "reviews") == REVIEWS
+
+def test_delete_removes_database_rows_and_file(store):
+    store.save(RUN_ID, "reviews", REVIEWS)
+    store.delete(RUN_ID, "reviews")
+    assert store.stored_version(RUN_ID, "reviews") is None
+    assert store.load(RUN_ID, "reviews") is None
+
+def test_query_filters_and_paginates(store):
+    store.save(RUN_ID, "profiles", PROFILES)
+    store.save(RUN_ID, "reviews", REVIEWS)
+    rows, after = store.query("reviews", RUN_ID, [("range", "rating", 3, None)], limit=1)
+    assert [row["id"] for row in rows] == [0] and after == (0, 0)
+    rows, after = store.query("reviews", RUN_ID, [("range", "rating", 3, None)], after=after, limit=1)
+    assert [row["id"] for row in rows] == [2] and after is None
+
+def test_query_with_duplicate_ids_spanning_a_page_boundary(store):
+    reviews = {"reviews": [{"id": 1, "rating": 5}, {"id": 2, "rating": 4}, {"id": 2, "rating": 3},
+                           {"id": 2, "rating": 5}, {"id": 3, "rating": 1}]}
+    store.save(RUN_ID, "reviews", reviews)
+    ratings, after = [], None
+    while True:
+        rows, after = store.query("reviews", RUN_ID, [], after=after, limit=2)
+        ratings.extend(row["rating"] for row in rows)
+        if after is None:
+            break
+    assert ratings == [5, 4, 3, 5, 1]
+
+def test_query_by_reviewer_attributes(store):
+    store.save(RUN_ID, "profiles", PROFILES)
+    store.save(RUN_ID, "reviews", REVIEWS)
+    rows, _ = store.query("reviews", RUN_ID, [], reviewer_conditions=[("eq", "gender", {"female"})])
+    assert [row["bot_id"] for row in rows] == [1, 3]
+
+def test_query_without_stored_documents(store):
+    assert store.query("reviews", RUN_ID, []) is None
@@ -0,0 +1,19 @@
+import pytest
+
+pytest.importorskip("requests")
+from product_cache import normalize_url
+
+@pytest.mark.parametrize("url, normalized", [
+    ("HTTPS://Example.COM/item/", "https://example.com/item"),
+    ("https://example.com:443/item#reviews", "https://example.com/item"),
+    ("http://example.com:80/", "http://example.com/"),
+    ("https://example.com:8443/item", "https://example.com:8443/item"),
+    ("https://example.com/item?b=2&utm_source=x&a=1&gclid=y", "https://example.com/item?a=1&b=2"),
+    ("  https://example.com/item?ref=home  ", "https://example.com/item"),
+    ("//example.com/item", "https://example.com/item"),
+])
+def test_normalize_url(url, normalized):
+    assert normalize_url(url) == normalized
+
+def test_tracking_only_variants_share_a_key():
+    assert normalize_url("https://shop.com/p/1?utm_campaign=a") == normalize_url("https://SHOP.com/p/1/#top")
@@ -0,0 +1,32 @@
+import config
+from product_digest import build_product_digest
+
+PRODUCT = {
+    "name": "Auriculares  X1",
+    "category": "Audio",
+    "price": "59,99 €",
+    "description": "Auriculares   inalámbricos\ncon cancelación de ruido. " * 40,
+    "main_features": [{"feature": f"Característica {i}", "value": "Sí"} for i in range(20)],
+    "technical_specs": [{"spec": "Peso", "value": "250 g"}, {"spec": "Bluetooth"}, "no es un diccionario"],
+    "image_url": "https://example.com/x1.jpg",
+    "rating": "4,5",
+}
+
+def test_digest_normalizes_whitespace_and_omits_urls():
+    digest = build_product_digest(PRODUCT)
+    lines = digest.splitlines()
+    assert lines[0] == "Auriculares X1 | Audio | 59,99 €"
+    assert "https://" not in digest
+    assert "Especificaciones: Peso: 250 g; Bluetooth" in lines
+    assert "Valoración: 4,5" in lines
+
+def test_digest_respects_budgets():
+    lines = build_product_digest(PRODUCT).splitlines()
+    description = next(line for line in lines if line.startswith("Descripción: "))
+    assert description.endswith("…")
+    assert len(description) <= len("Descripción: ") + config.DIGEST_DESCRIPTION_MAX_CHARS + 1
+    features = next(line for line in lines if line.startswith("Características: "))
+    assert features.count(";") == config.DIGEST_MAX_FEATURES - 1
+
+def test_digest_of_empty_product():
+    assert build_product_digest({}) == ""
@@ -0,0 +1,72 @@
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("crewai")
+from api.services.query_service import InvalidQueryError, RecordIndex, decode_cursor, encode_cursor
+
+PROFILES = [
+    {"id": 4, "age": 52, "gender": "Male", "education_level": "Máster"},
+    {"id": 1, "age": 25, "gender": "Female", "education_level": "Máster"},
+    {"id": 3, "age": 33, "gender": "female", "education_level": "Doctorado"},
+    {"id": 2, "age": 41, "gender": "Male"},
+    {"id": 5, "gender": "Female"},
+]
+
+@pytest.fixture
+def index():
+    return RecordIndex(PROFILES, ("gender", "education_level"), ("age",))
+
+def _ids(page):
+    items, next_key = page
+    return [item["id"] for item in items], next_key is not None
+
+def test_records_are_sorted_by_id(index):
+    assert _ids(index.query([])) == ([1, 2, 3, 4, 5], False)
+
+def test_equality_is_case_insensitive(index):
+    assert _ids(index.query([("eq", "gender", {"female"})])) == ([1, 3, 5], False)
+
+def test_range_skips_records_without_the_field(index):
+    assert _ids(index.query([("range", "age", 30, None)])) == ([2, 3, 4], False)
+    assert _ids(index.query([("range", "age", None, 33)])) == ([1, 3], False)
+
+def test_conditions_are_combined(index):
+    conditions = [("eq", "gender", {"female"}), ("range", "age", 20, 40), ("eq", "education_level", {"máster"})]
+    assert _ids(index.query(conditions)) == ([1], False)
+
+def test_pages_follow_the_cursor(index):
+    conditions = [("eq", "gender", {"male", "female"})]
+    items, next_key = index.query(conditions, limit=2)
+    assert [item["id"] for item in items] == [1, 2] and next_key == (2, 3)
+    assert _ids(index.query(conditions, after=next_key, limit=2)) == ([3, 4], True)
+    assert _ids(index.query(conditions, after=(4, 0), limit=2)) == ([5], False)
+
+def test_duplicate_ids_spanning_a_page_boundary():
+    # Los id de las reseñas los escribe el LLM: la página no puede saltarse el resto del grupo
+    reviews = [{"id": 1, "rating": 5, "title": "a"}, {"id": 2, "rating": 4, "title": "b"},
+               {"id": 2, "rating": 3, "title": "c"}, {"id": 2, "rating": 5, "title": "d"},
+               {"id": 3, "rating": 1, "title": "e"}]
+    index = RecordIndex(reviews, ("bot_id",), ("rating",))
+    titles, after = [], None
+    while True:
+        items, after = index.query([], after, limit=2)
+        titles.extend(item["title"] for item in items)
+        if after is None:
+            break
+        after = decode_cursor(encode_cursor(after))
+    assert titles == ["a", "b", "c", "d", "e"]
+
+    items, after = index.query([("range", "rating", 3, None)], limit=2)
+    assert [item["title"] for item in items] == ["a", "b"]
+    items, after = index.query([("range", "rating", 3, None)], after, limit=2)
+    assert [item["title"] for item in items] == ["c", "d"] and after is None
+
+def test_cursor_round_trip():
+    for key in ((0, 0), (7, 3), (123456789, 42)):
+        assert decode_cursor(encode_cursor(key)) == key
+    assert "=" not in encode_cursor((1, 0))
+
+@pytest.mark.parametrize("cursor", ["@@@", "bm9wZQ", "ñ", "NTE"])
+def test_invalid_cursor(cursor):
+    with pytest.raises(InvalidQueryError):
+        decode_cursor(cursor)
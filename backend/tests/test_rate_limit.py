@@ -0,0 +1,42 @@
+import pytest
+import rate_limit
+from rate_limit import TokenBucket
+
+@pytest.fixture(autouse=True)
+def fake_time(monkeypatch, clock):
+    monkeypatch.setattr(rate_limit, "time", clock)
+
+def test_bucket_allows_bursts_up_to_capacity():
+    bucket = TokenBucket.per_minute(60)
+    assert all(bucket.try_acquire() == 0 for _ in range(60))
+    assert bucket.try_acquire() == pytest.approx(1.0)
+
+def test_bucket_refills_over_time(clock):
+    bucket = TokenBucket(10, 2)
+    assert bucket.try_acquire(10) == 0
+    clock.now += 2.5
+    assert bucket.available() == pytest.approx(5)
+    clock.now += 100
+    assert bucket.available() == pytest.approx(10)
+
+def test_requests_larger_than_capacity_wait_for_a_full_bucket():
+    bucket = TokenBucket(10, 1)
+    assert bucket.try_acquire(50) == 0
+    assert bucket.available() == pytest.approx(0)
+
+def test_adjust_can_leave_a_debt(clock):
+    bucket = TokenBucket(10, 1)
+    bucket.try_acquire(5)
+    bucket.adjust(10)
+    assert bucket.available() == pytest.approx(-5)
+    assert bucket.try_acquire(1) == pytest.approx(6)
+    bucket.adjust(-100)
+    assert bucket.available() == pytest.approx(10)
+
+def test_acquire_waits_and_times_out(clock):
+    bucket = TokenBucket(1, 1)
+    assert bucket.acquire()
+    started = clock.now
+    assert bucket.acquire()
+    assert clock.now - started == pytest.approx(1)
+    assert not bucket.acquire(1, timeout=0.5)
@@ -0,0 +1,42 @@
+import json
+from review_store import added_reviews, read_review_entries, reviews_by_profile_index
+
+def _entries(*indices):
+    return {index: {"index": index, "review": {"id": index, "bot_id": index + 1}} for index in indices}
+
+def test_added_reviews_with_gaps_in_kept_indices():
+    # La reseña 1 se descartó en la ejecución original: el hueco no desplaza a las nuevas
+    keep = {index: entry["review"] for index, entry in _entries(0, 2, 3).items()}
+    added = added_reviews(_entries(0, 2, 3, 4, 5), keep)
+    assert list(added) == [4, 5]
+    assert [review["id"] for review in added.values()] == [4, 5]
+
+def test_added_reviews_includes_filled_gaps():
+    keep = {index: entry["review"] for index, entry in _entries(0, 2).items()}
+    assert list(added_reviews(_entries(0, 1, 2, 3), keep)) == [1, 3]
+
+def test_added_reviews_ignores_kept_reviews():
+    entries = _entries(0, 1)
+    keep = {index: entry["review"] for index, entry in entries.items()}
+    assert added_reviews(entries, keep) == {}
+
+def test_reviews_by_profile_index_uses_bot_id():
+    profiles = [{"id": 10}, {"id": 11}, {"id": 12}]
+    reviews = [{"id": 0, "bot_id": 10}, {"id": 1, "bot_id": 12}, {"id": 2, "bot_id": 99}]
+    assert reviews_by_profile_index(reviews, profiles) == {0: reviews[0], 2: reviews[1]}
+
+def test_read_review_entries_last_entry_wins_and_partial_line_is_ignored(tmp_path):
+    log_file = tmp_path / "reviews.jsonl"
+    lines = [
+        json.dumps({"index": 0, "review": {"id": 0, "rating": 1}}),
+        json.dumps({"index": 1, "review": {"id": 1, "rating": 4}}),
+        json.dumps({"index": 0, "review": {"id": 0, "rating": 5}}),
+        '{"index": 2, "rev',
+    ]
+    log_file.write_text("\n".join(lines), encoding="utf-8")
+    entries = read_review_entries(str(log_file))
+    assert sorted(entries) == [0, 1]
+    assert entries[0]["review"]["rating"] == 5
+
+def test_read_review_entries_missing_file(tmp_path):
+    assert read_review_entries(str(tmp_path / "missing.jsonl")) == {}
@@ -0,0 +1,47 @@
+from collections import Counter
+import numpy as np
+import pytest
+from sampler import EDUCATION_LEVELS, PERSONALITY_TRAITS, _max_correlation, _unit_samples, sample_population
+
+PARAMETERS = {
+    "demographics": {"age_range": [20, 29], "gender_ratio": "Male&Female", "education_level": "High"},
+    "personality": {"safe_risky": [40, 60]},
+}
+
+@pytest.mark.parametrize("method", ["random", "stratified", "lhs"])
+def test_values_stay_within_ranges(method):
+    profiles = sample_population(50, PARAMETERS, method=method, seed=1, first_id=7)
+    assert [profile["id"] for profile in profiles] == list(range(7, 57))
+    for profile in profiles:
+        assert 20 <= profile["age"] <= 29
+        assert profile["education_level"] in EDUCATION_LEVELS["High"]
+        assert set(profile["personality"]) == set(PERSONALITY_TRAITS)
+        assert 40 <= profile["personality"]["safe_risky"] <= 60
+
+def test_same_seed_same_population():
+    assert sample_population(20, PARAMETERS, seed=3) == sample_population(20, PARAMETERS, seed=3)
+
+def test_stratified_gender_counts_are_exact():
+    profiles = sample_population(11, PARAMETERS, method="stratified", seed=5)
+    counts = Counter(profile["gender"] for profile in profiles)
+    assert sorted(counts.values()) == [5, 6]
+
+@pytest.mark.parametrize("method", ["stratified", "lhs"])
+def test_numeric_dimensions_cover_every_stratum(method):
+    parameters = {"demographics": {"age_range": [0, 9]}, "personality": {"safe_risky": [0, 9]}}
+    profiles = sample_population(10, parameters, method=method, seed=2)
+    assert sorted(profile["age"] for profile in profiles) == list(range(10))
+    assert sorted(profile["personality"]["safe_risky"] for profile in profiles) == list(range(10))
+
+def test_lhs_picks_the_least_correlated_design():
+    designs = [_unit_samples(20, 8, method, np.random.default_rng(seed)) for method in ("stratified", "lhs")
+               for seed in range(20)]
+    stratified, lhs = designs[:20], designs[20:]
+    assert np.mean([_max_correlation(d) for d in lhs]) < np.mean([_max_correlation(d) for d in stratified])
+
+def test_invalid_method():
+    with pytest.raises(ValueError):
+        sample_population(5, PARAMETERS, method="sobol")
+
+def test_no_profiles():
+    assert sample_population(0, PARAMETERS) == []
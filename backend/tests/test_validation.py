@@ -0,0 +1,46 @@
+import pytest
+
+pytest.importorskip("flask")
+from api.utils.validation import InvalidParameterError, bool_param, int_param, profile_parameters_param
+
+def test_int_param():
+    assert int_param({"concurrency": 4}, "concurrency") == 4
+    assert int_param({}, "concurrency") is None
+    assert int_param(None, "chunk_size", default=20) == 20
+    assert int_param({"num_reviewers": 0}, "num_reviewers", minimum=0) == 0
+
+@pytest.mark.parametrize("value", [0, -3, 2.5, "4", True, [4]])
+def test_int_param_rejects_invalid_values(value):
+    with pytest.raises(InvalidParameterError):
+        int_param({"concurrency": value}, "concurrency")
+
+def test_bool_param():
+    assert bool_param({"use_cache": True}, "use_cache") is True
+    assert bool_param({}, "use_cache") is False
+
+@pytest.mark.parametrize("value", [1, "true", None])
+def test_bool_param_rejects_invalid_values(value):
+    with pytest.raises(InvalidParameterError):
+        bool_param({"use_cache": value}, "use_cache")
+
+def test_profile_parameters_param():
+    parameters = {"seed": 0, "sampling_method": "lhs", "demographics": {"gender_ratio": {"Male": 1, "Female": 0.5}}}
+    assert profile_parameters_param({"profile_parameters": parameters}) == parameters
+    assert profile_parameters_param({}) is None
+    assert profile_parameters_param({}, default={"seed": 1}) == {"seed": 1}
+    assert profile_parameters_param({"profile_parameters": {"demographics": {"gender_ratio": "Male"}}})
+
+@pytest.mark.parametrize("parameters", [
+    "lhs",
+    {"seed": "42"},
+    {"seed": -1},
+    {"seed": 1.5},
+    {"sampling_method": "sobol"},
+    {"demographics": []},
+    {"demographics": {"gender_ratio": {"Male": -1}}},
+    {"demographics": {"gender_ratio": {"Male": "1"}}},
+    {"demographics": {"gender_ratio": {"Male": float("nan")}}},
+])
+def test_profile_parameters_param_rejects_invalid_values(parameters):
+    with pytest.raises(InvalidParameterError):
+        profile_parameters_param({"profile_parameters": parameters})